@@ -1,10 +1,17 @@
 import os
+import hmac
+import json
+import time
 import logging
 from datetime import datetime
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 
 from models.conversation_ai import ConversationAI
+from utils.metrics import process_memory_bytes
+from utils.tracing import chrome_trace
+from utils.profiler import profiler, collapsed
+from utils.memory import memory_diagnostics, object_counts, GROUP_BY
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -12,6 +19,13 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)
 
+CHAT_BATCH_MAX_MESSAGES = int(os.environ.get('CHAT_BATCH_MAX_MESSAGES', 20))
+
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no'
+}
+
 try:
     ai_system = ConversationAI()
     logger.info("Sistema de IA cargado correctamente")
@@ -19,6 +33,18 @@ except Exception as e:
     logger.error(f"Error cargando sistema IA: {e}")
     ai_system = None
 
+def is_admin_token(provided):
+    admin_token = os.environ.get('ADMIN_TOKEN')
+    return bool(admin_token) and hmac.compare_digest(provided or '', admin_token)
+
+def _is_admin_request():
+    return is_admin_token(request.headers.get('X-Admin-Token', ''))
+
+def trace_request(name, **attrs):
+    # Admins can force a trace with X-Trace: 1; everyone else is sampled
+    force = request.headers.get('X-Trace') == '1' and _is_admin_request()
+    return ai_system.tracer.trace(name, force=force, **attrs)
+
 @app.route('/', methods=['GET'])
 def home():
     return jsonify({
@@ -35,8 +61,11 @@ def home():
         "endpoints": {
             "test": "/api/test",
             "chat": "/api/chat",
+            "chat_batch": "/api/chat/batch",
+            "dashboard": "/api/dashboard",
             "suggestions": "/api/suggestions",
-            "status": "/api/status"
+            "status": "/api/status",
+            "metrics": "/api/metrics"
         },
         "supported_roles": ["alumno", "profesor", "directivo"],
         "timestamp": datetime.now().isoformat(),
@@ -78,74 +107,220 @@ def test_system():
             "message": "Error en el sistema"
         }), 500
 
+def ai_unavailable_response():
+    return {
+        "success": False,
+        "error": "Sistema IA no disponible",
+        "response": "Lo siento, el sistema está temporalmente fuera de servicio."
+    }
+
+def parse_chat_request(data):
+    if not isinstance(data, dict) or 'message' not in data:
+        return None, {
+            "success": False,
+            "error": "Mensaje requerido",
+            "example": {
+                "message": "Hola, ¿cuáles son mis calificaciones?",
+                "user_id": 1,
+                "role": "alumno"
+            }
+        }
+    
+    return (str(data['message']).strip(), data.get('user_id', 1), data.get('role', 'alumno')), None
+
+def empty_message_response(user_id, role):
+    return {
+        "success": True,
+        "response": "Parece que no escribiste nada. ¿En qué te puedo ayudar?",
+        "intent": "mensaje_vacio",
+        "user_id": user_id,
+        "role": role
+    }
+
+def chat_response_data(result, user_id, role):
+    response_data = {
+        "success": result["success"],
+        "response": result["response"],
+        "intent": result["intent"],
+        "user_id": user_id,
+        "role": role,
+        "has_data": result.get("has_data", False),
+        "timestamp": datetime.now().isoformat()
+    }
+    
+    if result.get("data_count"):
+        response_data["data_count"] = result["data_count"]
+    
+    if result.get("query_executed"):
+        response_data["query_executed"] = True
+    
+    if not result["success"]:
+        response_data["error"] = result.get("error", "Error desconocido")
+    
+    return response_data
+
+def wants_stream(data, accept):
+    return bool(data.get('stream')) or 'text/event-stream' in (accept or '')
+
+def format_sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+def chat_stream_events(message, user_id, role):
+    for event, payload in ai_system.stream_message(message, user_id, role):
+        if event in ('done', 'error'):
+            payload = dict(payload, user_id=user_id, role=role, timestamp=datetime.now().isoformat())
+        yield format_sse(event, payload)
+
+def chat_error_response(error):
+    return {
+        "success": False,
+        "error": "Error procesando mensaje",
+        "response": "Lo siento, tuve un problema. ¿Puedes intentar de nuevo?",
+        "details": str(error)
+    }
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     try:
         if not ai_system:
-            return jsonify({
-                "success": False,
-                "error": "Sistema IA no disponible",
-                "response": "Lo siento, el sistema está temporalmente fuera de servicio."
-            }), 500
+            return jsonify(ai_unavailable_response()), 500
         
-        data = request.get_json()
+        data = request.get_json(silent=True)
+        parsed, error = parse_chat_request(data)
+        if error:
+            return jsonify(error), 400
+        
+        message, user_id, role = parsed
+        if not message:
+            return jsonify(empty_message_response(user_id, role))
+        
+        logger.info(f"Chat - Usuario: {user_id}, Rol: {role}, Mensaje: {message[:50]}...")
         
-        if not data or 'message' not in data:
+        if wants_stream(data, request.headers.get('Accept')):
+            return Response(chat_stream_events(message, user_id, role),
+                            mimetype='text/event-stream', headers=SSE_HEADERS)
+        
+        with trace_request('POST /api/chat') as current:
+            result = ai_system.process_message(message, user_id, role)
+        
+        response_data = chat_response_data(result, user_id, role)
+        if current:
+            response_data["trace_id"] = current.trace.trace_id
+        
+        return jsonify(response_data)
+        
+    except Exception as e:
+        logger.error(f"Error en chat: {e}")
+        return jsonify(chat_error_response(e)), 500
+
+@app.route('/api/chat/batch', methods=['POST'])
+def chat_batch():
+    try:
+        if not ai_system:
+            return jsonify(ai_unavailable_response()), 500
+        
+        data = request.get_json(silent=True)
+        messages = data.get('messages') if isinstance(data, dict) else None
+        
+        if not isinstance(messages, list) or not messages:
             return jsonify({
                 "success": False,
-                "error": "Mensaje requerido",
+                "error": "Lista de mensajes requerida",
                 "example": {
-                    "message": "Hola, ¿cuáles son mis calificaciones?",
+                    "messages": ["¿Cuáles son las estadísticas generales?", "¿Qué alumnos están en riesgo crítico?"],
                     "user_id": 1,
-                    "role": "alumno"
+                    "role": "directivo"
                 }
             }), 400
         
-        message = data['message'].strip()
+        if len(messages) > CHAT_BATCH_MAX_MESSAGES:
+            return jsonify({
+                "success": False,
+                "error": f"Máximo {CHAT_BATCH_MAX_MESSAGES} mensajes por solicitud"
+            }), 400
+        
         user_id = data.get('user_id', 1)
         role = data.get('role', 'alumno')
         
-        if not message:
-            return jsonify({
-                "success": True,
-                "response": "Parece que no escribiste nada. ¿En qué te puedo ayudar?",
-                "intent": "mensaje_vacio",
-                "user_id": user_id,
-                "role": role
-            })
-        
-        logger.info(f"Chat - Usuario: {user_id}, Rol: {role}, Mensaje: {message[:50]}...")
+        logger.info(f"Chat batch - Usuario: {user_id}, Rol: {role}, Mensajes: {len(messages)}")
         
-        result = ai_system.process_message(message, user_id, role)
+        with trace_request('POST /api/chat/batch', messages=len(messages)) as current:
+            batch = ai_system.process_batch([str(message).strip() for message in messages], user_id, role)
         
         response_data = {
-            "success": result["success"],
-            "response": result["response"],
-            "intent": result["intent"],
+            "success": True,
+            "responses": [chat_response_data(result, user_id, role) for result in batch["results"]],
             "user_id": user_id,
             "role": role,
-            "has_data": result.get("has_data", False),
+            "total_messages": len(messages),
+            "queries_executed": batch["queries_executed"],
+            "queries_deduplicated": batch["queries_deduplicated"],
             "timestamp": datetime.now().isoformat()
         }
+        if current:
+            response_data["trace_id"] = current.trace.trace_id
+        
+        return jsonify(response_data)
+        
+    except Exception as e:
+        logger.error(f"Error en chat batch: {e}")
+        return jsonify(chat_error_response(e)), 500
+
+@app.route('/api/dashboard', methods=['GET'])
+def dashboard():
+    try:
+        if not ai_system:
+            return jsonify({
+                "success": False,
+                "error": "Sistema IA no disponible"
+            }), 500
+        
+        role = request.args.get('role', 'alumno')
+        if role != 'directivo':
+            return jsonify({
+                "success": False,
+                "error": "El dashboard está disponible solo para directivos"
+            }), 403
         
-        if result.get("data_count"):
-            response_data["data_count"] = result["data_count"]
+        intents = [intent.strip() for intent in request.args.get('intents', '').split(',') if intent.strip()]
         
-        if result.get("query_executed"):
-            response_data["query_executed"] = True
+        available = ai_system.get_dashboard_intents()
+        unknown = [intent for intent in intents if intent not in available]
+        if unknown:
+            return jsonify({
+                "success": False,
+                "error": f"Secciones no disponibles: {', '.join(unknown)}",
+                "available_intents": available
+            }), 400
         
-        if not result["success"]:
-            response_data["error"] = result.get("error", "Error desconocido")
+        try:
+            timeout = float(request.args['timeout']) if 'timeout' in request.args else None
+        except ValueError:
+            return jsonify({
+                "success": False,
+                "error": "El parámetro 'timeout' debe ser numérico"
+            }), 400
         
-        return jsonify(response_data)
+        if timeout is not None and not 0 < timeout <= 60:
+            return jsonify({
+                "success": False,
+                "error": "El parámetro 'timeout' debe estar entre 0 y 60 segundos"
+            }), 400
+        
+        with trace_request('GET /api/dashboard') as current:
+            result = ai_system.build_dashboard(role, intents or None, timeout)
+        result["role"] = role
+        result["timestamp"] = datetime.now().isoformat()
+        if current:
+            result["trace_id"] = current.trace.trace_id
+        
+        return jsonify(result)
         
     except Exception as e:
-        logger.error(f"Error en chat: {e}")
+        logger.error(f"Error en dashboard: {e}")
         return jsonify({
             "success": False,
-            "error": "Error procesando mensaje",
-            "response": "Lo siento, tuve un problema. ¿Puedes intentar de nuevo?",
-            "details": str(e)
+            "error": str(e)
         }), 500
 
 @app.route('/api/suggestions', methods=['GET'])
@@ -186,13 +361,15 @@ def system_status():
             }), 500
         
         status = ai_system.get_system_status()
+        memory = process_memory_bytes()
         
         return jsonify({
             "success": True,
             "status": status,
             "uptime_check": "OK",
-            "memory_usage": "Normal",
-            "response_time": "< 1s"
+            "uptime_seconds": round(time.time() - ai_system.started_at, 1),
+            "memory_usage": f"{memory / 1024 / 1024:.1f} MB" if memory else "Desconocido",
+            "response_time": ai_system.metrics.stage_summary('total')
         })
         
     except Exception as e:
@@ -202,6 +379,442 @@ def system_status():
             "error": str(e)
         }), 500
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    if not ai_system:
+        return Response("# Sistema IA no inicializado\n", status=500, mimetype='text/plain')
+    return Response(ai_system.metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/training/examples', methods=['POST'])
+def add_training_example():
+    if not _is_admin_request():
+        return jsonify({
+            "success": False,
+            "error": "No autorizado"
+        }), 403
+    
+    try:
+        if not ai_system:
+            return jsonify({
+                "success": False,
+                "error": "Sistema IA no disponible"
+            }), 500
+        
+        data = request.get_json()
+        
+        if not data or not data.get('message') or not data.get('intent'):
+            return jsonify({
+                "success": False,
+                "error": "Campos 'message' e 'intent' requeridos",
+                "example": {
+                    "message": "¿Quiénes necesitan tutoría?",
+                    "intent": "riesgo"
+                }
+            }), 400
+        
+        added = ai_system.add_training_example(data['message'], data['intent'])
+        
+        return jsonify({
+            "success": True,
+            "added": added,
+            "online_training": ai_system.online_trainer is not None
+        })
+        
+    except Exception as e:
+        logger.error(f"Error en training examples: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route('/api/admin/slow-queries', methods=['GET'])
+def slow_queries():
+    if not _is_admin_request():
+        return jsonify({
+            "success": False,
+            "error": "No autorizado"
+        }), 403
+    
+    try:
+        if not ai_system:
+            return jsonify({
+                "success": False,
+                "error": "Sistema IA no disponible"
+            }), 500
+        
+        try:
+            limit = min(max(int(request.args.get('limit', 20)), 1), 200)
+        except ValueError:
+            return jsonify({
+                "success": False,
+                "error": "'limit' debe ser un número"
+            }), 400
+        
+        query_log = ai_system.db.query_log
+        report = query_log.report(limit, request.args.get('sort', 'total'))
+        if request.args.get('reset') in ('1', 'true'):
+            query_log.reset()
+        
+        return jsonify({
+            "success": True,
+            "report": report
+        })
+        
+    except Exception as e:
+        logger.error(f"Error en slow queries: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route('/api/admin/traces', methods=['GET'])
+def list_traces():
+    if not _is_admin_request():
+        return jsonify({
+            "success": False,
+            "error": "No autorizado"
+        }), 403
+    
+    try:
+        if not ai_system:
+            return jsonify({
+                "success": False,
+                "error": "Sistema IA no disponible"
+            }), 500
+        
+        try:
+            limit = min(max(int(request.args.get('limit', 50)), 1), 1000)
+        except ValueError:
+            return jsonify({
+                "success": False,
+                "error": "'limit' debe ser un número"
+            }), 400
+        
+        traces = ai_system.tracer.recent(limit)
+        if request.args.get('format') == 'chrome':
+            return trace_file_response(traces)
+        
+        return jsonify({
+            "success": True,
+            "tracing": ai_system.tracer.get_stats(),
+            "traces": [trace.summary() for trace in traces]
+        })
+        
+    except Exception as e:
+        logger.error(f"Error en traces: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route('/api/admin/traces/<trace_id>', methods=['GET'])
+def get_trace(trace_id):
+    if not _is_admin_request():
+        return jsonify({
+            "success": False,
+            "error": "No autorizado"
+        }), 403
+    
+    if not ai_system:
+        return jsonify({
+            "success": False,
+            "error": "Sistema IA no disponible"
+        }), 500
+    
+    trace = ai_system.tracer.get(trace_id)
+    if trace is None:
+        return jsonify({
+            "success": False,
+            "error": "Traza no encontrada"
+        }), 404
+    
+    if request.args.get('format') == 'chrome':
+        return trace_file_response([trace])
+    
+    return jsonify({
+        "success": True,
+        "trace": trace.to_dict()
+    })
+
+@app.route('/api/admin/traces/export', methods=['POST'])
+def export_traces():
+    if not _is_admin_request():
+        return jsonify({
+            "success": False,
+            "error": "No autorizado"
+        }), 403
+    
+    if not ai_system:
+        return jsonify({
+            "success": False,
+            "error": "Sistema IA no disponible"
+        }), 500
+    
+    # Only the configured path is written, never one taken from the request
+    if not ai_system.tracer.export_path:
+        return jsonify({
+            "success": False,
+            "error": "TRACE_EXPORT_PATH no está configurado"
+        }), 400
+    
+    exported = ai_system.tracer.export()
+    return jsonify({
+        "success": True,
+        "path": ai_system.tracer.export_path,
+        "exported_traces": exported
+    })
+
+@app.route('/api/admin/profile', methods=['POST'])
+def start_profile():
+    if not _is_admin_request():
+        return jsonify({
+            "success": False,
+            "error": "No autorizado"
+        }), 403
+    
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        hz = float(request.args.get('hz', 200))
+    except ValueError:
+        return jsonify({
+            "success": False,
+            "error": "'seconds' y 'hz' deben ser numéricos"
+        }), 400
+    
+    if not 0 < seconds <= 60 or not 1 <= hz <= 1000:
+        return jsonify({
+            "success": False,
+            "error": "'seconds' debe estar entre 0 y 60, 'hz' entre 1 y 1000"
+        }), 400
+    
+    if not profiler.start(seconds, 1.0 / hz, include_idle=request.args.get('idle') in ('1', 'true')):
+        return jsonify({
+            "success": False,
+            "error": "Ya hay un perfil en curso",
+            "profile": profiler.status()
+        }), 409
+    
+    # A sync worker must return to serve the traffic being sampled; threaded
+    # and ASGI servers can wait for the result instead
+    if request.args.get('wait') in ('1', 'true'):
+        profiler.wait(seconds + 5)
+        return profile_response()
+    
+    return jsonify({
+        "success": True,
+        "profile": profiler.status()
+    }), 202
+
+@app.route('/api/admin/profile', methods=['GET'])
+def get_profile():
+    if not _is_admin_request():
+        return jsonify({
+            "success": False,
+            "error": "No autorizado"
+        }), 403
+    
+    if profiler.running:
+        return jsonify({
+            "success": True,
+            "profile": profiler.status()
+        }), 202
+    
+    return profile_response()
+
+def profile_response():
+    result = profiler.result
+    if result is None:
+        return jsonify({
+            "success": False,
+            "error": "No hay perfiles registrados"
+        }), 404
+    
+    if request.args.get('format', 'collapsed') == 'collapsed':
+        return Response(collapsed(result['stacks']), mimetype='text/plain')
+    
+    summary = {key: value for key, value in result.items() if key != 'stacks'}
+    summary['top_stacks'] = [{"stack": stack, "samples": count}
+                             for stack, count in result['stacks'].most_common(50)]
+    return jsonify({
+        "success": True,
+        "profile": summary
+    })
+
+@app.route('/api/admin/memory', methods=['GET'])
+def memory_status():
+    if not _is_admin_request():
+        return jsonify({
+            "success": False,
+            "error": "No autorizado"
+        }), 403
+    
+    try:
+        return jsonify({
+            "success": True,
+            "tracemalloc": memory_diagnostics.status(),
+            "stores": ai_system.get_memory_stats() if ai_system else None
+        })
+        
+    except Exception as e:
+        logger.error(f"Error en memory status: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route('/api/admin/memory/start', methods=['POST'])
+def start_memory_tracing():
+    if not _is_admin_request():
+        return jsonify({
+            "success": False,
+            "error": "No autorizado"
+        }), 403
+    
+    try:
+        frames = min(max(int(request.args.get('frames', memory_diagnostics.frames)), 1), 50)
+    except ValueError:
+        return jsonify({
+            "success": False,
+            "error": "'frames' debe ser un número"
+        }), 400
+    
+    started = memory_diagnostics.start(frames)
+    return jsonify({
+        "success": True,
+        "started": started,
+        "tracemalloc": memory_diagnostics.status()
+    })
+
+@app.route('/api/admin/memory/stop', methods=['POST'])
+def stop_memory_tracing():
+    if not _is_admin_request():
+        return jsonify({
+            "success": False,
+            "error": "No autorizado"
+        }), 403
+    
+    return jsonify({
+        "success": True,
+        "stopped": memory_diagnostics.stop()
+    })
+
+@app.route('/api/admin/memory/snapshots', methods=['POST'])
+def take_memory_snapshot():
+    if not _is_admin_request():
+        return jsonify({
+            "success": False,
+            "error": "No autorizado"
+        }), 403
+    
+    group_by, limit, error = memory_query_args(20)
+    if error:
+        return error
+    
+    snapshot = memory_diagnostics.take_snapshot(request.args.get('label', ''), group_by, limit)
+    if snapshot is None:
+        return jsonify({
+            "success": False,
+            "error": "tracemalloc no está activo; use /api/admin/memory/start"
+        }), 409
+    
+    return jsonify({
+        "success": True,
+        "snapshot": snapshot
+    })
+
+@app.route('/api/admin/memory/snapshots/<int:snapshot_id>', methods=['DELETE'])
+def delete_memory_snapshot(snapshot_id):
+    if not _is_admin_request():
+        return jsonify({
+            "success": False,
+            "error": "No autorizado"
+        }), 403
+    
+    if not memory_diagnostics.delete_snapshot(snapshot_id):
+        return jsonify({
+            "success": False,
+            "error": "Snapshot no encontrado"
+        }), 404
+    
+    return jsonify({
+        "success": True
+    })
+
+@app.route('/api/admin/memory/diff', methods=['GET'])
+def memory_diff():
+    if not _is_admin_request():
+        return jsonify({
+            "success": False,
+            "error": "No autorizado"
+        }), 403
+    
+    group_by, limit, error = memory_query_args(25)
+    if error:
+        return error
+    
+    try:
+        first = int(request.args['from'])
+        second = int(request.args['to']) if 'to' in request.args else None
+    except (KeyError, ValueError):
+        return jsonify({
+            "success": False,
+            "error": "'from' es requerido y 'from'/'to' deben ser ids de snapshot",
+            "snapshots": memory_diagnostics.status()['snapshots']
+        }), 400
+    
+    diff = memory_diagnostics.diff(first, second, group_by, limit)
+    if diff is None:
+        return jsonify({
+            "success": False,
+            "error": "Snapshot no encontrado o tracemalloc inactivo",
+            "snapshots": memory_diagnostics.status()['snapshots']
+        }), 404
+    
+    return jsonify({
+        "success": True,
+        "diff": diff
+    })
+
+@app.route('/api/admin/memory/objects', methods=['GET'])
+def memory_objects():
+    if not _is_admin_request():
+        return jsonify({
+            "success": False,
+            "error": "No autorizado"
+        }), 403
+    
+    _, limit, error = memory_query_args(20)
+    if error:
+        return error
+    
+    return jsonify({
+        "success": True,
+        "objects": object_counts(limit),
+        "stores": ai_system.get_memory_stats() if ai_system else None
+    })
+
+def memory_query_args(default_limit):
+    group_by = request.args.get('group_by', 'lineno')
+    if group_by not in GROUP_BY:
+        return None, None, (jsonify({
+            "success": False,
+            "error": f"'group_by' debe ser uno de: {', '.join(GROUP_BY)}"
+        }), 400)
+    
+    try:
+        limit = min(max(int(request.args.get('limit', default_limit)), 1), 200)
+    except ValueError:
+        return None, None, (jsonify({
+            "success": False,
+            "error": "'limit' debe ser un número"
+        }), 400)
+    
+    return group_by, limit, None
+
+def trace_file_response(traces):
+    return Response(json.dumps(chrome_trace(traces), default=str), mimetype='application/json',
+                    headers={'Content-Disposition': 'attachment; filename=traces.json'})
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({
@@ -211,8 +824,11 @@ def not_found(error):
             "/",
             "/api/test",
             "/api/chat",
+            "/api/chat/batch",
+            "/api/dashboard",
             "/api/suggestions",
-            "/api/status"
+            "/api/status",
+            "/api/metrics"
         ]
     }), 404
 
@@ -0,0 +1,311 @@
+import os
+import sys
+import io
+import json
+import asyncio
+import logging
+from urllib.parse import parse_qs
+
+from app import (
+    app as flask_app,
+    ai_system,
+    ai_unavailable_response,
+    parse_chat_request,
+    empty_message_response,
+    chat_response_data,
+    chat_error_response,
+    wants_stream,
+    chat_stream_events,
+    is_admin_token,
+    SSE_HEADERS
+)
+from models.chat_session import ChatSession
+from utils.profiler import run_untagged
+
+logger = logging.getLogger(__name__)
+
+# Async entry point alongside the Flask app: /api/chat awaits the DB round trip
+# on the event loop, so one process holds many in-flight chats; every other
+# route runs through the Flask app on the loop's default thread pool.
+# Run with: uvicorn asgi:app --host 0.0.0.0 --port $PORT
+
+MAX_BODY_BYTES = int(os.environ.get('ASGI_MAX_BODY_BYTES', 1024 * 1024))
+WS_MAX_MESSAGE_BYTES = int(os.environ.get('WS_MAX_MESSAGE_BYTES', 16 * 1024))
+
+# Streams past the limit wait here, on the loop, rather than on a thread
+# blocked in connect()
+STREAM_SLOTS = asyncio.Semaphore(ai_system.db.max_streams) if ai_system else None
+
+class RequestTooLarge(Exception):
+    pass
+
+async def read_body(receive) -> bytes:
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise RequestTooLarge()
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            break
+    return b''.join(chunks)
+
+async def send_response(send, status: int, body: bytes, headers):
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+async def send_json(send, payload, status: int = 200):
+    body = json.dumps(payload, default=str).encode('utf-8')
+    await send_response(send, status, body, [
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(body)).encode('latin-1')),
+        (b'access-control-allow-origin', b'*')
+    ])
+
+async def chat(scope, receive, send):
+    try:
+        if not ai_system:
+            await send_json(send, ai_unavailable_response(), 500)
+            return
+
+        try:
+            data = json.loads(await read_body(receive) or b'null')
+        except RequestTooLarge:
+            await send_json(send, {"success": False, "error": "Mensaje demasiado grande"}, 413)
+            return
+        except ValueError:
+            data = None
+
+        parsed, error = parse_chat_request(data)
+        if error:
+            await send_json(send, error, 400)
+            return
+
+        message, user_id, role = parsed
+        if not message:
+            await send_json(send, empty_message_response(user_id, role))
+            return
+
+        logger.info(f"Chat - Usuario: {user_id}, Rol: {role}, Mensaje: {message[:50]}...")
+
+        headers = dict(scope.get('headers', []))
+        accept = headers.get(b'accept', b'').decode('latin-1')
+        if wants_stream(data, accept):
+            await stream_chat(receive, send, message, user_id, role)
+            return
+
+        force = (headers.get(b'x-trace') == b'1'
+                 and is_admin_token(headers.get(b'x-admin-token', b'').decode('latin-1')))
+        with ai_system.tracer.trace('POST /api/chat', force=force) as current:
+            result = await ai_system.process_message_async(message, user_id, role)
+
+        response_data = chat_response_data(result, user_id, role)
+        if current:
+            response_data["trace_id"] = current.trace.trace_id
+        await send_json(send, response_data)
+
+    except Exception as e:
+        logger.error(f"Error en chat: {e}")
+        await send_json(send, chat_error_response(e), 500)
+
+async def stream_chat(receive, send, message, user_id, role):
+    # The event generator reads from a streaming cursor, so each step runs on
+    # the stream executor, untagged afterwards since the next step may land on
+    # another thread; a disconnect stops it and returns the connection
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', b'text/event-stream; charset=utf-8'),
+        (b'access-control-allow-origin', b'*'),
+        *((name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in SSE_HEADERS.items())
+    ]})
+
+    loop = asyncio.get_running_loop()
+    executor = ai_system.db.stream_executor
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    async with STREAM_SLOTS:
+        events = chat_stream_events(message, user_id, role)
+        try:
+            while not disconnected.done():
+                chunk = await loop.run_in_executor(executor, run_untagged, next, events, None)
+                if chunk is None:
+                    break
+                await send({'type': 'http.response.body', 'body': chunk.encode('utf-8'), 'more_body': True})
+        except Exception as e:
+            # Headers are already sent, so the stream just ends early
+            logger.error(f"Error en chat stream: {e}")
+        finally:
+            if not disconnected.done():
+                await send({'type': 'http.response.body', 'body': b''})
+            disconnected.cancel()
+            await loop.run_in_executor(executor, run_untagged, events.close)
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+async def chat_socket(scope, receive, send):
+    # /ws/chat?user_id=1&role=directivo binds the user once; each text frame is
+    # a message and answers are pushed as they complete, tagged with their id
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    if not ai_system:
+        await send({'type': 'websocket.close', 'code': 1011})
+        return
+
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    user_id = query.get('user_id', ['1'])[0]
+    user_id = int(user_id) if user_id.isdigit() else user_id
+    role = query.get('role', ['alumno'])[0]
+
+    session = await ai_system.run_context_io(ChatSession.from_environment, ai_system, user_id, role)
+    await send({'type': 'websocket.accept'})
+    logger.info(f"WebSocket - Usuario: {user_id}, Rol: {role}")
+
+    send_lock = asyncio.Lock()
+    tasks = set()
+
+    async def push(payload):
+        async with send_lock:
+            await send({'type': 'websocket.send', 'text': json.dumps(payload, default=str)})
+
+    async def answer(request_id, message):
+        try:
+            with ai_system.tracer.trace('WS /ws/chat', request_id=request_id) as current:
+                result = await session.process(message)
+            payload = chat_response_data(result, user_id, role)
+            if current:
+                payload["trace_id"] = current.trace.trace_id
+        except Exception as e:
+            logger.error(f"Error en chat WebSocket: {e}")
+            payload = chat_error_response(e)
+        try:
+            payload["id"] = request_id
+            await push(payload)
+        except Exception as e:
+            logger.error(f"Error enviando respuesta WebSocket: {e}")
+        finally:
+            session.slots.release()
+
+    try:
+        while True:
+            await session.slots.acquire()
+            event = await receive()
+            if event['type'] == 'websocket.disconnect':
+                break
+
+            text = event.get('text')
+            if text is None:
+                text = (event.get('bytes') or b'').decode('utf-8', 'replace')
+            if len(text) > WS_MAX_MESSAGE_BYTES:
+                session.slots.release()
+                await push({"success": False, "error": "Mensaje demasiado grande"})
+                continue
+
+            task = asyncio.ensure_future(answer(*session.parse_frame(text)))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    finally:
+        for task in tasks:
+            task.cancel()
+        logger.info(f"WebSocket cerrado - Usuario: {user_id}, {session.stats}")
+
+def build_environ(scope, body: bytes):
+    raw_path = scope.get('raw_path') or scope['path'].encode('utf-8')
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': raw_path.split(b'?', 1)[0].decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': str(client[0]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+
+    for name, value in scope.get('headers', []):
+        # The body is already buffered, so CONTENT_LENGTH comes from its size
+        key = name.decode('latin-1').upper().replace('-', '_')
+        if key == 'CONTENT_LENGTH':
+            continue
+        if key != 'CONTENT_TYPE':
+            key = f"HTTP_{key}"
+        value = value.decode('latin-1')
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+
+    return environ
+
+def run_wsgi(environ):
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        if exc_info and response:
+            raise exc_info[1].with_traceback(exc_info[2])
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                               for name, value in headers]
+
+    iterable = flask_app(environ, start_response)
+    try:
+        body = b''.join(iterable)
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
+    return response['status'], response['headers'], body
+
+async def call_flask(scope, receive, send):
+    try:
+        body = await read_body(receive)
+    except RequestTooLarge:
+        await send_json(send, {"success": False, "error": "Solicitud demasiado grande"}, 413)
+        return
+
+    loop = asyncio.get_running_loop()
+    status, headers, body = await loop.run_in_executor(None, run_wsgi, build_environ(scope, body))
+    await send_response(send, status, body, headers)
+
+async def lifespan(scope, receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if ai_system:
+                ai_system.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+ROUTES = {
+    ('POST', '/api/chat'): chat
+}
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await lifespan(scope, receive, send)
+        return
+    if scope['type'] == 'websocket':
+        if scope['path'] == '/ws/chat':
+            await chat_socket(scope, receive, send)
+        else:
+            await receive()
+            await send({'type': 'websocket.close', 'code': 1008})
+        return
+    if scope['type'] != 'http':
+        return
+
+    handler = ROUTES.get((scope['method'], scope['path']), call_flask)
+    await handler(scope, receive, send)
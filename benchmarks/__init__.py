@@ -0,0 +1,67 @@
+import time
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from training.training_data import get_all_training_data
+
+DIRECTIVO_MESSAGES = [
+    "¿Cuáles son las estadísticas generales?",
+    "¿Qué alumnos tienen las calificaciones más bajas?",
+    "¿Qué alumnos están en riesgo crítico?",
+    "¿Dónde está ubicado el grupo ISW-301?",
+    "¿A qué hora tiene clases el grupo ISW-301?",
+    "¿Qué grupos están llenos o cerca del límite?",
+    "¿Cómo va el rendimiento por carreras?",
+    "¿Qué profesores están sobrecargados?",
+    "¿Cuáles son las materias más reprobadas?",
+    "¿Qué solicitudes de ayuda están urgentes?",
+    "Información de matrícula 202412345",
+    "¿Cuántos alumnos, profesores y grupos hay?",
+    "necesito un reporte detallado de alumnos inactivos",
+    "grupos"
+]
+
+# What every simulated query returns unless a benchmark needs bigger results
+ROWS = [{"total": 1, "nombre": "Carrera", "promedio": 8.5}]
+
+def sample_messages() -> List[str]:
+    return DIRECTIVO_MESSAGES + [text for text, _ in get_all_training_data()]
+
+def cpu_time(fn: Callable[[], None], repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.process_time()
+        fn()
+        best = min(best, time.process_time() - start)
+    return best
+
+def report(title: str, rows: List[Tuple[str, str]]):
+    print(title)
+    width = max(len(label) for label, _ in rows)
+    for label, value in rows:
+        print(f"  {label.ljust(width)}  {value}")
+
+def stub_db(ai, latency: Union[float, Dict[str, float]] = 0.0, rows: Optional[List[dict]] = None,
+            on_query: Optional[Callable[[str], None]] = None):
+    # Replaces MySQL with a fixed result after a sleep, which may be set per
+    # intent; on_query sees the intent of every query
+    rows = ROWS if rows is None else rows
+
+    def execute_query(query, params=None, intent=None):
+        if on_query is not None:
+            on_query(intent)
+        delay = latency.get(intent, 0.0) if isinstance(latency, dict) else latency
+        if delay:
+            time.sleep(delay)
+        return rows
+
+    ai.db.execute_query = execute_query
+    return execute_query
+
+def throughput(ai, seconds: float, users: int = 1) -> float:
+    # Messages per second through process_message on the calling thread
+    done = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        ai.process_message(DIRECTIVO_MESSAGES[done % len(DIRECTIVO_MESSAGES)], 1 + done % users, 'directivo')
+        done += 1
+    return done / seconds
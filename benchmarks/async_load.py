@@ -0,0 +1,104 @@
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault('DB_HOST', '127.0.0.1')
+
+from benchmarks import DIRECTIVO_MESSAGES, report, stub_db
+import asgi
+
+# MySQL is replaced by a fixed sleep per query so the comparison measures how
+# each path waits on the database, not the database itself
+DB_LATENCY = float(os.environ.get('LOAD_TEST_DB_LATENCY_MS', 20)) / 1000
+REQUESTS = int(os.environ.get('LOAD_TEST_REQUESTS', 400))
+CONCURRENCY = int(os.environ.get('LOAD_TEST_CONCURRENCY', 200))
+
+in_flight = 0
+peak_in_flight = 0
+
+def chat_body(i):
+    return json.dumps({
+        "message": DIRECTIVO_MESSAGES[i % len(DIRECTIVO_MESSAGES)],
+        "user_id": i % 50,
+        "role": "directivo"
+    }).encode('utf-8')
+
+def chat_scope():
+    return {
+        'type': 'http', 'method': 'POST', 'path': '/api/chat', 'raw_path': b'/api/chat',
+        'query_string': b'', 'http_version': '1.1', 'scheme': 'http', 'root_path': '',
+        'server': ('127.0.0.1', 8000), 'client': ('127.0.0.1', 50000),
+        'headers': [(b'content-type', b'application/json')]
+    }
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] * 1000
+
+def run_sync():
+    # One gunicorn sync worker: each request holds the process for its query
+    latencies = []
+    start = time.perf_counter()
+    for i in range(REQUESTS):
+        environ = asgi.build_environ(chat_scope(), chat_body(i))
+        began = time.perf_counter()
+        status, _, _ = asgi.run_wsgi(environ)
+        latencies.append(time.perf_counter() - began)
+        assert status == 200
+    return REQUESTS / (time.perf_counter() - start), latencies
+
+async def one_async(i, latencies, semaphore):
+    global in_flight, peak_in_flight
+    async with semaphore:
+        body = chat_body(i)
+        sent = []
+        delivered = False
+
+        async def receive():
+            nonlocal delivered
+            if delivered:
+                return {'type': 'http.disconnect'}
+            delivered = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        async def send(message):
+            sent.append(message)
+
+        in_flight += 1
+        peak_in_flight = max(peak_in_flight, in_flight)
+        began = time.perf_counter()
+        await asgi.app(chat_scope(), receive, send)
+        latencies.append(time.perf_counter() - began)
+        in_flight -= 1
+        assert sent[0]['status'] == 200
+
+async def run_async():
+    latencies = []
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    start = time.perf_counter()
+    await asyncio.gather(*(one_async(i, latencies, semaphore) for i in range(REQUESTS)))
+    return REQUESTS / (time.perf_counter() - start), latencies
+
+def main():
+    if asgi.ai_system is None:
+        raise SystemExit("ConversationAI failed to initialise")
+    stub_db(asgi.ai_system, DB_LATENCY)
+
+    sync_throughput, sync_latencies = run_sync()
+    async_throughput, async_latencies = asyncio.run(run_async())
+    pool_size = asgi.ai_system.db.pool_size
+
+    report(f"Chat load test ({REQUESTS} requests, {DB_LATENCY * 1000:.0f} ms simulated query, "
+           f"DB_POOL_SIZE={pool_size})", [
+        ("sync (1 worker)", f"{sync_throughput:,.0f} req/s, p50 {percentile(sync_latencies, 0.5):.1f} ms, "
+                            f"p99 {percentile(sync_latencies, 0.99):.1f} ms"),
+        (f"async (concurrency {CONCURRENCY})", f"{async_throughput:,.0f} req/s, "
+                                              f"p50 {percentile(async_latencies, 0.5):.1f} ms, "
+                                              f"p99 {percentile(async_latencies, 0.99):.1f} ms"),
+        ("peak in-flight chats", f"{peak_in_flight} (queries run {pool_size} at a time)"),
+        ("speedup", f"{async_throughput / sync_throughput:.1f}x")
+    ])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+import os
+import threading
+import time
+
+os.environ.setdefault('DB_HOST', '127.0.0.1')
+
+from benchmarks import DIRECTIVO_MESSAGES, report, stub_db
+import app
+
+# MySQL is replaced by a fixed sleep per query, counted to show the round trips
+DB_LATENCY = float(os.environ.get('LOAD_TEST_DB_LATENCY_MS', 20)) / 1000
+ROUNDS = 10
+DASHBOARD = DIRECTIVO_MESSAGES[:8] + DIRECTIVO_MESSAGES[:2]
+
+queries = 0
+queries_lock = threading.Lock()
+
+def count_query(intent):
+    global queries
+    with queries_lock:
+        queries += 1
+
+def run(fn):
+    global queries
+    queries = 0
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn()
+    return (time.perf_counter() - start) / ROUNDS * 1000, queries / ROUNDS
+
+def main():
+    if app.ai_system is None:
+        raise SystemExit("ConversationAI failed to initialise")
+    stub_db(app.ai_system, DB_LATENCY, on_query=count_query)
+    client = app.app.test_client()
+
+    def separate():
+        for message in DASHBOARD:
+            assert client.post('/api/chat', json={"message": message, "role": "directivo"}).status_code == 200
+
+    def batch():
+        response = client.post('/api/chat/batch', json={"messages": DASHBOARD, "role": "directivo"})
+        assert response.status_code == 200 and len(response.json["responses"]) == len(DASHBOARD)
+
+    separate_ms, separate_queries = run(separate)
+    batch_ms, batch_queries = run(batch)
+
+    report(f"Dashboard page load ({len(DASHBOARD)} questions, {DB_LATENCY * 1000:.0f} ms simulated query)", [
+        ("separate /api/chat calls", f"{separate_ms:.1f} ms, {len(DASHBOARD)} requests, {separate_queries:.0f} queries"),
+        ("one /api/chat/batch call", f"{batch_ms:.1f} ms, 1 request, {batch_queries:.0f} queries"),
+        ("speedup", f"{separate_ms / batch_ms:.1f}x")
+    ])
+
+if __name__ == '__main__':
+    main()
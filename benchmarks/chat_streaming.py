@@ -0,0 +1,76 @@
+import datetime
+import os
+import time
+import tracemalloc
+
+os.environ.setdefault('DB_HOST', '127.0.0.1')
+
+from benchmarks import report
+import app
+
+# MySQL is replaced by a cursor that delivers rows in batches with a small
+# network delay per batch
+ROWS = int(os.environ.get('STREAM_TEST_ROWS', 20000))
+BATCH = 100
+BATCH_DELAY = 0.002
+MESSAGES = {
+    'horarios_grupos': "horarios de todos los grupos",
+    'grupos_detalle': "detalles de los grupos"
+}
+DAYS = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado']
+
+def make_row(intent, i):
+    if intent == 'horarios_grupos':
+        return {'dia_semana': DAYS[i * len(DAYS) // ROWS], 'hora_inicio': datetime.timedelta(hours=7 + i % 12),
+                'hora_fin': datetime.timedelta(hours=8 + i % 12), 'grupo': f"ISW-{i}", 'carrera': 'Ingeniería',
+                'aula': f"A{i % 40}", 'asignatura': 'Programación', 'profesor': 'Profesor', 'alumnos_en_grupo': 30}
+    return {'grupo': f"ISW-{i}", 'carrera': f"Carrera {i * 8 // ROWS}", 'cuatrimestre': 1 + i % 9,
+            'capacidad_maxima': 35, 'alumnos_inscritos': i % 36, 'porcentaje_ocupacion': round(i % 36 * 100 / 35, 1),
+            'tutor': 'Tutor', 'promedio_grupo': 8.4}
+
+def simulated_cursor(intent):
+    for start in range(0, ROWS, BATCH):
+        time.sleep(BATCH_DELAY)
+        for i in range(start, min(start + BATCH, ROWS)):
+            yield make_row(intent, i)
+
+def measure(run):
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = run()
+    total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return (first - start) * 1000, total * 1000, peak / 1024
+
+def main():
+    if app.ai_system is None:
+        raise SystemExit("ConversationAI failed to initialise")
+    db = app.ai_system.db
+    rows = []
+
+    for intent, message in MESSAGES.items():
+        db.execute_query = lambda *args, **kwargs: list(simulated_cursor(intent))
+        db.stream_query = lambda *args, **kwargs: simulated_cursor(intent)
+
+        def buffered():
+            result = app.chat_response_data(app.ai_system.process_message(message, 1, 'directivo'), 1, 'directivo')
+            app.json.dumps(result)
+            return time.perf_counter()
+
+        def streamed():
+            first = None
+            for event in app.chat_stream_events(message, 1, 'directivo'):
+                if first is None and event.startswith('event: chunk'):
+                    first = time.perf_counter()
+            return first
+
+        for label, run in (("buffered", buffered), ("SSE", streamed)):
+            first_ms, total_ms, peak_kib = measure(run)
+            rows.append((f"{intent} {label}", f"first byte {first_ms:.1f} ms, total {total_ms:.1f} ms, "
+                                              f"peak {peak_kib:,.0f} KiB"))
+
+    report(f"Streaming chat responses ({ROWS} rows, {BATCH}-row batches every {BATCH_DELAY * 1000:.0f} ms)", rows)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from benchmarks import report
+from models.context_store import ShardedContextStore
+
+THREADS = 32
+USERS = 500
+OPERATIONS_PER_THREAD = 4000
+SWITCH_INTERVAL = 1e-6
+
+def hammer(store, seed, counts, barrier):
+    rng = random.Random(seed)
+    local = Counter()
+    barrier.wait()
+    for i in range(OPERATIONS_PER_THREAD):
+        user_id = rng.randrange(USERS)
+        operation = rng.random()
+        if operation < 0.6:
+            store.record(user_id, f"mensaje {i}", 'saludo', 'respuesta')
+            local[user_id] += 1
+        elif operation < 0.9:
+            context = store.get(user_id)
+            if context is not None:
+                context.get('last_intent')
+        else:
+            store.summary(user_id)
+    counts.append(local)
+
+def run(shards):
+    store = ShardedContextStore(shards=shards, max_entries=USERS * 2, max_idle_seconds=3600)
+    counts = []
+    barrier = threading.Barrier(THREADS + 1)
+    threads = [threading.Thread(target=hammer, args=(store, seed, counts, barrier)) for seed in range(THREADS)]
+    for thread in threads:
+        thread.start()
+
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    expected = sum(counts, Counter())
+    lost = sum(abs(expected[user_id] - (store.get(user_id).turns if store.get(user_id) else 0))
+               for user_id in range(USERS))
+    overflowing = sum(len(store.get(user_id).messages) > 5 for user_id in expected)
+    return store.get_stats(), THREADS * OPERATIONS_PER_THREAD / elapsed, lost, overflowing
+
+def main():
+    sys.setswitchinterval(SWITCH_INTERVAL)
+    rows = []
+    for shards in (1, 16, 64):
+        stats, throughput, lost, overflowing = run(shards)
+        lock = stats['lock']
+        rows += [
+            (f"{shards:>2} shard(s) throughput", f"{throughput:,.0f} ops/s"),
+            (f"{shards:>2} shard(s) contention", f"{lock['contention_rate'] * 100:.2f}% of "
+                                                 f"{lock['acquisitions']} acquisitions, "
+                                                 f"{lock['wait_ms']:.1f} ms waiting, "
+                                                 f"busiest shard {lock['busiest_shard_contended']}"),
+            (f"{shards:>2} shard(s) lost updates", f"{lost} (histories over 5: {overflowing})")
+        ]
+
+    report(f"Context store stress ({THREADS} threads x {OPERATIONS_PER_THREAD} ops over {USERS} users)", rows)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import os
+import time
+
+os.environ.setdefault('DB_HOST', '127.0.0.1')
+
+from benchmarks import report, stub_db
+import app
+
+# MySQL is replaced by a per-template sleep; capacidad_grupos is made slow to
+# show a section timing out while the rest of the dashboard is returned
+LATENCY = {
+    'estadisticas_generales': 0.04,
+    'alumnos_riesgo': 0.06,
+    'materias_criticas': 0.05,
+    'capacidad_grupos': 0.5
+}
+TIMEOUT = 0.2
+
+def main():
+    if app.ai_system is None:
+        raise SystemExit("ConversationAI failed to initialise")
+    stub_db(app.ai_system, LATENCY)
+    client = app.app.test_client()
+
+    start = time.perf_counter()
+    for intent in LATENCY:
+        app.ai_system.build_dashboard('directivo', [intent], timeout=1.0)
+    sequential_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    response = client.get(f'/api/dashboard?role=directivo&timeout={TIMEOUT}').json
+    dashboard_ms = (time.perf_counter() - start) * 1000
+
+    rows = [("four sequential sections", f"{sequential_ms:.1f} ms"),
+            (f"/api/dashboard (timeout {TIMEOUT} s)", f"{dashboard_ms:.1f} ms, "
+                                                     f"{response['completed_sections']}/{response['total_sections']} "
+                                                     f"sections, partial={response['partial']}")]
+    rows += [(f"  {section['intent']}", f"{section['status']} after {section['latency_ms']:.1f} ms")
+             for section in response['sections']]
+    report(f"Directivo dashboard ({len(LATENCY)} sections, simulated queries)", rows)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+from benchmarks import cpu_time, report, sample_messages
+from utils.cascade_classifier import CascadeIntentClassifier
+from utils.intent_classifier import IntentClassifier
+from utils.message_analysis import MessageAnalysis
+from utils.text_processor import TextProcessor
+
+ITERATIONS = 50
+TOP_K = 5
+
+# Follow-ups must keep resolving against the previous intent exactly as the
+# keyword classifier does, not be claimed by a loosely similar example
+FOLLOW_UPS = ["mas detalles", "más detalles", "más información", "otro", "siguiente", "si", "no gracias"]
+FOLLOW_UP_CONTEXT = {'last_intent': 'estadisticas_generales'}
+
+def main():
+    messages = sample_messages()
+    analyses = [MessageAnalysis.from_message(message) for message in messages]
+    cascade = CascadeIntentClassifier(model_path=None)
+    index = cascade.example_index
+    corpus = list(zip(index.texts, index.intents))
+    processor = TextProcessor()
+    total = len(messages) * ITERATIONS
+
+    def run_pairwise():
+        for _ in range(ITERATIONS):
+            for message in messages:
+                sorted(((processor.similarity_score(message, text), text) for text, _ in corpus),
+                       reverse=True)[:TOP_K]
+
+    def run_index():
+        for _ in range(ITERATIONS):
+            for analysis in analyses:
+                index.search(analysis, TOP_K)
+
+    disagreements = 0
+    for message, analysis in zip(messages, analyses):
+        expected = max(processor.similarity_score(message, text) for text, _ in corpus)
+        matches = index.search(analysis, 1)
+        if abs((matches[0].similarity if matches else 0.0) - expected) > 1e-9:
+            disagreements += 1
+
+    keywords = IntentClassifier()
+    follow_up_mismatches = [message for message in FOLLOW_UPS
+                            if cascade.classify_intent(message, FOLLOW_UP_CONTEXT)
+                            != keywords.classify_intent(message, FOLLOW_UP_CONTEXT)]
+
+    pairwise = cpu_time(run_pairwise, repeat=3)
+    indexed = cpu_time(run_index, repeat=3)
+
+    report(f"Nearest-example lookup ({len(corpus)} examples, {total} queries, top-{TOP_K})", [
+        ("pairwise similarity_score scan", f"{pairwise / total * 1e6:.1f} us/msg"),
+        ("inverted index", f"{indexed / total * 1e6:.1f} us/msg"),
+        ("speedup", f"{pairwise / indexed:.1f}x"),
+        ("best-score disagreements", f"{disagreements}/{len(messages)}"),
+        ("follow-ups taken from context", f"{len(FOLLOW_UPS) - len(follow_up_mismatches)}/{len(FOLLOW_UPS)}")
+    ])
+    if follow_up_mismatches:
+        print(f"  follow-up mismatches: {follow_up_mismatches}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ('pandas', 'sklearn', 'scipy', 'joblib')
+BUDGET_MS = float(os.environ.get('IMPORT_BUDGET_MS', 1000))
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import app
+elapsed = (time.perf_counter() - start) * 1000
+heavy = sorted({name.split('.')[0] for name in sys.modules} & set(sys.argv[1].split(',')))
+print(f"{elapsed:.1f}|{','.join(heavy)}")
+"""
+
+def measure():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE, ','.join(HEAVY_MODULES)],
+        cwd=root, capture_output=True, text=True, check=True
+    ).stdout.strip().splitlines()[-1]
+    elapsed, heavy = output.split('|')
+    return float(elapsed), [name for name in heavy.split(',') if name]
+
+def main():
+    elapsed, heavy = measure()
+    print(f"import app: {elapsed:.1f} ms (budget {BUDGET_MS:.0f} ms)")
+
+    failures = []
+    if heavy:
+        failures.append(f"training stack imported at startup: {', '.join(heavy)}")
+    if elapsed > BUDGET_MS:
+        failures.append(f"startup import took {elapsed:.1f} ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import os
+import tempfile
+import time
+
+from benchmarks import report, sample_messages
+from training.train_model import AIModelTrainer
+from utils.intent_model import IntentModelPredictor
+
+ITERATIONS = 20
+
+def per_message_us(fn, messages) -> float:
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        for message in messages:
+            fn(message)
+    return (time.perf_counter() - start) / (ITERATIONS * len(messages)) * 1e6
+
+def main():
+    trainer = AIModelTrainer()
+    trainer.train_model(validation=False)
+
+    def sklearn_predict(message):
+        vectorized = trainer.vectorizer.transform([trainer.processor.clean_text(message)])
+        return trainer.model.predict_proba(vectorized)[0]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base = os.path.join(tmp, 'model')
+        trainer.save_model(base)
+        start = time.perf_counter()
+        predictor = IntentModelPredictor.from_artifact(f'{base}_intent.bin')
+        load_ms = (time.perf_counter() - start) * 1000
+        artifact_bytes = os.path.getsize(f'{base}_intent.bin')
+
+        parity = trainer.check_inference_parity(predictor)
+        messages = sample_messages()
+
+        sklearn_us = per_message_us(sklearn_predict, messages)
+        numpy_us = per_message_us(predictor.predict_proba, messages)
+
+    report("Intent model inference", [
+        ("artifact size", f"{artifact_bytes / 1024:.1f} KiB"),
+        ("artifact load (mmap + verify)", f"{load_ms:.2f} ms"),
+        ("parity mismatches", f"{parity['mismatches']}/{parity['examples']}"),
+        ("max probability diff", f"{parity['max_probability_diff']:.2e}"),
+        ("sklearn transform + predict_proba", f"{sklearn_us:.1f} us/msg"),
+        ("numpy predictor", f"{numpy_us:.1f} us/msg"),
+        ("speedup", f"{sklearn_us / numpy_us:.1f}x")
+    ])
+
+if __name__ == '__main__':
+    main()
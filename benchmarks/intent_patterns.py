@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import time
+
+from benchmarks import cpu_time, report, sample_messages
+from utils.intent_patterns import DEFAULT_PATTERNS_PATH, IntentPatternStore
+from utils.message_analysis import MessageAnalysis
+
+ITERATIONS = 100
+
+def naive_score(intent_patterns, message):
+    best_intent, highest_score = None, 0
+    for intent, pattern_data in intent_patterns.items():
+        keywords = pattern_data['keywords']
+        matches = sum(1 for keyword in keywords if keyword in message)
+        if not matches:
+            continue
+        score = (matches / len(keywords)) * (pattern_data.get('priority', 1) / 10)
+        score += 0.2 if matches > 1 else 0
+        score += 0.5 if any(keyword == message.strip() for keyword in keywords) else 0
+        score = min(score, 1.0)
+        if score > highest_score:
+            best_intent, highest_score = intent, score
+    return best_intent, highest_score
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'intent_patterns.json')
+        shutil.copy(DEFAULT_PATTERNS_PATH, source)
+
+        start = time.perf_counter()
+        IntentPatternStore(source)
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        store = IntentPatternStore(source)
+        load_ms = (time.perf_counter() - start) * 1000
+        artifact_bytes = os.path.getsize(store.compiled_path)
+
+    patterns = store.current
+    messages = [MessageAnalysis.from_message(message).lower for message in sample_messages()]
+    intent_patterns = patterns.intent_patterns
+    mismatches = sum(patterns.score(message) != naive_score(intent_patterns, message) for message in messages)
+    total = len(messages) * ITERATIONS
+
+    def run_naive():
+        for _ in range(ITERATIONS):
+            for message in messages:
+                naive_score(intent_patterns, message)
+
+    def run_automaton():
+        for _ in range(ITERATIONS):
+            for message in messages:
+                patterns.score(message)
+
+    naive = cpu_time(run_naive, repeat=3)
+    automaton = cpu_time(run_automaton, repeat=3)
+
+    report(f"Intent patterns ({len(patterns.intent_names)} intents, {len(patterns.keywords)} keywords)", [
+        ("compile + write + mmap (cold)", f"{compile_ms:.1f} ms"),
+        ("mmap load (compiled)", f"{load_ms:.2f} ms"),
+        ("artifact size", f"{artifact_bytes / 1024:.1f} KiB"),
+        ("substring scan", f"{naive / total * 1e6:.1f} us/msg"),
+        ("automaton", f"{automaton / total * 1e6:.1f} us/msg"),
+        ("score mismatches", f"{mismatches}/{len(messages)}")
+    ])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+import os
+import time
+
+os.environ.setdefault('DB_HOST', '127.0.0.1')
+
+from benchmarks import report, stub_db, throughput
+from models.conversation_ai import ConversationAI
+from utils.memory import MemoryDiagnostics, object_counts
+
+# MySQL is replaced by a 500-row result, so each message allocates like a
+# mid-sized report
+ROWS = [{"total": i, "nombre": f"Carrera {i}", "promedio": 8.5} for i in range(500)]
+SECONDS = float(os.environ.get('MEMORY_TEST_SECONDS', 2))
+# Each user keeps a conversation context, so the store grows as it would in
+# production
+USERS = 500
+
+def main():
+    ai = ConversationAI()
+    stub_db(ai, rows=ROWS)
+    throughput(ai, SECONDS, USERS)
+    baseline = throughput(ai, SECONDS, USERS)
+    rows = [("tracemalloc off", f"{baseline:,.0f} msg/s")]
+
+    for frames in (1, 10):
+        diagnostics = MemoryDiagnostics(frames)
+        diagnostics.start()
+        rate = throughput(ai, SECONDS, USERS)
+        start = time.perf_counter()
+        snapshot = diagnostics.take_snapshot()
+        snapshot_ms = (time.perf_counter() - start) * 1000
+        diagnostics.stop()
+        rows.append((f"tracemalloc, {frames} frame(s)", f"{rate:,.0f} msg/s ({rate / baseline:.0%}), "
+                                                        f"snapshot {snapshot_ms:.0f} ms, "
+                                                        f"{snapshot['total_bytes'] / 1024:,.0f} KiB traced"))
+
+    start = time.perf_counter()
+    counts = object_counts()
+    rows.append(("object_counts", f"{(time.perf_counter() - start) * 1000:.0f} ms over "
+                                  f"{counts['gc_tracked_objects']:,} objects"))
+
+    ai.close()
+    report(f"Memory diagnostics cost ({SECONDS:.0f} s per run)", rows)
+
+if __name__ == '__main__':
+    main()
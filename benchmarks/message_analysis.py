@@ -0,0 +1,45 @@
+from typing import Optional
+
+from benchmarks import cpu_time, report, sample_messages
+from models.conversation_ai import ConversationAI
+from utils.message_analysis import MessageAnalysis
+
+ITERATIONS = 200
+
+def pipeline(ai: ConversationAI, message: str, analysis: Optional[MessageAnalysis]):
+    # With analysis=None every stage cleans and scans the message on its own,
+    # which is the path the shared analysis replaced
+    intent = ai.intent_classifier.classify_intent(message, None, analysis)
+    query, _ = ai.query_generator.generate_query(message, intent, 1, 'directivo', analysis)
+    if not query:
+        ai._generate_helpful_suggestion(message, intent, 'directivo', analysis)
+    ai.analyze_query_complexity(message, analysis)
+
+def main():
+    messages = sample_messages()
+    ai = ConversationAI()
+    total = len(messages) * ITERATIONS
+
+    def run_per_stage():
+        for _ in range(ITERATIONS):
+            for message in messages:
+                pipeline(ai, message, None)
+
+    def run_shared():
+        for _ in range(ITERATIONS):
+            for message in messages:
+                pipeline(ai, message, MessageAnalysis.from_message(message))
+
+    per_stage = cpu_time(run_per_stage)
+    shared = cpu_time(run_shared)
+    saved = per_stage - shared
+
+    ai.close()
+    report(f"MessageAnalysis benchmark ({total} messages)", [
+        ("pipeline before DB, per-stage preprocessing", f"{per_stage / total * 1e6:.2f} us/msg"),
+        ("pipeline before DB, shared MessageAnalysis", f"{shared / total * 1e6:.2f} us/msg"),
+        ("CPU saved per message", f"{saved / total * 1e6:.2f} us ({saved / per_stage * 100:.1f}%)")
+    ])
+
+if __name__ == '__main__':
+    main()
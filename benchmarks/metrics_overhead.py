@@ -0,0 +1,64 @@
+import os
+import time
+
+os.environ.setdefault('DB_HOST', '127.0.0.1')
+
+from benchmarks import DIRECTIVO_MESSAGES, cpu_time, report, stub_db
+from models.conversation_ai import ConversationAI
+from utils.metrics import LatencyHistogram
+
+RECORDS = 200000
+
+class NullMetrics:
+    def observe(self, stage, intent, seconds):
+        pass
+
+    def increment(self, name, **labels):
+        pass
+
+def main():
+    histogram = LatencyHistogram()
+    samples = [i * 1e-6 for i in range(1, 5000)]
+
+    def record():
+        for i in range(RECORDS):
+            histogram.record(samples[i % len(samples)])
+
+    record_ns = cpu_time(record) / RECORDS * 1e9
+
+    ai = ConversationAI()
+    # No query latency, so the pipeline itself is what's timed
+    stub_db(ai)
+    metrics = ai.metrics
+
+    def run():
+        for message in DIRECTIVO_MESSAGES * 20:
+            ai.process_message(message, 1, 'directivo')
+
+    def timed(registry):
+        ai.metrics = registry
+        return cpu_time(run, repeat=3)
+
+    # Alternate the two so drift on a busy machine hits both equally
+    run()
+    bare, instrumented = float('inf'), float('inf')
+    for _ in range(5):
+        bare = min(bare, timed(NullMetrics()))
+        instrumented = min(instrumented, timed(metrics))
+    messages = len(DIRECTIVO_MESSAGES) * 20
+
+    start = time.perf_counter()
+    text = metrics.render_prometheus()
+    render_ms = (time.perf_counter() - start) * 1000
+
+    ai.close()
+    report("Metrics overhead", [
+        ("LatencyHistogram.record", f"{record_ns:.0f} ns/op"),
+        ("process_message, no metrics", f"{bare / messages * 1e6:.1f} µs/msg"),
+        ("process_message, instrumented", f"{instrumented / messages * 1e6:.1f} µs/msg "
+                                          f"(+{(instrumented - bare) / messages * 1e6:.1f} µs)"),
+        ("render_prometheus", f"{render_ms:.2f} ms, {len(text.splitlines())} lines")
+    ])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+import os
+import threading
+
+os.environ.setdefault('DB_HOST', '127.0.0.1')
+
+from benchmarks import report, stub_db, throughput
+from models.conversation_ai import ConversationAI
+from utils.profiler import StackSampler
+
+SECONDS = float(os.environ.get('PROFILE_TEST_SECONDS', 3))
+
+def main():
+    ai = ConversationAI()
+    stub_db(ai)
+    throughput(ai, SECONDS)
+
+    rows = [("no profiler", f"{throughput(ai, SECONDS):,.0f} msg/s")]
+    for hz in (100, 1000):
+        result = {}
+        # The pipeline runs on this thread while the sampler walks its stack
+        sampler = threading.Thread(target=lambda: result.update(StackSampler(1.0 / hz).run(SECONDS)))
+        sampler.start()
+        rate = throughput(ai, SECONDS)
+        sampler.join()
+        rows.append((f"sampling at {hz} Hz", f"{rate:,.0f} msg/s, {result['stack_samples']} stacks, "
+                                              f"{len(result['tags'])} tags"))
+
+    ai.close()
+    report(f"Stack sampler overhead ({SECONDS:.0f} s per run)", rows)
+
+if __name__ == '__main__':
+    main()
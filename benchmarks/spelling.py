@@ -0,0 +1,72 @@
+import random
+
+from benchmarks import DIRECTIVO_MESSAGES, cpu_time, report
+from utils.cascade_classifier import CascadeIntentClassifier
+from utils.message_analysis import MessageAnalysis
+
+ITERATIONS = 50
+TYPOS_PER_MESSAGE = 3
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+
+def misspell(word: str, rng: random.Random) -> str:
+    i = rng.randrange(1, len(word) - 1)
+    edit = rng.choice(('delete', 'transpose', 'substitute', 'insert'))
+    if edit == 'delete':
+        return word[:i] + word[i + 1:]
+    if edit == 'transpose':
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    if edit == 'substitute':
+        return word[:i] + rng.choice(ALPHABET) + word[i + 1:]
+    return word[:i] + rng.choice(ALPHABET) + word[i:]
+
+def typo_messages(messages, rng):
+    typos = []
+    for message in messages:
+        words = message.split()
+        candidates = [i for i, word in enumerate(words) if len(word) >= 6 and word.isalpha()]
+        for _ in range(TYPOS_PER_MESSAGE if candidates else 0):
+            i = rng.choice(candidates)
+            typos.append((message, ' '.join(words[:i] + [misspell(words[i], rng)] + words[i + 1:])))
+    return typos
+
+def main():
+    corrected = CascadeIntentClassifier(model_path=None)
+    plain = CascadeIntentClassifier(model_path=None, spelling_max_distance=0)
+
+    phrases = list(DIRECTIVO_MESSAGES)
+    phrases += [keyword for pattern_data in plain.keyword_classifier.intent_patterns.values()
+                for keyword in pattern_data['keywords'] if ' ' in keyword]
+    typos = typo_messages(phrases, random.Random(7))
+
+    expected = {message: plain.classify_intent(message) for message, _ in typos}
+    plain_hits = sum(plain.classify_intent(typo) == expected[message] for message, typo in typos)
+    corrected_hits = sum(corrected.classify_intent(typo) == expected[message] for message, typo in typos)
+    clean_changes = sum(corrected.classify_intent(message) != intent for message, intent in expected.items())
+
+    clean = [MessageAnalysis.from_message(message) for message in phrases]
+    misspelled = [MessageAnalysis.from_message(typo) for _, typo in typos]
+
+    def correct_all(analyses, cold=False):
+        corrector = corrected.spelling_corrector
+        iterations = 1 if cold else ITERATIONS
+
+        def run():
+            for _ in range(iterations):
+                for analysis in analyses:
+                    if cold:
+                        corrector._cache.clear()
+                    corrector.correct(analysis)
+        return cpu_time(run, repeat=3) / (iterations * len(analyses)) * 1e6
+
+    report(f"Spelling correction ({len(typos)} misspelled messages, "
+           f"{len(corrected.spelling_corrector)} dictionary words)", [
+        ("intent recovered without correction", f"{plain_hits / len(typos) * 100:.1f}%"),
+        ("intent recovered with correction", f"{corrected_hits / len(typos) * 100:.1f}%"),
+        ("clean messages changed by correction", f"{clean_changes}/{len(expected)}"),
+        ("overhead on clean messages", f"{correct_all(clean):.1f} us/msg"),
+        ("overhead on misspelled messages (cold)", f"{correct_all(misspelled, cold=True):.1f} us/msg"),
+        ("overhead on misspelled messages (cached)", f"{correct_all(misspelled):.1f} us/msg")
+    ])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+import os
+import random
+import re
+import time
+import unicodedata
+
+from benchmarks import report, sample_messages
+from utils.text_processor import TextProcessor
+
+CORPUS_SIZE = 200000
+NOISE = 'áéíóúüñÁÉÍÓÚÑ¿?¡!.,;:()«»"\'-_/\t    ºª°€$%&ǅ́̃'
+
+def legacy_clean_text(text):
+    if not text:
+        return ""
+    text = text.lower().strip()
+    text = ''.join(c for c in unicodedata.normalize('NFD', text) if unicodedata.category(c) != 'Mn')
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+def legacy_tokenize(processor, text):
+    return [token for token in legacy_clean_text(text).split()
+            if len(token) > 2 and token not in processor.stopwords['es']]
+
+def build_corpus(rng):
+    messages = sample_messages()
+    corpus = []
+    for _ in range(CORPUS_SIZE):
+        message = list(rng.choice(messages))
+        for _ in range(rng.randrange(4)):
+            message.insert(rng.randrange(len(message) + 1), rng.choice(NOISE))
+        corpus.append(''.join(message))
+    return corpus
+
+def throughput(fn, corpus):
+    start = time.perf_counter()
+    fn(corpus)
+    return len(corpus) / (time.perf_counter() - start)
+
+def main():
+    rng = random.Random(3)
+    processor = TextProcessor()
+    corpus = build_corpus(rng)
+    fuzz = [''.join(chr(rng.randrange(0x20, 0x3000)) for _ in range(rng.randrange(30))) for _ in range(20000)]
+
+    clean_mismatches = sum(processor.clean_text(text) != legacy_clean_text(text) for text in corpus[:20000] + fuzz)
+    token_mismatches = sum(processor.tokenize(text) != legacy_tokenize(processor, text) for text in corpus[:20000] + fuzz)
+    batch_mismatches = sum(a != b for a, b in zip(processor.clean_texts(corpus[:20000]),
+                                                  map(legacy_clean_text, corpus[:20000])))
+
+    legacy = throughput(lambda texts: [legacy_clean_text(text) for text in texts], corpus)
+    serial = throughput(lambda texts: processor.clean_texts(texts, workers=1), corpus)
+    parallel = throughput(lambda texts: processor.clean_texts(texts, workers=os.cpu_count()), corpus)
+
+    report(f"Text normalization ({len(corpus)} messages, {os.cpu_count()} CPUs)", [
+        ("legacy clean_text", f"{legacy:,.0f} msg/s"),
+        ("clean_texts serial", f"{serial:,.0f} msg/s ({serial / legacy:.1f}x)"),
+        ("clean_texts process pool", f"{parallel:,.0f} msg/s ({parallel / legacy:.1f}x)"),
+        ("clean_text mismatches", f"{clean_mismatches}/{len(corpus[:20000] + fuzz)}"),
+        ("tokenize mismatches", f"{token_mismatches}/{len(corpus[:20000] + fuzz)}"),
+        ("clean_texts mismatches", f"{batch_mismatches}/20000")
+    ])
+
+if __name__ == '__main__':
+    main()
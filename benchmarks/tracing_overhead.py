@@ -0,0 +1,34 @@
+import os
+
+os.environ.setdefault('DB_HOST', '127.0.0.1')
+
+from benchmarks import DIRECTIVO_MESSAGES, cpu_time, report, stub_db
+from models.conversation_ai import ConversationAI
+
+ROUNDS = 20
+
+def main():
+    ai = ConversationAI()
+    stub_db(ai)
+    messages = DIRECTIVO_MESSAGES * ROUNDS
+
+    def run():
+        for message in messages:
+            ai.process_message(message, 1, 'directivo')
+
+    run()
+    rows = []
+    baseline = None
+    for rate in (0.0, 0.01, 0.1, 1.0):
+        ai.tracer.sample_rate = rate
+        per_message = cpu_time(run) / len(messages) * 1e6
+        baseline = per_message if baseline is None else baseline
+        rows.append((f"sample rate {rate:g}", f"{per_message:.1f} µs/msg (+{per_message - baseline:.1f} µs)"))
+
+    traces = ai.tracer.recent(1)
+    spans = len(traces[0].spans) if traces else 0
+    ai.close()
+    report(f"Tracing overhead per process_message ({spans} spans per sampled message)", rows)
+
+if __name__ == '__main__':
+    main()
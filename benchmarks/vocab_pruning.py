@@ -0,0 +1,75 @@
+import os
+import tempfile
+import time
+
+import numpy as np
+from sklearn.model_selection import StratifiedKFold
+
+from benchmarks import sample_messages
+from training.train_model import AIModelTrainer
+
+FOLDS = 5
+ITERATIONS = 20
+VOCABULARY_FRACTIONS = (0.75, 0.5, 0.25, 0.1)
+METHODS = ('chi2', 'mutual_info')
+
+def cv_accuracy(texts, labels, vectorizer_params, feature_selection):
+    labels = np.asarray(labels)
+    scores = []
+    # Pruning runs inside each fold so the held-out examples never inform the ranking
+    for train_idx, test_idx in StratifiedKFold(FOLDS, shuffle=True, random_state=42).split(texts, labels):
+        trainer = AIModelTrainer(vectorizer_params, feature_selection=feature_selection)
+        trainer.fit([texts[i] for i in train_idx], labels[train_idx])
+        predictions = [trainer.predictor.predict(texts[i]) for i in test_idx]
+        scores.append(np.mean(np.asarray(predictions) == labels[test_idx]))
+    return float(np.mean(scores))
+
+def measure(texts, labels, messages, vectorizer_params, feature_selection):
+    trainer = AIModelTrainer(vectorizer_params, feature_selection=feature_selection).fit(texts, labels)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base = os.path.join(tmp, 'model')
+        trainer.save_model(base)
+        artifact_bytes = os.path.getsize(f'{base}_intent.bin')
+
+    predictor = trainer.predictor
+    weight_bytes = sum(array.nbytes for array in predictor.artifact_arrays().values() if array is not None)
+
+    for message in messages:
+        predictor.predict_proba(message)
+
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        for message in messages:
+            predictor.predict_proba(message)
+    latency_us = (time.perf_counter() - start) / (ITERATIONS * len(messages)) * 1e6
+
+    return predictor.n_features, artifact_bytes, weight_bytes, latency_us
+
+def main():
+    texts, labels = AIModelTrainer().prepare_data()
+    messages = sample_messages()
+
+    rows = []
+    for min_df in (1, 2):
+        vectorizer_params = {'min_df': min_df}
+        full_size = AIModelTrainer(vectorizer_params).fit(texts, labels).predictor.n_features
+        sizes = sorted({max(1, int(full_size * fraction)) for fraction in VOCABULARY_FRACTIONS}, reverse=True)
+
+        candidates = [('-', None)]
+        candidates += [(method, {'method': method, 'k': k}) for method in METHODS for k in sizes]
+        for method, feature_selection in candidates:
+            accuracy = cv_accuracy(texts, labels, vectorizer_params, feature_selection)
+            n_features, artifact_bytes, weight_bytes, latency_us = measure(
+                texts, labels, messages, vectorizer_params, feature_selection)
+            rows.append((min_df, method, n_features, accuracy, artifact_bytes, weight_bytes, latency_us))
+
+    print("\nAccuracy vs vocabulary size")
+    print(f"{'min_df':>6} {'method':>11} {'features':>8} {'cv acc':>7} {'artifact':>10} "
+          f"{'weights':>10} {'us/msg':>7}")
+    for min_df, method, n_features, accuracy, artifact_bytes, weight_bytes, latency_us in rows:
+        print(f"{min_df:>6} {method:>11} {n_features:>8} {accuracy:>7.3f} {artifact_bytes / 1024:>8.1f}Ki "
+              f"{weight_bytes / 1024:>8.1f}Ki {latency_us:>7.1f}")
+
+if __name__ == '__main__':
+    main()
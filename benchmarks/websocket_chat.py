@@ -0,0 +1,95 @@
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault('DB_HOST', '127.0.0.1')
+
+from benchmarks import DIRECTIVO_MESSAGES, report, stub_db
+import asgi
+
+# Both paths drive the ASGI app in-process against a stubbed database
+MESSAGES = int(os.environ.get('WS_TEST_MESSAGES', 2000))
+CONCURRENCY = int(os.environ.get('WS_TEST_CONCURRENCY', 8))
+
+def http_scope():
+    return {'type': 'http', 'method': 'POST', 'path': '/api/chat', 'query_string': b'',
+            'headers': [(b'content-type', b'application/json')]}
+
+async def run_http():
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def one(i):
+        async with semaphore:
+            body = json.dumps({"message": DIRECTIVO_MESSAGES[i % len(DIRECTIVO_MESSAGES)],
+                               "user_id": 7, "role": "directivo"}).encode('utf-8')
+            delivered = False
+            sent = []
+
+            async def receive():
+                nonlocal delivered
+                if delivered:
+                    return {'type': 'http.disconnect'}
+                delivered = True
+                return {'type': 'http.request', 'body': body}
+
+            async def send(message):
+                sent.append(message)
+
+            await asgi.app(http_scope(), receive, send)
+            json.loads(sent[1]['body'])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(MESSAGES)))
+    return MESSAGES / (time.perf_counter() - start)
+
+async def run_websocket():
+    incoming = asyncio.Queue()
+    answered = asyncio.Event()
+    answers = []
+
+    async def receive():
+        return await incoming.get()
+
+    async def send(message):
+        if message['type'] == 'websocket.send':
+            answers.append(json.loads(message['text']))
+            if len(answers) == MESSAGES:
+                answered.set()
+
+    await incoming.put({'type': 'websocket.connect'})
+    scope = {'type': 'websocket', 'path': '/ws/chat', 'query_string': b'user_id=7&role=directivo', 'headers': []}
+    start = time.perf_counter()
+    connection = asyncio.ensure_future(asgi.app(scope, receive, send))
+    for i in range(MESSAGES):
+        await incoming.put({'type': 'websocket.receive', 'text': DIRECTIVO_MESSAGES[i % len(DIRECTIVO_MESSAGES)]})
+        # The client stays at most one window ahead of the answers
+        while incoming.qsize() > CONCURRENCY:
+            await asyncio.sleep(0)
+    await answered.wait()
+    elapsed = time.perf_counter() - start
+    await incoming.put({'type': 'websocket.disconnect', 'code': 1000})
+    await connection
+
+    ids = sorted(answer['id'] for answer in answers)
+    assert ids == list(range(1, MESSAGES + 1)), "lost or duplicated answers"
+    return MESSAGES / elapsed
+
+def main():
+    if asgi.ai_system is None:
+        raise SystemExit("ConversationAI failed to initialise")
+
+    rows = []
+    for latency in (0.0, 0.005):
+        stub_db(asgi.ai_system, latency)
+        http = asyncio.run(run_http())
+        websocket = asyncio.run(run_websocket())
+        label = f"{latency * 1000:.0f} ms query"
+        rows += [(f"{label}, HTTP /api/chat", f"{http:,.0f} msg/s"),
+                 (f"{label}, WebSocket /ws/chat", f"{websocket:,.0f} msg/s ({websocket / http:.2f}x)")]
+
+    report(f"Chat messages per worker ({MESSAGES} messages, {CONCURRENCY} in flight, "
+           f"WS_MAX_IN_FLIGHT={os.environ.get('WS_MAX_IN_FLIGHT', 8)})", rows)
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 from .connection import DatabaseConnection
+from .query_log import QueryLog
 
-__all__ = ['DatabaseConnection']
+__all__ = ['DatabaseConnection', 'QueryLog']
 __version__ = '1.0.0'
\ No newline at end of file
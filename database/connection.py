@@ -1,11 +1,30 @@
 import os
+import time
+import atexit
+import asyncio
+import threading
 import mysql.connector
+import mysql.connector.pooling
 import logging
-from typing import Optional, Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Iterator, List
+
+from database.query_log import QueryLog, estimate_bytes
+from utils.tracing import bind, span
 
 logger = logging.getLogger(__name__)
 
+def with_max_execution_time(query: str, seconds: float) -> str:
+    # MySQL aborts the SELECT server-side once the hint's budget is spent, which
+    # frees the pooled connection; MariaDB reads the hint as a plain comment
+    stripped = query.lstrip()
+    if stripped[:6].upper() != 'SELECT':
+        return query
+    return f"SELECT /*+ MAX_EXECUTION_TIME({max(int(seconds * 1000), 1)}) */{stripped[6:]}"
+
 class DatabaseConnection:
+    POOL_RETRY_SECONDS = 30.0
+
     def __init__(self):
         self.config = {
             'host': os.environ.get('DB_HOST', 'bluebyte.space'),
@@ -16,40 +35,216 @@ class DatabaseConnection:
             'charset': 'utf8mb4',
             'autocommit': True
         }
+        # mysql.connector caps pools at 32 connections; 0 connects per query
+        self.pool_size = min(max(int(os.environ.get('DB_POOL_SIZE', 8)), 0), 32)
+        self.pool_timeout = float(os.environ.get('DB_POOL_TIMEOUT', 10))
         self._connection = None
-    
+        self._pool = None
+        self._pool_pid = None
+        self._pool_slots = None
+        self._pool_retry_at = 0.0
+        self._executors = {}
+        # A stream keeps its connection checked out between steps, so no more
+        # streams than pooled connections may be open at once
+        self.max_streams = max(self.pool_size, 1)
+        self._init_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {'in_use': 0, 'waiting': 0, 'queries': 0, 'errors': 0, 'pool_timeouts': 0}
+        self.query_log = QueryLog.from_environment()
+        atexit.register(self.query_log.dump)
+
+    def _get_pool(self):
+        # Created lazily and per process: the pool opens all of its connections
+        # up front, and sockets must not be inherited across a gunicorn fork
+        if self._pool_pid == os.getpid() or time.monotonic() < self._pool_retry_at:
+            return self._pool
+
+        with self._init_lock:
+            if self._pool_pid != os.getpid() and time.monotonic() >= self._pool_retry_at:
+                try:
+                    self._pool = mysql.connector.pooling.MySQLConnectionPool(
+                        pool_name=f"dtai_{os.getpid()}_{id(self)}",
+                        pool_size=self.pool_size,
+                        pool_reset_session=False,
+                        **self.config
+                    )
+                    self._pool_slots = threading.BoundedSemaphore(self.pool_size)
+                    self._pool_pid = os.getpid()
+                    logger.info(f"Pool de conexiones BD creado ({self.pool_size} conexiones)")
+                except Exception as e:
+                    # Connect per query until the next attempt
+                    logger.error(f"Error creando pool BD: {e}")
+                    self._pool = None
+                    self._pool_retry_at = time.monotonic() + self.POOL_RETRY_SECONDS
+        return self._pool
+
     def connect(self) -> Optional[mysql.connector.MySQLConnection]:
         try:
+            pool = self._get_pool() if self.pool_size else None
+            if pool is not None:
+                # The pool raises instead of waiting when it is empty, so callers
+                # queue on the semaphore; closing the connection returns it
+                self._count('waiting', 1)
+                acquired = self._pool_slots.acquire(timeout=self.pool_timeout)
+                self._count('waiting', -1)
+                if not acquired:
+                    self._count('pool_timeouts', 1)
+                    logger.error("Error BD: pool de conexiones agotado")
+                    return None
+                try:
+                    self._connection = pool.get_connection()
+                except Exception:
+                    self._pool_slots.release()
+                    raise
+                self._count('in_use', 1)
+                return self._connection
+
             self._connection = mysql.connector.connect(**self.config)
             logger.info("Conexión a BD exitosa")
             return self._connection
         except Exception as e:
             logger.error(f"Error BD: {e}")
             return None
-    
-    def execute_query(self, query: str, params: Optional[list] = None) -> Optional[List[Dict[str, Any]]]:
+
+    def _release(self, connection):
+        try:
+            connection.close()
+        finally:
+            if self._pool is not None and isinstance(connection, mysql.connector.pooling.PooledMySQLConnection):
+                self._count('in_use', -1)
+                self._pool_slots.release()
+
+    def _count(self, key: str, delta: int):
+        with self._stats_lock:
+            self._stats[key] += delta
+
+    def execute_query(self, query: str, params: Optional[list] = None,
+                      intent: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        with span('db.query', intent=intent) as current:
+            with span('db.connect'):
+                connection = self.connect()
+            if not connection:
+                current.set(error='sin_conexion')
+                return None
+
+            start = time.perf_counter()
+            try:
+                cursor = connection.cursor(dictionary=True)
+                cursor.execute(query, params or [])
+                result = cursor.fetchall()
+                cursor.close()
+                self._count('queries', 1)
+                elapsed = time.perf_counter() - start
+                self.query_log.record(query, params, elapsed, len(result), estimate_bytes(result), intent)
+                if current:
+                    current.set(fingerprint=self.query_log.fingerprint(query), rows=len(result))
+                logger.info(f"Query ejecutada: {len(result)} filas en {elapsed * 1000:.1f} ms")
+                return result
+            except Exception as e:
+                self._count('errors', 1)
+                self.query_log.record(query, params, time.perf_counter() - start, intent=intent, error=True)
+                current.set(error=type(e).__name__)
+                logger.error(f"Error query: {e}")
+                return None
+            finally:
+                self._release(connection)
+
+    def stream_query(self, query: str, params: Optional[list] = None, batch_size: int = 100,
+                     intent: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        # Unbuffered cursor: rows are read from the socket batch by batch, and the
+        # connection stays checked out until the generator is exhausted or closed
         connection = self.connect()
         if not connection:
-            return None
-        
+            # Raised rather than ending the stream, which would read as no rows
+            raise ConnectionError("Sin conexión a la base de datos")
+
+        cursor = None
+        total = 0
+        size = 0
+        # Time spent waiting on the consumer is excluded, so the log compares
+        # with buffered runs of the same template
+        elapsed = 0.0
         try:
+            start = time.perf_counter()
             cursor = connection.cursor(dictionary=True)
             cursor.execute(query, params or [])
-            result = cursor.fetchall()
-            cursor.close()
-            connection.close()
-            logger.info(f"Query ejecutada: {len(result)} filas")
-            return result
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                elapsed += time.perf_counter() - start
+                if not rows:
+                    break
+                total += len(rows)
+                size += estimate_bytes(rows)
+                yield from rows
+                start = time.perf_counter()
+            self._count('queries', 1)
+            self.query_log.record(query, params, elapsed, total, size, intent)
+            logger.info(f"Query transmitida: {total} filas")
         except Exception as e:
+            self._count('errors', 1)
+            self.query_log.record(query, params, elapsed, total, size, intent, error=True)
             logger.error(f"Error query: {e}")
-            if connection:
-                connection.close()
-            return None
-    
+            raise
+        finally:
+            try:
+                # An abandoned stream leaves rows on the wire; drain them before
+                # the connection goes back to the pool
+                if connection.unread_result:
+                    connection.consume_results()
+                if cursor is not None:
+                    cursor.close()
+            except Exception as e:
+                logger.error(f"Error cerrando cursor: {e}")
+            finally:
+                self._release(connection)
+
+    def _process_executor(self, name: str, workers: int) -> ThreadPoolExecutor:
+        executor, pid = self._executors.get(name, (None, None))
+        if pid != os.getpid():
+            with self._init_lock:
+                executor, pid = self._executors.get(name, (None, None))
+                if pid != os.getpid():
+                    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'dtai-{name}')
+                    self._executors[name] = (executor, os.getpid())
+        return executor
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        # One thread per pooled connection: more threads would only queue on the
+        # pool, while awaiting coroutines cost nothing
+        return self._process_executor('db', max(self.pool_size, 1))
+
+    @property
+    def stream_executor(self) -> ThreadPoolExecutor:
+        # Stream steps get their own threads: on the query executor a step
+        # blocked in connect() could hold the thread the stream owning the
+        # connection needs for its next step. With at most max_streams open,
+        # each open stream always finds a free thread here
+        return self._process_executor('stream', self.max_streams)
+
+    def shutdown_executors(self):
+        for executor, pid in self._executors.values():
+            if pid == os.getpid():
+                executor.shutdown(wait=False)
+
+    async def execute_query_async(self, query: str, params: Optional[list] = None,
+                                  intent: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, bind(self.execute_query), query, params, intent)
+
     def execute_single_query(self, query: str, params: Optional[list] = None) -> Optional[Dict[str, Any]]:
         result = self.execute_query(query, params)
         return result[0] if result else None
-    
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        return {
+            "pool_size": self.pool_size,
+            "pooled": self._pool_pid == os.getpid(),
+            **stats
+        }
+
     def test_connection(self) -> bool:
         try:
             result = self.execute_query("SELECT 1 as test, NOW() as tiempo")
@@ -0,0 +1,198 @@
+import os
+import re
+import json
+import heapq
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_COMMENT = re.compile(r"/\*.*?\*/|--[^\n]*", re.S)
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+# The sign is not part of the literal, so "a-1" and "z = -5" keep their operator
+_NUMBER = re.compile(r"(?<![\w.])\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|%\(\w+\)s")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+def normalize_query(query: str) -> str:
+    # Literals and driver placeholders become ?, so every run of a template,
+    # hinted or not, lands on the same text
+    text = _COMMENT.sub(' ', query)
+    text = _STRING.sub('?', text)
+    text = _PLACEHOLDER.sub('?', text)
+    text = _NUMBER.sub('?', text)
+    text = _IN_LIST.sub('(?+)', text)
+    return _SPACE.sub(' ', text).strip()
+
+def estimate_bytes(rows: List[Dict[str, Any]], sample: int = 100) -> int:
+    # Sizes the first rows as text and scales up, so big results cost no more
+    # to measure than small ones
+    if not rows:
+        return 0
+    head = rows[:sample]
+    size = sum(len(str(value)) for row in head for value in row.values())
+    return size * len(rows) // len(head)
+
+class QueryLog:
+    MAX_FINGERPRINTS = 500
+    OTHER = 'other'
+    SORT_KEYS = {'total': 'total_s', 'max': 'max_s', 'count': 'count'}
+
+    def __init__(self, slow_ms: float = 200.0, max_samples: int = 20, max_params_chars: int = 200):
+        self.slow_ms = slow_ms
+        self.max_samples = max_samples
+        self.max_params_chars = max_params_chars
+        self.started_at = datetime.now()
+        self._fingerprints: Dict[str, str] = {}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # Min-heap of the slowest samples; the root is the first to go
+        self._samples: List[tuple] = []
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_environment(cls) -> 'QueryLog':
+        return cls(
+            slow_ms=float(os.environ.get('SLOW_QUERY_MS', 200)),
+            max_samples=int(os.environ.get('SLOW_QUERY_SAMPLES', 20))
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def fingerprint(self, query: str) -> str:
+        # Queries come from a fixed set of templates, so the regex pass runs
+        # once per distinct text
+        fingerprint = self._fingerprints.get(query)
+        if fingerprint is None:
+            normalized = normalize_query(query)
+            fingerprint = hashlib.md5(normalized.encode('utf-8')).hexdigest()[:16]
+            if len(self._fingerprints) < self.MAX_FINGERPRINTS * 4:
+                self._fingerprints[query] = fingerprint
+            with self._lock:
+                if fingerprint not in self._entries and len(self._entries) < self.MAX_FINGERPRINTS:
+                    self._entries[fingerprint] = self._new_entry(normalized)
+        return fingerprint
+
+    @staticmethod
+    def _new_entry(normalized: str) -> Dict[str, Any]:
+        return {'query': normalized, 'count': 0, 'errors': 0, 'total_s': 0.0, 'max_s': 0.0,
+                'rows': 0, 'bytes': 0, 'intents': {}}
+
+    def record(self, query: str, params, elapsed: float, rows: int = 0, size: int = 0,
+               intent: Optional[str] = None, error: bool = False):
+        fingerprint = self.fingerprint(query)
+        intent = intent or 'sin_intencion'
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is None:
+                entry = self._entries.setdefault(self.OTHER, self._new_entry('(otras consultas)'))
+            entry['count'] += 1
+            entry['total_s'] += elapsed
+            entry['rows'] += rows
+            entry['bytes'] += size
+            if error:
+                entry['errors'] += 1
+            if elapsed > entry['max_s']:
+                entry['max_s'] = elapsed
+            per_intent = entry['intents'].get(intent)
+            if per_intent is None:
+                per_intent = entry['intents'][intent] = {'count': 0, 'total_s': 0.0, 'max_s': 0.0}
+            per_intent['count'] += 1
+            per_intent['total_s'] += elapsed
+            if elapsed > per_intent['max_s']:
+                per_intent['max_s'] = elapsed
+
+            if elapsed * 1000 < self.slow_ms or not self.max_samples:
+                return
+            if len(self._samples) == self.max_samples and elapsed <= self._samples[0][0]:
+                return
+            self._sequence += 1
+            sample = (elapsed, self._sequence, {
+                'fingerprint': fingerprint,
+                'intent': intent,
+                'duration_ms': round(elapsed * 1000, 3),
+                'rows': rows,
+                'error': error,
+                'params': repr(list(params or []))[:self.max_params_chars],
+                'at': datetime.now().isoformat()
+            })
+            if len(self._samples) < self.max_samples:
+                heapq.heappush(self._samples, sample)
+            else:
+                heapq.heapreplace(self._samples, sample)
+
+    def report(self, limit: int = 20, sort: str = 'total') -> Dict[str, Any]:
+        sort = sort if sort in self.SORT_KEYS else 'total'
+        key = self.SORT_KEYS[sort]
+        with self._lock:
+            entries = [(fingerprint, dict(entry, intents={intent: dict(stats) for intent, stats in entry['intents'].items()}))
+                       for fingerprint, entry in self._entries.items() if entry['count']]
+            samples = [sample for _, _, sample in sorted(self._samples, reverse=True)]
+
+        entries.sort(key=lambda item: item[1][key], reverse=True)
+        fingerprints = []
+        for fingerprint, entry in entries[:limit]:
+            count = entry['count']
+            fingerprints.append({
+                'fingerprint': fingerprint,
+                'query': entry['query'],
+                'count': count,
+                'errors': entry['errors'],
+                'total_ms': round(entry['total_s'] * 1000, 3),
+                'avg_ms': round(entry['total_s'] * 1000 / count, 3),
+                'max_ms': round(entry['max_s'] * 1000, 3),
+                'rows': entry['rows'],
+                'avg_rows': round(entry['rows'] / count, 1),
+                'bytes_estimated': entry['bytes'],
+                'intents': {
+                    intent: {
+                        'count': stats['count'],
+                        'avg_ms': round(stats['total_s'] * 1000 / stats['count'], 3),
+                        'max_ms': round(stats['max_s'] * 1000, 3)
+                    }
+                    for intent, stats in sorted(entry['intents'].items(), key=lambda item: -item[1]['total_s'])
+                }
+            })
+
+        return {
+            'since': self.started_at.isoformat(),
+            'slow_threshold_ms': self.slow_ms,
+            'sort': sort,
+            'distinct_fingerprints': len(entries),
+            'fingerprints': fingerprints,
+            'slowest_samples': samples
+        }
+
+    def reset(self):
+        with self._lock:
+            self._entries = {fingerprint: self._new_entry(entry['query'])
+                             for fingerprint, entry in self._entries.items()}
+            self._samples = []
+            self.started_at = datetime.now()
+
+    def dump(self, path: Optional[str] = None, limit: int = 20):
+        # Writes the report as JSON when a path is configured, otherwise logs
+        # the most expensive fingerprints
+        report = self.report(limit)
+        if not report['fingerprints']:
+            return
+        path = path or os.environ.get('SLOW_QUERY_REPORT_PATH')
+        if path:
+            try:
+                with open(path, 'w', encoding='utf-8') as output:
+                    json.dump(report, output, ensure_ascii=False, indent=2, default=str)
+                logger.info(f"Reporte de consultas guardado en {path}")
+            except OSError as e:
+                logger.error(f"Error guardando reporte de consultas: {e}")
+            return
+
+        lines = [f"Consultas por tiempo total desde {report['since']}:"]
+        for entry in report['fingerprints']:
+            lines.append(f"  {entry['fingerprint']} x{entry['count']} total {entry['total_ms']:.1f} ms, "
+                         f"max {entry['max_ms']:.1f} ms, {entry['avg_rows']} filas: {entry['query'][:120]}")
+        logger.info('\n'.join(lines))
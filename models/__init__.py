@@ -1,10 +1,15 @@
 from .conversation_ai import ConversationAI
 from .query_generator import QueryGenerator
 from .response_formatter import ResponseFormatter
+from .context_store import ContextStore, ShardedContextStore
+from .chat_session import ChatSession
 
 __all__ = [
     'ConversationAI',
     'QueryGenerator', 
-    'ResponseFormatter'
+    'ResponseFormatter',
+    'ContextStore',
+    'ShardedContextStore',
+    'ChatSession'
 ]
 __version__ = '1.0.0'
\ No newline at end of file
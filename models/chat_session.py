@@ -0,0 +1,46 @@
+import os
+import json
+import asyncio
+import logging
+from typing import Any, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+class ChatSession:
+    def __init__(self, ai, user_id, role: str = 'alumno', max_in_flight: int = 8):
+        self.ai = ai
+        self.user_id = user_id
+        self.role = role
+        # Pinned for the life of the connection; update_context keeps it current
+        self.context = ai.conversation_contexts.get_or_create(user_id)
+        # Reading the next frame waits for a free slot, so a client that sends
+        # faster than answers complete is throttled by the transport
+        self.slots = asyncio.Semaphore(max_in_flight)
+        self.max_in_flight = max_in_flight
+        self._next_id = 0
+        self.stats = {'received': 0, 'completed': 0, 'errors': 0}
+
+    @classmethod
+    def from_environment(cls, ai, user_id, role: str = 'alumno') -> 'ChatSession':
+        return cls(ai, user_id, role, max_in_flight=int(os.environ.get('WS_MAX_IN_FLIGHT', 8)))
+
+    def parse_frame(self, text: str) -> Tuple[Any, str]:
+        # Plain text frames are the message itself; JSON frames may carry an id
+        # the client uses to match answers that complete out of order
+        self._next_id += 1
+        self.stats['received'] += 1
+        if text.startswith('{'):
+            try:
+                data = json.loads(text)
+            except ValueError:
+                data = None
+            if isinstance(data, dict):
+                return data.get('id', self._next_id), str(data.get('message', '')).strip()
+        return self._next_id, text.strip()
+
+    async def process(self, message: str) -> Dict[str, Any]:
+        result = await self.ai.process_message_async(message, self.user_id, self.role, session=self)
+        self.stats['completed'] += 1
+        if not result.get('success'):
+            self.stats['errors'] += 1
+        return result
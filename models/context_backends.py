@@ -0,0 +1,174 @@
+import os
+import time
+import sqlite3
+import threading
+import logging
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+class SQLiteContextBackend:
+    NAME = 'sqlite'
+    PURGE_INTERVAL = 60.0
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._next_purge = 0.0
+
+        with self._connection() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS conversation_contexts ('
+                'user_id TEXT PRIMARY KEY, data BLOB NOT NULL, expires_at REAL NOT NULL)'
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread and per process: sqlite3 connections must not
+        # be shared across threads nor inherited across a fork
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            local.connection.execute('PRAGMA journal_mode=WAL')
+            local.connection.execute('PRAGMA synchronous=NORMAL')
+            local.pid = os.getpid()
+        return local.connection
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        placeholders = ','.join('?' * len(keys))
+        rows = self._connection().execute(
+            f'SELECT user_id, data FROM conversation_contexts '
+            f'WHERE user_id IN ({placeholders}) AND expires_at > ?',
+            (*keys, time.time())
+        ).fetchall()
+        return {user_id: bytes(data) for user_id, data in rows}
+
+    def set_many(self, items: Dict[str, bytes], ttl: float):
+        expires_at = time.time() + ttl
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.executemany(
+                'INSERT OR REPLACE INTO conversation_contexts (user_id, data, expires_at) VALUES (?, ?, ?)',
+                [(key, data, expires_at) for key, data in items.items()]
+            )
+            if time.monotonic() >= self._next_purge:
+                connection.execute('DELETE FROM conversation_contexts WHERE expires_at <= ?', (time.time(),))
+                self._next_purge = time.monotonic() + self.PURGE_INTERVAL
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+    def delete(self, key: str) -> bool:
+        cursor = self._connection().execute('DELETE FROM conversation_contexts WHERE user_id = ?', (key,))
+        return cursor.rowcount > 0
+
+    def count(self) -> int:
+        return self._connection().execute(
+            'SELECT COUNT(*) FROM conversation_contexts WHERE expires_at > ?', (time.time(),)
+        ).fetchone()[0]
+
+class LocalKeyValueClient:
+    # In-process stand-in exposing the subset of the redis-py client API used by
+    # KeyValueContextBackend; it is not shared between processes
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return None
+        return value
+
+    def mget(self, keys):
+        with self._lock:
+            return [self._live(key) for key in keys]
+
+    def set(self, key: str, value: bytes, ex: Optional[float] = None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ex if ex else None)
+        return True
+
+    def delete(self, *keys) -> int:
+        with self._lock:
+            return sum(self._data.pop(key, None) is not None for key in keys)
+
+    def dbsize(self) -> int:
+        with self._lock:
+            for key in list(self._data):
+                self._live(key)
+            return len(self._data)
+
+    def pipeline(self, transaction: bool = False):
+        return _LocalPipeline(self)
+
+class _LocalPipeline:
+    def __init__(self, client: LocalKeyValueClient):
+        self.client = client
+        self.commands = []
+
+    def set(self, key: str, value: bytes, ex: Optional[float] = None):
+        self.commands.append((key, value, ex))
+        return self
+
+    def execute(self):
+        results = [self.client.set(key, value, ex) for key, value, ex in self.commands]
+        self.commands = []
+        return results
+
+class KeyValueContextBackend:
+    NAME = 'kv'
+
+    def __init__(self, client, prefix: str = 'dtai:context:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self.client.mget([self.prefix + key for key in keys])
+        return {key: bytes(value) for key, value in zip(keys, values) if value is not None}
+
+    def set_many(self, items: Dict[str, bytes], ttl: float):
+        pipeline = self.client.pipeline(transaction=False)
+        for key, data in items.items():
+            pipeline.set(self.prefix + key, data, ex=max(1, int(ttl)))
+        pipeline.execute()
+
+    def delete(self, key: str) -> bool:
+        return bool(self.client.delete(self.prefix + key))
+
+    def count(self) -> Optional[int]:
+        # A shared keyspace holds more than contexts, so only the stand-in can count them
+        if isinstance(self.client, LocalKeyValueClient):
+            return self.client.dbsize()
+        return None
+
+def create_kv_client(url: Optional[str]):
+    if not url:
+        logger.warning("CONTEXT_KV_URL not set, using the in-process key-value stand-in")
+        return LocalKeyValueClient()
+
+    try:
+        import redis
+    except ImportError:
+        logger.error("CONTEXT_KV_URL requires the redis package, using the in-process key-value stand-in")
+        return LocalKeyValueClient()
+
+    return redis.Redis.from_url(url, socket_timeout=1.0)
+
+def create_backend(name: str):
+    if name == 'sqlite':
+        return SQLiteContextBackend(os.environ.get('CONTEXT_SQLITE_PATH', 'conversation_contexts.sqlite3'))
+    if name == 'kv':
+        return KeyValueContextBackend(create_kv_client(os.environ.get('CONTEXT_KV_URL')))
+    raise ValueError(f"Unknown CONTEXT_BACKEND '{name}' (expected memory, sqlite or kv)")
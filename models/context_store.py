@@ -0,0 +1,399 @@
+import os
+import time
+import atexit
+import struct
+import threading
+import logging
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+class ContextMessage(NamedTuple):
+    user_message: str
+    bot_response: str
+    intent: str
+    timestamp: float
+
+class ConversationContext:
+    __slots__ = ('user_id', 'messages', 'last_intent', 'turns', 'session_start', 'last_seen')
+
+    def __init__(self, user_id: int, history_size: int = 5):
+        self.user_id = user_id
+        self.messages = deque(maxlen=history_size)
+        self.last_intent = None
+        self.turns = 0
+        self.session_start = time.time()
+        self.last_seen = time.monotonic()
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def record(self, message: str, intent: str, response: str):
+        self.messages.append(ContextMessage(message[:100], response[:100], intent, time.time()))
+        self.last_intent = intent
+        self.turns += 1
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "user_id": self.user_id,
+            "messages_count": len(self.messages),
+            "last_intent": self.last_intent,
+            "session_duration_minutes": (time.time() - self.session_start) / 60,
+            "recent_intents": [message.intent for message in list(self.messages)[-3:]]
+        }
+
+CONTEXT_VERSION = 1
+_CONTEXT_HEADER = struct.Struct('<BdIB')
+_MESSAGE_HEADER = struct.Struct('<d')
+_STRING_LENGTH = struct.Struct('<H')
+
+def _pack_string(value: Optional[str]) -> bytes:
+    encoded = (value or '').encode('utf-8')[:0xffff]
+    return _STRING_LENGTH.pack(len(encoded)) + encoded
+
+def _unpack_string(data: bytes, offset: int):
+    (length,) = _STRING_LENGTH.unpack_from(data, offset)
+    offset += _STRING_LENGTH.size
+    return data[offset:offset + length].decode('utf-8', 'replace'), offset + length
+
+def encode_context(context: ConversationContext) -> bytes:
+    parts = [_CONTEXT_HEADER.pack(CONTEXT_VERSION, context.session_start, context.turns, len(context.messages)),
+             _pack_string(context.last_intent)]
+    for message in context.messages:
+        parts.append(_MESSAGE_HEADER.pack(message.timestamp))
+        parts.append(_pack_string(message.user_message))
+        parts.append(_pack_string(message.bot_response))
+        parts.append(_pack_string(message.intent))
+    return b''.join(parts)
+
+def decode_context(user_id, data: bytes, history_size: int = 5) -> ConversationContext:
+    version, session_start, turns, count = _CONTEXT_HEADER.unpack_from(data, 0)
+    if version != CONTEXT_VERSION:
+        raise ValueError(f"Unsupported context encoding version {version}")
+
+    context = ConversationContext(user_id, history_size)
+    context.session_start = session_start
+    context.turns = turns
+    last_intent, offset = _unpack_string(data, _CONTEXT_HEADER.size)
+    context.last_intent = last_intent or None
+
+    for _ in range(count):
+        (timestamp,) = _MESSAGE_HEADER.unpack_from(data, offset)
+        user_message, offset = _unpack_string(data, offset + _MESSAGE_HEADER.size)
+        bot_response, offset = _unpack_string(data, offset)
+        intent, offset = _unpack_string(data, offset)
+        context.messages.append(ContextMessage(user_message, bot_response, intent, timestamp))
+    return context
+
+class ContextStore:
+    def __init__(self, max_entries: int = 10000, max_idle_seconds: float = 3600.0, history_size: int = 5):
+        self.max_entries = max_entries
+        self.max_idle_seconds = max_idle_seconds
+        self.history_size = history_size
+
+        self._contexts = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'created': 0, 'evicted_capacity': 0, 'evicted_idle': 0, 'cleared': 0}
+        self._lock_stats = {'acquisitions': 0, 'contended': 0, 'wait_ms': 0.0}
+
+    @contextmanager
+    def _locked(self):
+        contended = not self._lock.acquire(blocking=False)
+        if contended:
+            start = time.perf_counter()
+            self._lock.acquire()
+            waited = time.perf_counter() - start
+        try:
+            self._lock_stats['acquisitions'] += 1
+            if contended:
+                self._lock_stats['contended'] += 1
+                self._lock_stats['wait_ms'] += waited * 1000
+            yield
+        finally:
+            self._lock.release()
+
+    @classmethod
+    def from_environment(cls) -> 'ContextStore':
+        return cls(
+            max_entries=int(os.environ.get('CONTEXT_MAX_ENTRIES', 10000)),
+            max_idle_seconds=float(os.environ.get('CONTEXT_MAX_IDLE_SECONDS', 3600))
+        )
+
+    def _evict_idle(self, now: float):
+        # Every access moves the context to the end, so the idlest ones sit at the front
+        contexts = self._contexts
+        while contexts:
+            context = next(iter(contexts.values()))
+            if now - context.last_seen < self.max_idle_seconds:
+                break
+            contexts.popitem(last=False)
+            self._stats['evicted_idle'] += 1
+
+    def _touch(self, user_id: int, create: bool) -> Optional[ConversationContext]:
+        now = time.monotonic()
+        self._evict_idle(now)
+
+        context = self._contexts.get(user_id)
+        if context is None:
+            if not create:
+                return None
+            context = ConversationContext(user_id, self.history_size)
+            self._contexts[user_id] = context
+            self._stats['created'] += 1
+            while len(self._contexts) > self.max_entries:
+                self._contexts.popitem(last=False)
+                self._stats['evicted_capacity'] += 1
+        else:
+            self._contexts.move_to_end(user_id)
+
+        context.last_seen = now
+        return context
+
+    def get(self, user_id: int) -> Optional[ConversationContext]:
+        with self._locked():
+            return self._touch(user_id, create=False)
+
+    def get_or_create(self, user_id: int) -> ConversationContext:
+        with self._locked():
+            return self._touch(user_id, create=True)
+
+    def record(self, user_id: int, message: str, intent: str, response: str) -> ConversationContext:
+        with self._locked():
+            context = self._touch(user_id, create=True)
+            context.record(message, intent, response)
+            return context
+
+    def summary(self, user_id: int) -> Optional[Dict[str, Any]]:
+        with self._locked():
+            context = self._touch(user_id, create=False)
+            return context.summary() if context else None
+
+    def discard(self, user_id: int) -> bool:
+        with self._locked():
+            if self._contexts.pop(user_id, None) is None:
+                return False
+            self._stats['cleared'] += 1
+            return True
+
+    def __len__(self) -> int:
+        return len(self._contexts)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._locked():
+            self._evict_idle(time.monotonic())
+            return {
+                'live_contexts': len(self._contexts),
+                'max_entries': self.max_entries,
+                'max_idle_seconds': self.max_idle_seconds,
+                **self._stats,
+                'lock': dict(self._lock_stats)
+            }
+
+class ShardedContextStore:
+    def __init__(self, shards: int = 16, max_entries: int = 10000, max_idle_seconds: float = 3600.0,
+                 history_size: int = 5):
+        per_shard = -(-max_entries // shards)
+        self.max_entries = max_entries
+        self.max_idle_seconds = max_idle_seconds
+        self.shards = tuple(ContextStore(per_shard, max_idle_seconds, history_size) for _ in range(shards))
+
+    @classmethod
+    def from_environment(cls) -> 'ShardedContextStore':
+        return cls(
+            shards=int(os.environ.get('CONTEXT_SHARDS', 16)),
+            max_entries=int(os.environ.get('CONTEXT_MAX_ENTRIES', 10000)),
+            max_idle_seconds=float(os.environ.get('CONTEXT_MAX_IDLE_SECONDS', 3600))
+        )
+
+    def shard_for(self, user_id) -> ContextStore:
+        return self.shards[hash(user_id) % len(self.shards)]
+
+    def get(self, user_id) -> Optional[ConversationContext]:
+        return self.shard_for(user_id).get(user_id)
+
+    def get_or_create(self, user_id) -> ConversationContext:
+        return self.shard_for(user_id).get_or_create(user_id)
+
+    def record(self, user_id, message: str, intent: str, response: str) -> ConversationContext:
+        return self.shard_for(user_id).record(user_id, message, intent, response)
+
+    def summary(self, user_id) -> Optional[Dict[str, Any]]:
+        return self.shard_for(user_id).summary(user_id)
+
+    def discard(self, user_id) -> bool:
+        return self.shard_for(user_id).discard(user_id)
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self.shards)
+
+    def get_stats(self) -> Dict[str, Any]:
+        shard_stats = [shard.get_stats() for shard in self.shards]
+        totals = {key: sum(stats[key] for stats in shard_stats)
+                  for key in ('live_contexts', 'created', 'evicted_capacity', 'evicted_idle', 'cleared')}
+        acquisitions = sum(stats['lock']['acquisitions'] for stats in shard_stats)
+        contended = sum(stats['lock']['contended'] for stats in shard_stats)
+
+        return {
+            **totals,
+            'max_entries': self.max_entries,
+            'max_idle_seconds': self.max_idle_seconds,
+            'shards': len(self.shards),
+            'lock': {
+                'acquisitions': acquisitions,
+                'contended': contended,
+                'contention_rate': round(contended / acquisitions, 4) if acquisitions else 0.0,
+                'wait_ms': round(sum(stats['lock']['wait_ms'] for stats in shard_stats), 3),
+                'busiest_shard_contended': max(stats['lock']['contended'] for stats in shard_stats)
+            }
+        }
+
+class RemoteContextStore:
+    def __init__(self, backend, max_idle_seconds: float = 3600.0, history_size: int = 5,
+                 flush_interval: float = 0.05, batch_size: int = 64, lock_stripes: int = 16):
+        self.backend = backend
+        self.max_idle_seconds = max_idle_seconds
+        self.history_size = history_size
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        self._locks = tuple(threading.Lock() for _ in range(lock_stripes))
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher_lock = threading.Lock()
+        self._flusher = None
+        self._flusher_pid = None
+        self._stats = {'reads': 0, 'writes': 0, 'flushes': 0, 'flushed_contexts': 0,
+                       'coalesced_writes': 0, 'decode_errors': 0, 'flush_errors': 0}
+        atexit.register(self.flush)
+
+    def _lock_for(self, user_id) -> threading.Lock:
+        return self._locks[hash(user_id) % len(self._locks)]
+
+    def _load(self, user_id) -> Optional[ConversationContext]:
+        key = str(user_id)
+        with self._pending_lock:
+            data = self._pending.get(key)
+        if data is None:
+            self._stats['reads'] += 1
+            data = self.backend.get_many([key]).get(key)
+        if data is None:
+            return None
+
+        try:
+            return decode_context(user_id, data, self.history_size)
+        except (ValueError, struct.error, UnicodeDecodeError) as e:
+            self._stats['decode_errors'] += 1
+            logger.warning(f"Discarding undecodable context for user {user_id}: {e}")
+            return None
+
+    def _store(self, context: ConversationContext):
+        data = encode_context(context)
+        with self._pending_lock:
+            if str(context.user_id) in self._pending:
+                self._stats['coalesced_writes'] += 1
+            self._pending[str(context.user_id)] = data
+            self._stats['writes'] += 1
+            pending = len(self._pending)
+
+        if self.flush_interval <= 0 or pending >= self.batch_size:
+            self.flush()
+        else:
+            self._ensure_flusher()
+
+    def _ensure_flusher(self):
+        # Threads do not survive a fork, so a store built before gunicorn forks
+        # starts its flusher lazily inside each worker
+        if self._flusher_pid == os.getpid() and self._flusher.is_alive():
+            return
+        with self._flusher_lock:
+            if self._flusher_pid == os.getpid() and self._flusher.is_alive():
+                return
+            self._flusher = threading.Thread(target=self._run_flusher, name='context-flusher', daemon=True)
+            self._flusher_pid = os.getpid()
+            self._flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._pending_lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            try:
+                self.backend.set_many(batch, self.max_idle_seconds)
+            except Exception as e:
+                self._stats['flush_errors'] += 1
+                logger.error(f"Error writing {len(batch)} conversation contexts: {e}")
+                with self._pending_lock:
+                    for key, data in batch.items():
+                        self._pending.setdefault(key, data)
+                return 0
+
+            self._stats['flushes'] += 1
+            self._stats['flushed_contexts'] += len(batch)
+            return len(batch)
+
+    def get(self, user_id) -> Optional[ConversationContext]:
+        with self._lock_for(user_id):
+            return self._load(user_id)
+
+    def get_or_create(self, user_id) -> ConversationContext:
+        with self._lock_for(user_id):
+            context = self._load(user_id)
+            if context is None:
+                context = ConversationContext(user_id, self.history_size)
+                self._store(context)
+            return context
+
+    def record(self, user_id, message: str, intent: str, response: str) -> ConversationContext:
+        with self._lock_for(user_id):
+            context = self._load(user_id) or ConversationContext(user_id, self.history_size)
+            context.record(message, intent, response)
+            self._store(context)
+            return context
+
+    def summary(self, user_id) -> Optional[Dict[str, Any]]:
+        context = self.get(user_id)
+        return context.summary() if context else None
+
+    def discard(self, user_id) -> bool:
+        with self._lock_for(user_id):
+            with self._pending_lock:
+                pending = self._pending.pop(str(user_id), None)
+            return self.backend.delete(str(user_id)) or pending is not None
+
+    def __len__(self) -> int:
+        return self.backend.count() or 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {
+            'backend': self.backend.NAME,
+            'live_contexts': self.backend.count(),
+            'max_idle_seconds': self.max_idle_seconds,
+            'flush_interval': self.flush_interval,
+            'pending_writes': pending,
+            **self._stats
+        }
+
+def create_context_store():
+    backend_name = os.environ.get('CONTEXT_BACKEND', 'memory').lower()
+    if backend_name == 'memory':
+        return ShardedContextStore.from_environment()
+
+    from models.context_backends import create_backend
+    return RemoteContextStore(
+        create_backend(backend_name),
+        max_idle_seconds=float(os.environ.get('CONTEXT_MAX_IDLE_SECONDS', 3600)),
+        flush_interval=float(os.environ.get('CONTEXT_FLUSH_SECONDS', 0.05)),
+        batch_size=int(os.environ.get('CONTEXT_BATCH_SIZE', 64))
+    )
@@ -1,92 +1,452 @@
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, Iterator, List, Any, NamedTuple, Optional, Tuple
 from datetime import datetime
+from concurrent.futures import TimeoutError as FutureTimeout
+import os
+import asyncio
+import time
 import logging
 
-from utils.intent_classifier import IntentClassifier
+from utils.cascade_classifier import CascadeIntentClassifier
 from models.query_generator import QueryGenerator
 from models.response_formatter import ResponseFormatter
-from database.connection import DatabaseConnection
+from database.connection import DatabaseConnection, with_max_execution_time
+from utils.message_analysis import MessageAnalysis
+from utils.metrics import MetricsRegistry, process_memory_bytes
+from utils.tracing import Tracer, annotate, bind, span
+from utils.profiler import run_untagged, tag_thread, untag_thread
+from models.context_store import ConversationContext, RemoteContextStore, create_context_store
+from training.training_data import add_training_example, register_example_listener, unregister_example_listener
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_DASHBOARD_INTENTS = ('estadisticas_generales', 'alumnos_riesgo', 'materias_criticas', 'capacidad_grupos')
+
+class MessagePlan(NamedTuple):
+    # Everything decided before the DB round trip; result is set when the
+    # message is answered without a query
+    message: str
+    user_id: int
+    role: str
+    intent: str
+    query: Optional[str]
+    params: Optional[list]
+    result: Optional[Dict[str, Any]]
+    session: Any = None
+
 class ConversationAI:
     def __init__(self):
-        self.intent_classifier = IntentClassifier()
+        self.intent_classifier = CascadeIntentClassifier.from_environment()
         self.query_generator = QueryGenerator()
         self.response_formatter = ResponseFormatter()
         self.db = DatabaseConnection()
-        self.conversation_contexts = {}
+        self.conversation_contexts = create_context_store()
+        # The sqlite and kv backends do blocking I/O on every get and record
+        self.contexts_block = isinstance(self.conversation_contexts, RemoteContextStore)
+        self.online_trainer = None
+        self.pattern_store = self.intent_classifier.keyword_classifier.pattern_store
+        self.metrics = MetricsRegistry()
+        self.tracer = Tracer.from_environment()
+        self.started_at = time.time()
+        self.dashboard_intents = tuple(
+            intent.strip() for intent in os.environ.get('DASHBOARD_INTENTS', ','.join(DEFAULT_DASHBOARD_INTENTS)).split(',')
+            if intent.strip()
+        )
+        self.dashboard_timeout = float(os.environ.get('DASHBOARD_TIMEOUT_SECONDS', 5))
+        # Per-intent overrides, e.g. DASHBOARD_TIMEOUTS="alumnos_riesgo=8,materias_criticas=3"
+        self.dashboard_timeouts = {
+            intent.strip(): float(seconds)
+            for intent, _, seconds in (item.partition('=') for item in os.environ.get('DASHBOARD_TIMEOUTS', '').split(','))
+            if intent.strip() and seconds
+        }
+        
+        register_example_listener(self.intent_classifier.add_example)
+        self._register_metric_collectors()
+        
+        if os.environ.get('ONLINE_TRAINING', 'False').lower() == 'true':
+            self._start_online_training()
     
-    def process_message(self, message: str, user_id: int = 1, role: str = 'alumno') -> Dict[str, Any]:
+    def _start_online_training(self):
         try:
-            if not message or not message.strip():
-                return {
-                    "success": True,
-                    "response": "Parece que no escribiste nada. ¿En qué te puedo ayudar? Puedo darte información sobre estadísticas del sistema, alumnos, carreras, grupos, calificaciones y mucho más.",
-                    "intent": "mensaje_vacio",
-                    "has_data": False
-                }
-            
-            context = self.get_conversation_context(user_id)
-            intent = self.intent_classifier.classify_intent(message, context)
-            
-            logger.info(f"Usuario {user_id} ({role}): {message[:50]}... -> Intent: {intent}")
-            
-            if self._is_conversational_intent(intent):
-                response = self.response_formatter.format_response(intent, None, message, role)
-                self.update_context(user_id, message, intent, response)
+            from training.online_trainer import OnlineIntentTrainer
+        except ImportError as e:
+            logger.error(f"Entrenamiento en línea no disponible: {e}")
+            return
+        
+        trainer = OnlineIntentTrainer.from_environment(self.intent_classifier.model_path)
+        trainer.publish_listeners.append(lambda: self.intent_classifier.reload_model_if_changed(force=True))
+        register_example_listener(trainer.submit)
+        trainer.start()
+        self.online_trainer = trainer
+    
+    def close(self):
+        # TRAINING_DATA listeners are module-wide and would keep a closed
+        # system (and its trainer) receiving examples
+        unregister_example_listener(self.intent_classifier.add_example)
+        if self.online_trainer:
+            unregister_example_listener(self.online_trainer.submit)
+            self.online_trainer.stop()
+            self.online_trainer = None
+        self.db.shutdown_executors()
+    
+    def _register_metric_collectors(self):
+        metrics = self.metrics
+        metrics.register_collector('process_start_time_seconds', 'Unix time the AI system was loaded',
+                                   lambda: [({}, self.started_at)])
+        metrics.register_collector('process_resident_memory_bytes', 'Resident memory of this worker',
+                                   lambda: [({}, process_memory_bytes())])
+        
+        def pool_connections():
+            stats = self.db.get_stats()
+            return [({'state': 'size'}, stats['pool_size']), ({'state': 'in_use'}, stats['in_use']),
+                    ({'state': 'waiting'}, stats['waiting'])]
+        
+        def pool_queries():
+            stats = self.db.get_stats()
+            return [({'result': 'ok'}, stats['queries']), ({'result': 'error'}, stats['errors']),
+                    ({'result': 'pool_timeout'}, stats['pool_timeouts'])]
+        
+        metrics.register_collector('db_pool_connections', 'Database pool connections by state', pool_connections)
+        metrics.register_collector('db_queries_total', 'Database queries by result', pool_queries, kind='counter')
+        metrics.register_collector('context_store_contexts', 'Live conversation contexts',
+                                   lambda: [({}, self.conversation_contexts.get_stats()['live_contexts'])])
+        
+        def classifier_tiers():
+            tiers = self.intent_classifier.get_stats()['tiers']
+            return [({'tier': tier}, stats['hits']) for tier, stats in tiers.items()]
+        
+        def spelling_cache():
+            spelling = self.intent_classifier.get_stats()['spelling']
+            return [({'result': 'hit'}, spelling['cache_hits']), ({'result': 'miss'}, spelling['cache_misses'])]
+        
+        metrics.register_collector('classifier_tier_hits_total', 'Messages classified by each cascade tier',
+                                   classifier_tiers, kind='counter')
+        metrics.register_collector('spelling_cache_lookups_total', 'Spelling corrector cache lookups',
+                                   spelling_cache, kind='counter')
+        metrics.register_collector('spelling_cache_entries', 'Entries in the spelling corrector cache',
+                                   lambda: [({}, self.intent_classifier.get_stats()['spelling']['cache_entries'])])
+    
+    def _observe_result(self, result: Dict[str, Any], start: float) -> Dict[str, Any]:
+        annotate(intent=result['intent'], success=result['success'])
+        self.metrics.observe('total', result['intent'], time.perf_counter() - start)
+        self.metrics.increment('messages_total', intent=result['intent'],
+                               outcome='ok' if result['success'] else 'error')
+        return result
+    
+    @property
+    def patterns(self):
+        return self.pattern_store.current
+    
+    def add_training_example(self, message: str, intent: str) -> bool:
+        return add_training_example(intent, message.strip().lower())
+    
+    def process_message(self, message: str, user_id: int = 1, role: str = 'alumno') -> Dict[str, Any]:
+        start = time.perf_counter()
+        with self.tracer.trace('process_message', user_id=user_id, role=role):
+            try:
+                plan = self._plan_message(message, user_id, role)
+                if plan.result is not None:
+                    return self._observe_result(plan.result, start)
                 
-                return {
-                    "success": True,
-                    "response": response,
-                    "intent": intent,
-                    "has_data": False,
-                    "conversational": True
-                }
-            
-            query, params = self.query_generator.generate_query(message, intent, user_id, role)
-            
-            if not query:
-                suggested_response = self._generate_helpful_suggestion(message, intent, role)
-                self.update_context(user_id, message, 'consulta_sugerencia', suggested_response)
+                query_start = time.perf_counter()
+                data = self.db.execute_query(plan.query, plan.params, plan.intent)
+                self.metrics.observe('db_execute', plan.intent, time.perf_counter() - query_start)
+                return self._observe_result(self._complete_message(plan, data), start)
                 
-                return {
-                    "success": True,
-                    "response": suggested_response,
-                    "intent": "consulta_sugerencia",
-                    "has_data": False,
-                    "helpful_suggestion": True
-                }
-            
-            data = self.db.execute_query(query, params)
-            response = self.response_formatter.format_response(intent, data, message, role)
-            response = self.response_formatter.add_suggestions(response, intent, role)
-            
-            self.update_context(user_id, message, intent, response)
+            except Exception as e:
+                return self._observe_result(self._error_result(e), start)
+            finally:
+                untag_thread()
+    
+    async def process_message_async(self, message: str, user_id: int = 1, role: str = 'alumno',
+                                    session=None) -> Dict[str, Any]:
+        # Planning and formatting also read and write the conversation context;
+        # with the in-memory store that is CPU work measured in microseconds and
+        # stays on the event loop, with a remote one it goes to a worker thread
+        start = time.perf_counter()
+        with self.tracer.trace('process_message', user_id=user_id, role=role):
+            try:
+                plan = await self.run_context_io(self._plan_message, message, user_id, role, session)
+                if plan.result is not None:
+                    return self._observe_result(plan.result, start)
+                
+                query_start = time.perf_counter()
+                data = await self.db.execute_query_async(plan.query, plan.params, plan.intent)
+                self.metrics.observe('db_execute', plan.intent, time.perf_counter() - query_start)
+                return self._observe_result(await self.run_context_io(self._complete_message, plan, data), start)
+                
+            except Exception as e:
+                return self._observe_result(self._error_result(e), start)
+            finally:
+                untag_thread()
+    
+    async def run_context_io(self, fn, *args):
+        if not self.contexts_block:
+            return fn(*args)
+        return await asyncio.to_thread(run_untagged, fn, *args)
+    
+    def stream_message(self, message: str, user_id: int = 1, role: str = 'alumno') -> Iterator[Tuple[str, Dict[str, Any]]]:
+        # Yields (event, payload): meta once the intent is known, chunk for each
+        # formatted section as rows arrive, then done or error
+        try:
+            yield from self._stream_events(message, user_id, role)
+        finally:
+            untag_thread()
+    
+    def _stream_events(self, message: str, user_id: int, role: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        try:
+            plan = self._plan_message(message, user_id, role)
+        except Exception as e:
+            yield "error", self._error_result(e)
+            return
+        
+        if plan.result is not None:
+            yield "meta", {"intent": plan.result["intent"]}
+            yield "chunk", {"text": plan.result["response"]}
+            yield "done", {key: value for key, value in plan.result.items() if key != "response"}
+            return
+        
+        yield "meta", {"intent": plan.intent}
+        # Each step may resume on a different executor thread
+        tag_thread(plan.intent)
+        
+        data_count = 0
+        head = ""
+        
+        def counted(rows):
+            nonlocal data_count
+            for row in rows:
+                data_count += 1
+                yield row
+        
+        rows = self.db.stream_query(plan.query, plan.params, intent=plan.intent)
+        try:
+            for text in self.response_formatter.stream_response(plan.intent, counted(rows), plan.message, plan.role):
+                # The context only keeps the start of a response
+                if len(head) < 100:
+                    head += text[:100]
+                yield "chunk", {"text": text}
+                tag_thread(plan.intent)
+        except Exception as e:
+            yield "error", self._error_result(e)
+            return
+        finally:
+            rows.close()
+        
+        self.update_context(plan.user_id, plan.message, plan.intent, head)
+        
+        yield "done", {
+            "success": True,
+            "intent": plan.intent,
+            "has_data": data_count > 0,
+            "data_count": data_count,
+            "query_executed": True
+        }
+    
+    def process_batch(self, messages: List[str], user_id: int = 1, role: str = 'alumno') -> Dict[str, Any]:
+        plans = []
+        for message in messages:
+            try:
+                plans.append(self._plan_message(message, user_id, role))
+            except Exception as e:
+                plans.append(MessagePlan(message, user_id, role, "error_sistema", None, None, self._error_result(e)))
+        
+        # Canned dashboard questions often map to the same SQL, so each distinct
+        # query runs once, concurrently on the connection pool's executor
+        pending = {}
+        for plan in plans:
+            if plan.result is None:
+                key = (plan.query, tuple(plan.params or ()))
+                if key not in pending:
+                    pending[key] = self.db.executor.submit(bind(self.db.execute_query), plan.query, plan.params,
+                                                           plan.intent)
+        
+        results = []
+        for plan in plans:
+            if plan.result is not None:
+                results.append(plan.result)
+                continue
+            try:
+                data = pending[(plan.query, tuple(plan.params or ()))].result()
+                results.append(self._complete_message(plan, data))
+            except Exception as e:
+                results.append(self._error_result(e))
+        
+        untag_thread()
+        query_plans = sum(plan.result is None for plan in plans)
+        return {
+            "results": results,
+            "queries_executed": len(pending),
+            "queries_deduplicated": query_plans - len(pending)
+        }
+    
+    def get_dashboard_intents(self) -> List[str]:
+        # Only templates without placeholders can run without a message
+        return [intent for intent, template in self.query_generator.directivo_queries.items()
+                if '%s' not in template['query']]
+    
+    def build_dashboard(self, role: str = 'directivo', intents: Optional[List[str]] = None,
+                        timeout: Optional[float] = None) -> Dict[str, Any]:
+        intents = list(dict.fromkeys(intents or self.dashboard_intents))
+        start = time.perf_counter()
+        sections = {}
+        pending = {}
+        
+        for intent in intents:
+            intent_timeout = timeout if timeout is not None else self.dashboard_timeouts.get(intent, self.dashboard_timeout)
+            future = self.db.executor.submit(bind(self._run_dashboard_section), intent, role, intent_timeout, start)
+            pending[intent] = (future, start + intent_timeout)
+        
+        for intent, (future, deadline) in pending.items():
+            try:
+                sections[intent] = future.result(timeout=max(deadline - time.perf_counter(), 0))
+            except FutureTimeout:
+                # A queued section is dropped; a running one is cut short by the
+                # server-side execution limit
+                future.cancel()
+                sections[intent] = self._dashboard_section_result(intent, "timeout", start,
+                                                                  error="Tiempo de espera agotado")
+            except Exception as e:
+                logger.error(f"Error en sección de dashboard {intent}: {e}")
+                sections[intent] = self._dashboard_section_result(intent, "error", start, error=str(e))
+        
+        ordered = [sections[intent] for intent in intents]
+        completed = sum(section["status"] == "ok" for section in ordered)
+        
+        return {
+            "success": completed > 0,
+            "partial": 0 < completed < len(ordered),
+            "sections": ordered,
+            "completed_sections": completed,
+            "total_sections": len(ordered),
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
+    
+    def _run_dashboard_section(self, intent: str, role: str, timeout: float, start: float) -> Dict[str, Any]:
+        tag_thread(intent)
+        try:
+            return self._dashboard_section(intent, role, timeout, start)
+        finally:
+            untag_thread()
+    
+    def _dashboard_section(self, intent: str, role: str, timeout: float, start: float) -> Dict[str, Any]:
+        query_start = time.perf_counter()
+        query = self.query_generator.directivo_queries[intent]['query']
+        data = self.db.execute_query(with_max_execution_time(query, timeout), intent=intent)
+        query_ms = (time.perf_counter() - query_start) * 1000
+        
+        if data is None:
+            return self._dashboard_section_result(intent, "error", start, error="Error ejecutando consulta",
+                                                  query_ms=query_ms)
+        
+        response = self.response_formatter.format_response(intent, data, "", role)
+        return self._dashboard_section_result(intent, "ok", start, response=response,
+                                              data_count=len(data), query_ms=query_ms)
+    
+    def _dashboard_section_result(self, intent: str, status: str, start: float, response: Optional[str] = None,
+                                  data_count: int = 0, query_ms: Optional[float] = None,
+                                  error: Optional[str] = None) -> Dict[str, Any]:
+        section = {
+            "intent": intent,
+            "title": self.query_generator.get_query_description(intent),
+            "status": status,
+            "response": response,
+            "data_count": data_count,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            "query_ms": round(query_ms, 2) if query_ms is not None else None
+        }
+        if error:
+            section["error"] = error
+        return section
+    
+    def _plan_message(self, message: str, user_id: int, role: str, session=None) -> MessagePlan:
+        if not message or not message.strip():
+            return MessagePlan(message, user_id, role, "mensaje_vacio", None, None, {
+                "success": True,
+                "response": "Parece que no escribiste nada. ¿En qué te puedo ayudar? Puedo darte información sobre estadísticas del sistema, alumnos, carreras, grupos, calificaciones y mucho más.",
+                "intent": "mensaje_vacio",
+                "has_data": False
+            })
+        
+        start = time.perf_counter()
+        tag_thread('clasificacion')
+        analysis = MessageAnalysis.from_message(message)
+        # A chat session pins its context, so it skips the store lookup
+        context = session.context if session is not None else self.conversation_contexts.get(user_id)
+        intent = self.intent_classifier.classify_intent(message, context, analysis)
+        classified = time.perf_counter()
+        self.metrics.observe('classify', intent, classified - start)
+        tag_thread(intent)
+        
+        logger.info(f"Usuario {user_id} ({role}): {message[:50]}... -> Intent: {intent}")
+        
+        if self._is_conversational_intent(intent):
+            response = self.response_formatter.format_response(intent, None, message, role)
+            self.metrics.observe('format', intent, time.perf_counter() - classified)
+            self.update_context(user_id, message, intent, response, session)
             
-            return {
+            return MessagePlan(message, user_id, role, intent, None, None, {
                 "success": True,
                 "response": response,
                 "intent": intent,
-                "has_data": bool(data),
-                "data_count": len(data) if data else 0,
-                "query_executed": True
-            }
-            
-        except Exception as e:
-            logger.error(f"Error procesando mensaje: {e}")
-            error_response = "Lo siento, tuve un problema procesando tu mensaje. ¿Puedes intentar reformulándolo? Por ejemplo: '¿Cuántos alumnos hay?', '¿Qué carreras están disponibles?', o '¿Cuáles son las estadísticas generales?'"
+                "has_data": False,
+                "conversational": True
+            })
+        
+        query, params = self.query_generator.generate_query(message, intent, user_id, role, analysis)
+        self.metrics.observe('generate_query', intent, time.perf_counter() - classified)
+        
+        if not query:
+            suggested_response = self._generate_helpful_suggestion(message, intent, role, analysis)
+            self.update_context(user_id, message, 'consulta_sugerencia', suggested_response, session)
             
-            return {
-                "success": False,
-                "response": error_response,
-                "intent": "error_sistema",
-                "error": str(e),
-                "has_data": False
-            }
+            return MessagePlan(message, user_id, role, 'consulta_sugerencia', None, None, {
+                "success": True,
+                "response": suggested_response,
+                "intent": "consulta_sugerencia",
+                "has_data": False,
+                "helpful_suggestion": True
+            })
+        
+        return MessagePlan(message, user_id, role, intent, query, params, None, session)
+    
+    def _complete_message(self, plan: MessagePlan, data: Optional[List[Dict[str, Any]]]) -> Dict[str, Any]:
+        # Under asyncio other messages ran while this one awaited the DB
+        tag_thread(plan.intent)
+        start = time.perf_counter()
+        response = self.response_formatter.format_response(plan.intent, data, plan.message, plan.role)
+        formatted = time.perf_counter()
+        response = self.response_formatter.add_suggestions(response, plan.intent, plan.role)
+        self.metrics.observe('format', plan.intent, formatted - start)
+        self.metrics.observe('add_suggestions', plan.intent, time.perf_counter() - formatted)
+        
+        self.update_context(plan.user_id, plan.message, plan.intent, response, plan.session)
+        
+        return {
+            "success": True,
+            "response": response,
+            "intent": plan.intent,
+            "has_data": bool(data),
+            "data_count": len(data) if data else 0,
+            "query_executed": True
+        }
     
-    def _generate_helpful_suggestion(self, message: str, intent: str, role: str) -> str:
-        message_lower = message.lower()
+    def _error_result(self, error: Exception) -> Dict[str, Any]:
+        logger.error(f"Error procesando mensaje: {error}")
+        error_response = "Lo siento, tuve un problema procesando tu mensaje. ¿Puedes intentar reformulándolo? Por ejemplo: '¿Cuántos alumnos hay?', '¿Qué carreras están disponibles?', o '¿Cuáles son las estadísticas generales?'"
+        
+        return {
+            "success": False,
+            "response": error_response,
+            "intent": "error_sistema",
+            "error": str(error),
+            "has_data": False
+        }
+    
+    def _generate_helpful_suggestion(self, message: str, intent: str, role: str,
+                                     analysis: Optional[MessageAnalysis] = None) -> str:
+        if analysis is None:
+            analysis = MessageAnalysis.from_message(message)
+        message_lower = analysis.raw_lower
         
         if any(word in message_lower for word in ['hola', 'hi', 'hello', 'buenas']):
             return "¡Buenos días! Soy su asistente administrativo de DTAI. Tengo acceso completo al sistema para proporcionarle información sobre: alumnos en riesgo, matrículas específicas, ubicación de grupos, horarios, cargas de profesores, materias problemáticas, solicitudes urgentes y estadísticas completas. ¿Qué información necesita para la gestión académica?"
@@ -106,31 +466,15 @@ class ConversationAI:
 
 Pregúnteme cualquier cosa para la toma de decisiones administrativas."""
         
-        directivo_suggestions = {
-            'alumnos': "Como directivo, puede consultar: '¿Qué alumnos tienen las calificaciones más bajas?', '¿Cuáles son las matrículas en riesgo?', o buscar por matrícula específica.",
-            'profesores': "Información disponible: '¿Qué profesores tienen más carga?', '¿Quiénes están sobrecargados?', '¿Cómo está distribuida la carga académica?'",
-            'grupos': "Consultas de grupos: '¿Dónde está ubicado el grupo X?', '¿Qué grupos están llenos?', '¿Cuáles son los horarios de los grupos?'",
-            'materias': "Análisis de materias: '¿Cuáles son las materias más reprobadas?', '¿Qué asignaturas son problemáticas?', '¿Dónde necesitamos refuerzo académico?'",
-            'carreras': "Rendimiento por carreras: '¿Cómo va cada carrera?', '¿Cuál tiene mejor rendimiento?', '¿Dónde hay más problemas académicos?'",
-            'estadisticas': "Estadísticas completas: '¿Cuántos alumnos, profesores y grupos hay?', '¿Cuáles son los números generales?', '¿Qué datos críticos hay?'",
-            'riesgo': "Gestión de riesgo: '¿Qué alumnos están en situación crítica?', '¿Cuántos reportes de riesgo hay?', '¿Qué casos requieren atención inmediata?'",
-            'solicitudes': "Solicitudes administrativas: '¿Qué solicitudes están pendientes?', '¿Cuáles son urgentes?', '¿Qué casos necesitan atención?'"
-        }
+        suggestions = self.patterns.tables['suggestions']
         
-        for keyword, suggestion in directivo_suggestions.items():
+        for keyword, suggestion in suggestions['by_topic'].items():
             if keyword in message_lower:
                 return suggestion
         
-        if len(message.split()) == 1:
+        if analysis.word_count == 1:
             word = message_lower.strip()
-            quick_responses = {
-                'estadisticas': "Para estadísticas: '¿Cuáles son las estadísticas generales del sistema?'",
-                'grupos': "Para grupos: '¿Qué grupos hay?' o '¿Dónde está el grupo [nombre]?'",
-                'riesgo': "Para riesgo: '¿Qué alumnos están en riesgo?' o '¿Cuáles son los casos críticos?'",
-                'materias': "Para materias: '¿Cuáles son las materias más reprobadas?'",
-                'profesores': "Para profesores: '¿Cómo está la carga de profesores?'",
-                'alumnos': "Para alumnos: '¿Quiénes tienen bajo rendimiento?' o busque por matrícula"
-            }
+            quick_responses = suggestions['single_word']
             if word in quick_responses:
                 return quick_responses[word]
         
@@ -147,54 +491,33 @@ Como directivo, puede consultar:
 
 ¿Podría ser más específico con su consulta administrativa?"""
     
-    def get_conversation_context(self, user_id: int) -> Dict[str, Any]:
-        if user_id not in self.conversation_contexts:
-            self.conversation_contexts[user_id] = {
-                'messages': [],
-                'last_intent': None,
-                'session_start': datetime.now()
-            }
-        return self.conversation_contexts[user_id]
+    def get_conversation_context(self, user_id: int) -> ConversationContext:
+        return self.conversation_contexts.get_or_create(user_id)
     
-    def update_context(self, user_id: int, message: str, intent: str, response: str):
-        context = self.get_conversation_context(user_id)
-        
-        context['messages'].append({
-            'user_message': message[:100],
-            'bot_response': response[:100],
-            'intent': intent,
-            'timestamp': datetime.now()
-        })
-        
-        context['last_intent'] = intent
-        
-        if len(context['messages']) > 5:
-            context['messages'] = context['messages'][-5:]
+    def update_context(self, user_id: int, message: str, intent: str, response: str, session=None):
+        with span('update_context'):
+            context = self.conversation_contexts.record(user_id, message, intent, response)
+        if session is not None:
+            session.context = context
     
     def clear_context(self, user_id: int) -> bool:
-        if user_id in self.conversation_contexts:
-            del self.conversation_contexts[user_id]
-            return True
-        return False
+        return self.conversation_contexts.discard(user_id)
     
     def get_context_summary(self, user_id: int) -> Dict[str, Any]:
-        context = self.get_conversation_context(user_id)
+        summary = self.conversation_contexts.summary(user_id)
+        if summary is None:
+            return {
+                "user_id": user_id,
+                "messages_count": 0,
+                "last_intent": None,
+                "session_duration_minutes": 0.0,
+                "recent_intents": []
+            }
         
-        return {
-            "user_id": user_id,
-            "messages_count": len(context['messages']),
-            "last_intent": context['last_intent'],
-            "session_duration_minutes": (datetime.now() - context['session_start']).total_seconds() / 60,
-            "recent_intents": [msg['intent'] for msg in context['messages'][-3:]]
-        }
+        return summary
     
     def _is_conversational_intent(self, intent: str) -> bool:
-        conversational_intents = [
-            'saludo', 'despedida', 'agradecimiento', 'pregunta_estado', 
-            'pregunta_identidad', 'emocional_negativo', 'emocional_positivo',
-            'afirmacion', 'negacion'
-        ]
-        return intent in conversational_intents
+        return intent in self.patterns.conversational_intents
     
     def get_available_commands(self, role: str = 'directivo') -> Dict[str, Any]:
         directivo_commands = [
@@ -218,14 +541,14 @@ Como directivo, puede consultar:
             "total_commands": len(directivo_commands)
         }
     
-    def analyze_query_complexity(self, message: str) -> Dict[str, Any]:
+    def analyze_query_complexity(self, message: str, analysis: Optional[MessageAnalysis] = None) -> Dict[str, Any]:
         complexity_indicators = {
             'simple': ['que', 'cual', 'cuanto', 'quien', 'hola', 'gracias'],
             'medium': ['como', 'donde', 'cuando', 'por que', 'estadisticas', 'informacion'],
             'complex': ['analizar', 'comparar', 'evaluar', 'generar reporte', 'detallado', 'completo']
         }
         
-        message_lower = message.lower()
+        message_lower = (analysis or MessageAnalysis.from_message(message)).raw_lower
         complexity = 'simple'
         indicators_found = []
         
@@ -246,20 +569,7 @@ Como directivo, puede consultar:
         }
     
     def validate_user_permissions(self, role: str, intent: str) -> Tuple[bool, str]:
-        role_permissions = {
-            'alumno': [
-                'calificaciones', 'horarios', 'estadisticas_generales', 'carreras', 'grupos',
-                'saludo', 'despedida', 'agradecimiento', 'pregunta_estado', 'pregunta_identidad'
-            ],
-            'profesor': [
-                'alumnos_riesgo', 'grupos', 'estadisticas_generales', 'materias_reprobadas',
-                'calificaciones', 'horarios', 'carreras', 'profesores', 'solicitudes_ayuda'
-            ],
-            'directivo': [
-                'estadisticas_generales', 'alumnos_riesgo', 'carreras', 'materias_reprobadas', 
-                'solicitudes_ayuda', 'grupos', 'profesores', 'alumnos'
-            ]
-        }
+        role_permissions = self.patterns.tables['role_permissions']
         
         allowed_intents = role_permissions.get(role, role_permissions['alumno'])
         
@@ -268,20 +578,39 @@ Como directivo, puede consultar:
         
         return False, f"No tienes permisos para realizar consultas de tipo '{intent}'"
     
+    def get_memory_stats(self) -> Dict[str, Any]:
+        # Sizes of the long-lived structures a worker grows over its lifetime
+        spelling = self.intent_classifier.get_stats()['spelling']
+        return {
+            "resident_bytes": process_memory_bytes(),
+            "conversation_contexts": len(self.conversation_contexts),
+            "spelling_cache_entries": spelling['cache_entries'],
+            "indexed_examples": len(self.intent_classifier.example_index),
+            "query_fingerprints": len(self.db.query_log),
+            "buffered_traces": self.tracer.get_stats()['buffered'],
+            "metric_histograms": self.metrics.histogram_count()
+        }
+    
     def get_system_status(self) -> Dict[str, Any]:
         try:
             db_status = self.db.test_connection()
-            active_contexts = len(self.conversation_contexts)
+            context_stats = self.conversation_contexts.get_stats()
             
             return {
                 "system_status": "online",
                 "database_connection": "connected" if db_status else "disconnected",
-                "active_conversations": active_contexts,
+                "database_pool": self.db.get_stats(),
+                "active_conversations": context_stats['live_contexts'],
+                "conversation_contexts": context_stats,
                 "ai_components": {
                     "intent_classifier": "ready",
                     "query_generator": "ready", 
                     "response_formatter": "ready"
                 },
+                "intent_classification": self.intent_classifier.get_stats(),
+                "stage_latency": {stage: self.metrics.stage_summary(stage) for stage in self.metrics.stage_names()},
+                "tracing": self.tracer.get_stats(),
+                "online_training": self.online_trainer.get_status() if self.online_trainer else None,
                 "capabilities": [
                     "Conversación natural",
                     "Consultas SQL dinámicas",
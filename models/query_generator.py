@@ -1,8 +1,10 @@
 # models/query_generator.py
-import re
 from typing import Dict, List, Optional, Tuple
 import logging
 
+from utils.message_analysis import MessageAnalysis
+from utils.tracing import span
+
 logger = logging.getLogger(__name__)
 
 class QueryGenerator:
@@ -652,12 +654,21 @@ class QueryGenerator:
             
         }
     
-    def generate_query(self, message: str, intent: str, user_id: Optional[int] = None, role: str = 'directivo') -> Tuple[Optional[str], list]:
-        message_lower = message.lower()
+    def generate_query(self, message: str, intent: str, user_id: Optional[int] = None, role: str = 'directivo',
+                       analysis: Optional[MessageAnalysis] = None) -> Tuple[Optional[str], list]:
+        with span('generate_query', intent=intent) as current:
+            query, params = self._generate_query(message, intent, analysis)
+            current.set(has_query=query is not None)
+            return query, params
+    
+    def _generate_query(self, message: str, intent: str,
+                        analysis: Optional[MessageAnalysis]) -> Tuple[Optional[str], list]:
+        if analysis is None:
+            analysis = MessageAnalysis.from_message(message)
+        message_lower = analysis.raw_lower
         
-        matricula_match = re.search(r'\b\d{8,12}\b', message)
-        if matricula_match and intent == 'matriculas_especificas':
-            return self.directivo_queries['matriculas_especificas']['query'], [matricula_match.group()]
+        if analysis.matriculas and intent == 'matriculas_especificas':
+            return self.directivo_queries['matriculas_especificas']['query'], [analysis.matricula]
         
         if intent in self.directivo_queries:
             return self.directivo_queries[intent]['query'], []
@@ -1,11 +1,16 @@
 import random
-from typing import Dict, List, Any, Optional
+import itertools
+from typing import Dict, Iterable, Iterator, List, Any, Optional
 from datetime import datetime
 import logging
 
+from utils.tracing import span
+
 logger = logging.getLogger(__name__)
 
 class ResponseFormatter:
+    DIAS_ORDEN = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado']
+    
     def __init__(self):
         self.conversational_responses = {
             'saludo': [
@@ -21,6 +26,10 @@ class ResponseFormatter:
         }
     
     def format_response(self, intent: str, data: Optional[List[Dict[str, Any]]], message: str = "", role: str = "directivo") -> str:
+        with span('format_response', intent=intent, rows=len(data) if data else 0):
+            return self._format_response(intent, data, message)
+    
+    def _format_response(self, intent: str, data: Optional[List[Dict[str, Any]]], message: str) -> str:
         if intent in self.conversational_responses:
             return random.choice(self.conversational_responses[intent])
         
@@ -49,6 +58,29 @@ class ResponseFormatter:
         formatter = formatters.get(intent, self._format_generic_administrative_data)
         return formatter(data, message)
     
+    def stream_response(self, intent: str, rows: Iterable[Dict[str, Any]], message: str = "",
+                        role: str = "directivo") -> Iterator[str]:
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            yield self.add_suggestions(self._format_no_data_response(intent, message), intent, role)
+            return
+        rows = itertools.chain((first,), rows)
+        
+        streamers = {
+            'horarios_grupos': self._stream_group_schedules,
+            'grupos_detalle': self._stream_group_details,
+            'alumnos_altas_calificaciones': self._stream_alumnos_altas_calificaciones
+        }
+        
+        streamer = streamers.get(intent)
+        if streamer:
+            yield from streamer(rows, message)
+        else:
+            yield self.format_response(intent, list(rows), message, role)
+        
+        yield f"\n\n{self._suggestion_for(intent)}"
+    
     def _format_general_statistics(self, data: List[Dict[str, Any]], message: str) -> str:
         response = "ESTADÍSTICAS GENERALES DEL SISTEMA DTAI\n\n"
         
@@ -197,30 +229,45 @@ class ResponseFormatter:
         
         response = "HORARIOS COMPLETOS DE GRUPOS\n\n"
         
-        dias_orden = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado']
-        
-        for dia in dias_orden:
+        for dia in self.DIAS_ORDEN:
             clases_dia = [item for item in data if item.get('dia_semana') == dia]
             if clases_dia:
                 response += f"{dia.upper()}:\n"
                 
                 clases_ordenadas = sorted(clases_dia, key=lambda x: x.get('hora_inicio', ''))
                 for clase in clases_ordenadas:
-                    grupo = clase.get('grupo', 'Sin grupo')
-                    carrera = clase.get('carrera', 'Sin carrera')
-                    hora_inicio = clase.get('hora_inicio', 'N/A')
-                    hora_fin = clase.get('hora_fin', 'N/A')
-                    aula = clase.get('aula', 'N/A')
-                    asignatura = clase.get('asignatura', 'N/A')
-                    profesor = clase.get('profesor', 'Sin profesor')
-                    alumnos = clase.get('alumnos_en_grupo', 0)
-                    
-                    response += f"   {hora_inicio}-{hora_fin} | Aula {aula}\n"
-                    response += f"   {grupo} ({carrera}) - {asignatura}\n"
-                    response += f"   {profesor} | {alumnos} alumnos\n\n"
+                    response += self._format_schedule_entry(clase)
         
         return response
     
+    def _stream_group_schedules(self, rows: Iterable[Dict[str, Any]], message: str) -> Iterator[str]:
+        # The query already orders rows by day and start time
+        yield "HORARIOS COMPLETOS DE GRUPOS\n\n"
+        
+        current_day = None
+        for clase in rows:
+            dia = clase.get('dia_semana')
+            if dia not in self.DIAS_ORDEN:
+                continue
+            if dia != current_day:
+                current_day = dia
+                yield f"{dia.upper()}:\n"
+            yield self._format_schedule_entry(clase)
+    
+    def _format_schedule_entry(self, clase: Dict[str, Any]) -> str:
+        grupo = clase.get('grupo', 'Sin grupo')
+        carrera = clase.get('carrera', 'Sin carrera')
+        hora_inicio = clase.get('hora_inicio', 'N/A')
+        hora_fin = clase.get('hora_fin', 'N/A')
+        aula = clase.get('aula', 'N/A')
+        asignatura = clase.get('asignatura', 'N/A')
+        profesor = clase.get('profesor', 'Sin profesor')
+        alumnos = clase.get('alumnos_en_grupo', 0)
+        
+        return (f"   {hora_inicio}-{hora_fin} | Aula {aula}\n"
+                f"   {grupo} ({carrera}) - {asignatura}\n"
+                f"   {profesor} | {alumnos} alumnos\n\n")
+    
     def _format_group_details(self, data: List[Dict[str, Any]], message: str) -> str:
         if not data:
             return "No se encontraron grupos activos en el sistema."
@@ -246,31 +293,60 @@ class ResponseFormatter:
             response += f"{carrera}:\n"
             
             for grupo in grupos:
-                nombre_grupo = grupo.get('grupo', 'Sin nombre')
-                cuatrimestre = grupo.get('cuatrimestre', 'N/A')
-                capacidad = grupo.get('capacidad_maxima', 0)
-                inscritos = grupo.get('alumnos_inscritos', 0)
-                ocupacion = grupo.get('porcentaje_ocupacion', 0)
-                tutor = grupo.get('tutor', 'Sin tutor')
-                promedio = grupo.get('promedio_grupo')
-                
-                if ocupacion >= 100:
-                    status = "LLENO"
-                elif ocupacion >= 90:
-                    status = "CRÍTICO"
-                elif ocupacion >= 75:
-                    status = "ALTO"
-                else:
-                    status = "NORMAL"
-                
-                promedio_text = f" | Promedio: {promedio:.2f}" if promedio else ""
-                
-                response += f"   **{nombre_grupo}** (Cuatri {cuatrimestre}) - {status}\n"
-                response += f"      {inscritos}/{capacidad} ({ocupacion}%){promedio_text}\n"
-                response += f"      Tutor: {tutor}\n\n"
+                response += self._format_group_detail_entry(grupo)
         
         return response
     
+    def _stream_group_details(self, rows: Iterable[Dict[str, Any]], message: str) -> Iterator[str]:
+        # Rows arrive ordered by career, so the occupancy alerts that need every
+        # row move to a closing summary
+        yield "DETALLES DE GRUPOS ACTIVOS\n\n"
+        
+        total = grupos_llenos = grupos_criticos = 0
+        current_carrera = None
+        for grupo in rows:
+            total += 1
+            ocupacion = grupo.get('porcentaje_ocupacion', 0)
+            grupos_llenos += ocupacion >= 90
+            grupos_criticos += ocupacion >= 100
+            
+            carrera = grupo.get('carrera', 'Sin carrera')
+            if carrera != current_carrera:
+                current_carrera = carrera
+                yield f"{carrera}:\n"
+            yield self._format_group_detail_entry(grupo)
+        
+        summary = f"RESUMEN: {total} grupos activos\n"
+        if grupos_criticos > 0:
+            summary += f"ALERTA: {grupos_criticos} grupos en capacidad máxima\n"
+        if grupos_llenos > 0:
+            summary += f"ATENCIÓN: {grupos_llenos} grupos cerca del límite\n"
+        yield summary
+    
+    def _format_group_detail_entry(self, grupo: Dict[str, Any]) -> str:
+        nombre_grupo = grupo.get('grupo', 'Sin nombre')
+        cuatrimestre = grupo.get('cuatrimestre', 'N/A')
+        capacidad = grupo.get('capacidad_maxima', 0)
+        inscritos = grupo.get('alumnos_inscritos', 0)
+        ocupacion = grupo.get('porcentaje_ocupacion', 0)
+        tutor = grupo.get('tutor', 'Sin tutor')
+        promedio = grupo.get('promedio_grupo')
+        
+        if ocupacion >= 100:
+            status = "LLENO"
+        elif ocupacion >= 90:
+            status = "CRÍTICO"
+        elif ocupacion >= 75:
+            status = "ALTO"
+        else:
+            status = "NORMAL"
+        
+        promedio_text = f" | Promedio: {promedio:.2f}" if promedio else ""
+        
+        return (f"   **{nombre_grupo}** (Cuatri {cuatrimestre}) - {status}\n"
+                f"      {inscritos}/{capacidad} ({ocupacion}%){promedio_text}\n"
+                f"      Tutor: {tutor}\n\n")
+    
     def _format_career_performance(self, data: List[Dict[str, Any]], message: str) -> str:
         if not data:
             return "No se encontraron datos de rendimiento por carreras."
@@ -570,7 +646,7 @@ class ResponseFormatter:
         
         return f"No se encontraron datos para su consulta: '{message}'. Como directivo, puede consultar información sobre alumnos, grupos, profesores, carreras, ubicaciones, horarios y estadísticas del sistema. ¿Podría reformular su consulta?"
     
-    def add_suggestions(self, response: str, intent: str, role: str) -> str:
+    def _suggestion_for(self, intent: str) -> str:
         directivo_suggestions = {
             'estadisticas_generales': "También puede consultar: 'alumnos en riesgo', 'materias más reprobadas', 'carga de profesores', o ubicación de grupos específicos.",
             'alumnos_bajo_rendimiento': "Consultas relacionadas: 'reportes de riesgo activos', 'materias más problemáticas', o matrícula específica para más detalles.",
@@ -580,8 +656,11 @@ class ResponseFormatter:
             'solicitudes_urgentes': "Gestión administrativa: 'alumnos en riesgo', 'casos críticos', o asignación de recursos."
         }
         
-        suggestion = directivo_suggestions.get(intent, "Como directivo, tiene acceso completo al sistema. Puede consultar cualquier información sobre alumnos, profesores, grupos, carreras o estadísticas.")
-        return f"{response}\n\n{suggestion}"
+        return directivo_suggestions.get(intent, "Como directivo, tiene acceso completo al sistema. Puede consultar cualquier información sobre alumnos, profesores, grupos, carreras o estadísticas.")
+    
+    def add_suggestions(self, response: str, intent: str, role: str) -> str:
+        with span('add_suggestions'):
+            return f"{response}\n\n{self._suggestion_for(intent)}"
     
     def _format_alumnos_por_carrera_cuatrimestre(self, data: List[Dict[str, Any]], message: str) -> str:
         if not data:
@@ -665,39 +744,59 @@ class ResponseFormatter:
         response += "**LISTADO DETALLADO:**\n\n"
         
         for i, alumno in enumerate(data, 1):
-            matricula = alumno.get('matricula', 'N/A')
-            nombre = alumno.get('nombre_completo', 'Sin nombre')
-            carrera = alumno.get('carrera', 'Sin carrera')
-            grupo = alumno.get('grupo', 'Sin grupo')
-            cuatrimestre = alumno.get('cuatrimestre_actual', 'N/A')
-            sa = alumno.get('materias_SA', 0)
-            de = alumno.get('materias_DE', 0)
-            au = alumno.get('materias_AU', 0)
-            total_sobresalientes = alumno.get('total_sobresalientes', 0)
-            total_evaluadas = alumno.get('total_materias_evaluadas', 0)
-            promedio = alumno.get('promedio_ciclo', 0)
-            ciclo = alumno.get('ciclo_escolar', 'N/A')
-            
-            porcentaje_sobresaliente = (total_sobresalientes / total_evaluadas * 100) if total_evaluadas > 0 else 0
-            
-            if au > 0:
-                emoji = "🌟"
-                nivel = "EXCELENCIA"
-            elif de > 0:
-                emoji = "⭐"
-                nivel = "DESTACADO"
-            else:
-                emoji = "✅"
-                nivel = "SATISFACTORIO"
-            
-            response += f"{i}. {emoji} **{nombre}** (Mat: {matricula}) - {nivel}\n"
-            response += f"   Carrera: {carrera} | Grupo: {grupo} | Cuatrimestre: {cuatrimestre}\n"
-            response += f"   Ciclo: {ciclo} | Promedio: {promedio}\n"
-            response += f"   SA (8): {sa} | DE (9): {de} | AU (10): {au}\n"
-            response += f"   Sobresalientes: {total_sobresalientes}/{total_evaluadas} ({porcentaje_sobresaliente:.1f}%)\n\n"
+            response += self._format_top_student_entry(i, alumno)
         
         return response
     
+    def _stream_alumnos_altas_calificaciones(self, rows: Iterable[Dict[str, Any]], message: str) -> Iterator[str]:
+        # The grade totals need every row, so they close the stream
+        yield "ALUMNOS CON CALIFICACIONES SOBRESALIENTES - ULTIMO CICLO\n\n**LISTADO DETALLADO:**\n\n"
+        
+        total = total_sa = total_de = total_au = 0
+        for total, alumno in enumerate(rows, 1):
+            total_sa += alumno.get('materias_SA', 0)
+            total_de += alumno.get('materias_DE', 0)
+            total_au += alumno.get('materias_AU', 0)
+            yield self._format_top_student_entry(total, alumno)
+        
+        yield (f"**RESUMEN DE CALIFICACIONES** ({total} alumnos):\n"
+               f"SA (8): {total_sa} materias\n"
+               f"DE (9): {total_de} materias\n"
+               f"AU (10): {total_au} materias\n"
+               f"Total sobresalientes: {total_sa + total_de + total_au} materias\n")
+    
+    def _format_top_student_entry(self, i: int, alumno: Dict[str, Any]) -> str:
+        matricula = alumno.get('matricula', 'N/A')
+        nombre = alumno.get('nombre_completo', 'Sin nombre')
+        carrera = alumno.get('carrera', 'Sin carrera')
+        grupo = alumno.get('grupo', 'Sin grupo')
+        cuatrimestre = alumno.get('cuatrimestre_actual', 'N/A')
+        sa = alumno.get('materias_SA', 0)
+        de = alumno.get('materias_DE', 0)
+        au = alumno.get('materias_AU', 0)
+        total_sobresalientes = alumno.get('total_sobresalientes', 0)
+        total_evaluadas = alumno.get('total_materias_evaluadas', 0)
+        promedio = alumno.get('promedio_ciclo', 0)
+        ciclo = alumno.get('ciclo_escolar', 'N/A')
+        
+        porcentaje_sobresaliente = (total_sobresalientes / total_evaluadas * 100) if total_evaluadas > 0 else 0
+        
+        if au > 0:
+            emoji = "🌟"
+            nivel = "EXCELENCIA"
+        elif de > 0:
+            emoji = "⭐"
+            nivel = "DESTACADO"
+        else:
+            emoji = "✅"
+            nivel = "SATISFACTORIO"
+        
+        return (f"{i}. {emoji} **{nombre}** (Mat: {matricula}) - {nivel}\n"
+                f"   Carrera: {carrera} | Grupo: {grupo} | Cuatrimestre: {cuatrimestre}\n"
+                f"   Ciclo: {ciclo} | Promedio: {promedio}\n"
+                f"   SA (8): {sa} | DE (9): {de} | AU (10): {au}\n"
+                f"   Sobresalientes: {total_sobresalientes}/{total_evaluadas} ({porcentaje_sobresaliente:.1f}%)\n\n")
+    
     def _format_alumnos_riesgo_academico(self, data: List[Dict[str, Any]], message: str) -> str:
         if not data:
             return "No se encontraron alumnos con reportes de riesgo académico activos."
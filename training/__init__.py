@@ -3,15 +3,37 @@ from .training_data import (
     get_all_training_data,
     get_training_data_by_intent,
     validate_training_data,
+    add_training_example,
+    get_intent_keywords,
     DOMAIN_ENTITIES
 )
-from .train_model import AIModelTrainer
+
+_LAZY_ATTRIBUTES = {
+    'AIModelTrainer': '.train_model',
+    'OnlineIntentTrainer': '.online_trainer',
+    'tune_hyperparameters': '.tuning'
+}
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        from importlib import import_module
+        value = getattr(import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRIBUTES))
 
 __all__ = [
     'TRAINING_DATA',
     'get_all_training_data',
     'get_training_data_by_intent', 
     'validate_training_data',
+    'add_training_example',
+    'get_intent_keywords',
     'DOMAIN_ENTITIES',
-    'AIModelTrainer'
+    'AIModelTrainer',
+    'OnlineIntentTrainer',
+    'tune_hyperparameters'
 ]
\ No newline at end of file
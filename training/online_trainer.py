@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import fcntl
+import threading
+import logging
+
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.naive_bayes import MultinomialNB
+
+from training.training_data import get_all_training_data
+from utils.text_processor import TextProcessor
+from utils.intent_model import HashingIntentModelPredictor
+
+logger = logging.getLogger(__name__)
+
+class OnlineIntentTrainer:
+    def __init__(self, artifact_path, examples_path=None, n_features=2 ** 14, batch_size=16,
+                 flush_interval=5.0, alpha=0.1):
+        self.artifact_path = artifact_path
+        self.examples_path = examples_path or f'{artifact_path}.examples.jsonl'
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.processor = TextProcessor()
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features,
+            ngram_range=(1, 2),
+            alternate_sign=False,
+            norm='l2',
+            lowercase=True
+        )
+        self.model = MultinomialNB(alpha=alpha)
+        self.classes = None
+        self.examples = []
+        self.publish_listeners = []
+        self.is_leader = False
+
+        self._offset = 0
+        self._lock_file = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {
+            'examples_folded': 0,
+            'batches': 0,
+            'full_refits': 0,
+            'publishes': 0,
+            'last_publish': None
+        }
+
+    @classmethod
+    def from_environment(cls, artifact_path):
+        return cls(
+            artifact_path,
+            examples_path=os.environ.get('ONLINE_EXAMPLES_PATH'),
+            batch_size=int(os.environ.get('ONLINE_BATCH_SIZE', 16)),
+            flush_interval=float(os.environ.get('ONLINE_FLUSH_SECONDS', 5))
+        )
+
+    def submit(self, text, label):
+        line = json.dumps({'text': text, 'intent': label}, ensure_ascii=False) + '\n'
+        with open(self.examples_path, 'a', encoding='utf-8') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.write(line)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def start(self):
+        leader = self._try_lead()
+        if not leader:
+            logger.info(f"Another worker owns online training, this worker submits examples and retries "
+                        f"every {self.flush_interval}s")
+        self._thread = threading.Thread(target=self._run, name='online-intent-trainer', daemon=True)
+        self._thread.start()
+        return leader
+
+    def _try_lead(self):
+        # The flock dies with its process, so when the leader exits or is
+        # recycled the next follower to retry takes over the log
+        lock_file = open(f'{self.artifact_path}.lock', 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+
+        try:
+            self._offset = 0
+            self.bootstrap()
+        except Exception:
+            lock_file.close()
+            raise
+
+        self._lock_file = lock_file
+        self.is_leader = True
+        logger.info(f"Online intent trainer leading (batch={self.batch_size}, flush={self.flush_interval}s)")
+        return True
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        if self._lock_file:
+            self._lock_file.close()
+            self._lock_file = None
+        self.is_leader = False
+
+    def bootstrap(self):
+        examples = list(dict.fromkeys(get_all_training_data() + self._read_new_examples()))
+        self._refit(examples)
+        self.examples = examples
+        self.publish()
+
+    def _read_new_examples(self):
+        if not os.path.exists(self.examples_path):
+            return []
+
+        examples = []
+        with open(self.examples_path, 'r', encoding='utf-8') as f:
+            f.seek(self._offset)
+            while True:
+                line = f.readline()
+                if not line or not line.endswith('\n'):
+                    break
+                self._offset = f.tell()
+                try:
+                    record = json.loads(line)
+                    examples.append((record['text'], record['intent']))
+                except (ValueError, KeyError) as e:
+                    logger.warning(f"Skipping malformed training example: {e}")
+        return examples
+
+    def _vectorize(self, texts):
+        return self.vectorizer.transform(self.processor.clean_texts(texts))
+
+    def _refit(self, examples):
+        texts = [text for text, _ in examples]
+        labels = [label for _, label in examples]
+        classes = sorted(set(labels))
+        model = MultinomialNB(alpha=self.model.alpha)
+        model.partial_fit(self._vectorize(texts), labels, classes=classes)
+        self.model, self.classes = model, classes
+        self.stats['full_refits'] += 1
+
+    def fold_in(self, batch):
+        if not batch:
+            return
+
+        labels = [label for _, label in batch]
+
+        if set(labels) - set(self.classes):
+            logger.info("New intent labels found, refitting online model from all examples")
+            self._refit(self.examples + batch)
+        else:
+            self.model.partial_fit(self._vectorize([text for text, _ in batch]), labels)
+
+        # Only examples the model has actually seen count towards examples_seen
+        self.examples.extend(batch)
+        self.stats['examples_folded'] += len(batch)
+        self.stats['batches'] += 1
+        self.publish()
+
+    def build_predictor(self):
+        return HashingIntentModelPredictor(
+            feature_log_prob_t=self.model.feature_log_prob_.T,
+            class_log_prior=self.model.class_log_prior_,
+            classes=[str(label) for label in self.model.classes_],
+            ngram_range=self.vectorizer.ngram_range
+        )
+
+    def publish(self):
+        self.build_predictor().save_artifact(self.artifact_path, {
+            'alpha': self.model.alpha,
+            'examples_seen': len(self.examples)
+        })
+        self.stats['publishes'] += 1
+        self.stats['last_publish'] = time.time()
+
+        for listener in list(self.publish_listeners):
+            try:
+                listener()
+            except Exception as e:
+                logger.error(f"Error notifying model publish: {e}")
+
+    def _run(self):
+        pending = []
+        first_pending_at = None
+        poll_interval = min(self.flush_interval, 1.0)
+        next_attempt = time.monotonic() + self.flush_interval
+
+        while not self._stop.wait(poll_interval):
+            if not self.is_leader:
+                if time.monotonic() < next_attempt:
+                    continue
+                next_attempt = time.monotonic() + self.flush_interval
+                try:
+                    self._try_lead()
+                except Exception as e:
+                    logger.error(f"Online training takeover failed: {e}")
+                continue
+
+            try:
+                new_examples = self._read_new_examples()
+                if new_examples and not pending:
+                    first_pending_at = time.monotonic()
+                pending.extend(new_examples)
+
+                while len(pending) >= self.batch_size:
+                    self.fold_in(pending[:self.batch_size])
+                    pending = pending[self.batch_size:]
+                    first_pending_at = time.monotonic() if pending else None
+
+                if pending and time.monotonic() - first_pending_at >= self.flush_interval:
+                    self.fold_in(pending)
+                    pending = []
+                    first_pending_at = None
+            except Exception as e:
+                logger.error(f"Online training error: {e}")
+
+    def get_status(self):
+        return {
+            'leader': self.is_leader,
+            'classes': len(self.classes or []),
+            'examples_seen': len(self.examples),
+            **self.stats
+        }
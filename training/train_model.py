@@ -1,27 +1,39 @@
-import pandas as pd
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.naive_bayes import MultinomialNB
+from sklearn.feature_selection import chi2, mutual_info_classif
 from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
-import joblib
 import logging
 from training.training_data import get_all_training_data, validate_training_data
 from utils.text_processor import TextProcessor
+from utils.intent_model import IntentModelPredictor
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_VECTORIZER_PARAMS = {
+    'max_features': 5000,
+    'ngram_range': (1, 2)
+}
+
+FEATURE_SCORERS = {
+    'chi2': lambda X, y: chi2(X, y)[0],
+    'mutual_info': lambda X, y: mutual_info_classif((X > 0).astype(np.int8), y, discrete_features=True,
+                                                    random_state=42)
+}
+
 class AIModelTrainer:
-    def __init__(self):
+    def __init__(self, vectorizer_params=None, alpha=1.0, feature_selection=None):
         self.processor = TextProcessor()
-        self.vectorizer = TfidfVectorizer(
-            max_features=5000,
-            ngram_range=(1, 2),
-            stop_words=None,
-            lowercase=True
-        )
-        self.model = MultinomialNB(alpha=1.0)
+        self.vectorizer_params = dict(DEFAULT_VECTORIZER_PARAMS, **(vectorizer_params or {}))
+        self.feature_selection = feature_selection
+        self.vectorizer = self._build_vectorizer()
+        self.model = MultinomialNB(alpha=alpha)
+        self.predictor = None
         self.is_trained = False
+        # A loaded artifact only restores the predictor; the sklearn vectorizer
+        # and model stay unfitted until fit() runs in this process
+        self.has_estimator = False
     
     def prepare_data(self):
         training_data = get_all_training_data()
@@ -32,13 +44,8 @@ class AIModelTrainer:
         if validation_info['total_examples'] < 50:
             logger.warning("Insufficient training data. Minimum 50 examples recommended.")
         
-        texts = []
-        labels = []
-        
-        for text, label in training_data:
-            processed_text = self.processor.clean_text(text)
-            texts.append(processed_text)
-            labels.append(label)
+        texts = self.processor.clean_texts([text for text, _ in training_data])
+        labels = [label for _, label in training_data]
         
         return texts, labels
     
@@ -55,18 +62,57 @@ class AIModelTrainer:
             texts, labels, test_size=test_size, random_state=42, stratify=labels
         )
         
-        X_train_vectorized = self.vectorizer.fit_transform(X_train)
-        X_test_vectorized = self.vectorizer.transform(X_test)
-        
-        self.model.fit(X_train_vectorized, y_train)
+        self.fit(X_train, y_train)
         
         if validation:
-            self._validate_model(X_test_vectorized, y_test)
+            self._validate_model(self.vectorizer.transform(X_test), y_test)
         
-        self.is_trained = True
         logger.info("Model training completed successfully")
         return True
     
+    def fit(self, texts, labels):
+        if self.feature_selection:
+            self.prune_vocabulary(texts, labels)
+        
+        self.model.fit(self.vectorizer.fit_transform(texts), labels)
+        self.is_trained = True
+        self.has_estimator = True
+        self.predictor = self.build_predictor()
+        return self
+    
+    def _build_vectorizer(self, vocabulary=None):
+        params = dict(self.vectorizer_params)
+        if vocabulary is not None:
+            params.pop('max_features', None)
+            params.pop('min_df', None)
+            params.pop('max_df', None)
+        
+        return TfidfVectorizer(
+            stop_words=None,
+            lowercase=True,
+            vocabulary=vocabulary,
+            **params
+        )
+    
+    def prune_vocabulary(self, texts, labels):
+        method = self.feature_selection.get('method', 'chi2')
+        k = self.feature_selection['k']
+        
+        vectorizer = self._build_vectorizer()
+        X = vectorizer.fit_transform(texts)
+        terms = vectorizer.get_feature_names_out()
+        
+        if k < len(terms):
+            scores = np.nan_to_num(FEATURE_SCORERS[method](X, labels))
+            keep = np.sort(np.argsort(-scores, kind='stable')[:k])
+            terms = terms[keep]
+        
+        # Refit on the kept terms only so idf and L2 norms are computed over the
+        # pruned space, exactly as the serving predictor sees it
+        self.vectorizer = self._build_vectorizer(vocabulary=list(terms))
+        logger.info(f"Vocabulary pruned to {len(terms)} terms ({method})")
+        return len(terms)
+    
     def _validate_model(self, X_test, y_test):
         y_pred = self.model.predict(X_test)
         accuracy = accuracy_score(y_test, y_pred)
@@ -81,40 +127,38 @@ class AIModelTrainer:
             logger.warning("Model not trained. Using fallback classification.")
             return 'conversacion_general', 0.5
         
-        processed_text = self.processor.clean_text(text)
-        vectorized = self.vectorizer.transform([processed_text])
-        
-        prediction = self.model.predict(vectorized)[0]
-        probabilities = self.model.predict_proba(vectorized)[0]
-        confidence = max(probabilities)
-        
-        if confidence < confidence_threshold:
-            return 'conversacion_general', confidence
-        
-        return prediction, confidence
+        return self.predictor.predict_intent(text, confidence_threshold)
     
     def get_feature_importance(self, intent, top_n=10):
         if not self.is_trained:
             return []
         
-        feature_names = self.vectorizer.get_feature_names_out()
-        class_idx = list(self.model.classes_).index(intent)
-        feature_weights = self.model.feature_log_prob_[class_idx]
+        feature_names = {int(index): term for term, index in self.predictor.vocabulary.items()}
+        class_idx = self.predictor.classes.index(intent)
+        feature_weights = self.predictor.feature_log_prob_t[:, class_idx]
         
         top_indices = np.argsort(feature_weights)[-top_n:]
         top_features = [(feature_names[i], feature_weights[i]) for i in top_indices]
         
         return sorted(top_features, key=lambda x: x[1], reverse=True)
     
-    def save_model(self, filepath_base='model'):
+    def save_model(self, filepath_base='model', extra_metadata=None):
         if not self.is_trained:
             logger.error("Cannot save untrained model")
             return False
         
+        metadata = {
+            'alpha': self.model.alpha,
+            'vectorizer_params': {key: list(value) if isinstance(value, tuple) else value
+                                  for key, value in self.vectorizer_params.items()}
+        }
+        if self.feature_selection:
+            metadata['feature_selection'] = dict(self.feature_selection)
+        metadata.update(extra_metadata or {})
+        
         try:
-            joblib.dump(self.model, f'{filepath_base}_classifier.pkl')
-            joblib.dump(self.vectorizer, f'{filepath_base}_vectorizer.pkl')
-            logger.info(f"Model saved to {filepath_base}_*.pkl")
+            content_hash = self.predictor.save_artifact(f'{filepath_base}_intent.bin', metadata)
+            logger.info(f"Model saved to {filepath_base}_intent.bin ({content_hash[:12]})")
             return True
         except Exception as e:
             logger.error(f"Error saving model: {e}")
@@ -122,15 +166,59 @@ class AIModelTrainer:
     
     def load_model(self, filepath_base='model'):
         try:
-            self.model = joblib.load(f'{filepath_base}_classifier.pkl')
-            self.vectorizer = joblib.load(f'{filepath_base}_vectorizer.pkl')
+            self.predictor = IntentModelPredictor.from_artifact(f'{filepath_base}_intent.bin')
             self.is_trained = True
-            logger.info(f"Model loaded from {filepath_base}_*.pkl")
+            self.has_estimator = False
+            logger.info(f"Model loaded from {filepath_base}_intent.bin")
             return True
         except Exception as e:
             logger.error(f"Error loading model: {e}")
             return False
     
+    def build_predictor(self):
+        if not self.is_trained:
+            logger.error("Cannot export untrained model")
+            return None
+        
+        if not self.has_estimator:
+            return self.predictor
+        
+        return IntentModelPredictor(
+            vocabulary={term: int(index) for term, index in self.vectorizer.vocabulary_.items()},
+            idf=self.vectorizer.idf_,
+            feature_log_prob_t=self.model.feature_log_prob_.T,
+            class_log_prior=self.model.class_log_prior_,
+            classes=[str(label) for label in self.model.classes_],
+            ngram_range=self.vectorizer.ngram_range,
+            sublinear_tf=self.vectorizer.sublinear_tf
+        )
+    
+    def check_inference_parity(self, predictor):
+        if not self.has_estimator:
+            logger.error("Inference parity needs the sklearn model; train it in this process first")
+            return None
+        
+        texts, labels = self.prepare_data()
+        X = self.vectorizer.transform(texts)
+        expected = self.model.predict(X)
+        expected_proba = self.model.predict_proba(X)
+        
+        mismatches = 0
+        max_proba_diff = 0.0
+        for i, (text, label) in enumerate(zip(texts, labels)):
+            probabilities = predictor.predict_proba(text)
+            if predictor.classes[int(np.argmax(probabilities))] != expected[i]:
+                mismatches += 1
+            max_proba_diff = max(max_proba_diff, float(np.abs(probabilities - expected_proba[i]).max()))
+        
+        parity = {
+            'examples': len(texts),
+            'mismatches': mismatches,
+            'max_probability_diff': max_proba_diff
+        }
+        logger.info(f"Inference parity: {parity}")
+        return parity
+    
     def cross_validate(self, cv_folds=5):
         texts, labels = self.prepare_data()
         X_vectorized = self.vectorizer.fit_transform(texts)
@@ -150,12 +150,24 @@ def validate_training_data():
     
     return validation
 
+_EXAMPLE_LISTENERS = []
+
+def register_example_listener(listener):
+    if listener not in _EXAMPLE_LISTENERS:
+        _EXAMPLE_LISTENERS.append(listener)
+
+def unregister_example_listener(listener):
+    if listener in _EXAMPLE_LISTENERS:
+        _EXAMPLE_LISTENERS.remove(listener)
+
 def add_training_example(intent, example):
     if intent not in TRAINING_DATA:
         TRAINING_DATA[intent] = []
     
     if example not in TRAINING_DATA[intent]:
         TRAINING_DATA[intent].append(example)
+        for listener in list(_EXAMPLE_LISTENERS):
+            listener(example, intent)
         return True
     return False
 
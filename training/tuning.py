@@ -0,0 +1,156 @@
+import os
+import time
+import argparse
+import itertools
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.model_selection import StratifiedKFold
+
+from training.train_model import AIModelTrainer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEARCH_SPACE = {
+    'ngram_range': [(1, 1), (1, 2), (1, 3)],
+    'max_features': [500, 2000, 5000],
+    'min_df': [1, 2],
+    'sublinear_tf': [False, True],
+    'alpha': [0.05, 0.1, 0.5, 1.0]
+}
+
+LATENCY_ROUNDS = 5
+
+def vectorizer_grid(search_space):
+    keys = [key for key in search_space if key != 'alpha']
+    for values in itertools.product(*(search_space[key] for key in keys)):
+        yield dict(zip(keys, values))
+
+def estimate_artifact_bytes(predictor):
+    vocabulary_bytes = sum(len(term.encode('utf-8')) + 8 for term in predictor.vocabulary)
+    weights = predictor.idf.size + predictor.feature_log_prob_t.size + predictor.class_log_prior.size
+    return vocabulary_bytes + weights * 8
+
+def measure_latency_us(predictor, texts):
+    start = time.perf_counter()
+    for _ in range(LATENCY_ROUNDS):
+        for text in texts:
+            predictor.predict_proba(text)
+    return (time.perf_counter() - start) / (LATENCY_ROUNDS * len(texts)) * 1e6
+
+def evaluate_vectorizer_config(vectorizer_params, alphas, texts, labels, cv_folds):
+    labels = np.asarray(labels)
+    folds = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=42).split(texts, labels)
+
+    fold_scores = {alpha: [] for alpha in alphas}
+    for train_idx, test_idx in folds:
+        vectorizer = TfidfVectorizer(lowercase=True, **vectorizer_params)
+        try:
+            X_train = vectorizer.fit_transform([texts[i] for i in train_idx])
+        except ValueError:
+            return []
+        X_test = vectorizer.transform([texts[i] for i in test_idx])
+
+        for alpha in alphas:
+            model = MultinomialNB(alpha=alpha).fit(X_train, labels[train_idx])
+            fold_scores[alpha].append(float(np.mean(model.predict(X_test) == labels[test_idx])))
+
+    results = []
+    for alpha in alphas:
+        predictor = AIModelTrainer(vectorizer_params=vectorizer_params, alpha=alpha).fit(texts, labels).predictor
+
+        results.append({
+            'vectorizer_params': vectorizer_params,
+            'alpha': alpha,
+            'accuracy': float(np.mean(fold_scores[alpha])),
+            'accuracy_std': float(np.std(fold_scores[alpha])),
+            'n_features': predictor.n_features,
+            'size_bytes': estimate_artifact_bytes(predictor),
+            'latency_us': measure_latency_us(predictor, texts)
+        })
+    return results
+
+def pareto_front(results):
+    front = []
+    for candidate in results:
+        dominated = any(
+            other['accuracy'] >= candidate['accuracy']
+            and other['size_bytes'] <= candidate['size_bytes']
+            and other['latency_us'] <= candidate['latency_us']
+            and (other['accuracy'] > candidate['accuracy']
+                 or other['size_bytes'] < candidate['size_bytes']
+                 or other['latency_us'] < candidate['latency_us'])
+            for other in results
+        )
+        if not dominated:
+            front.append(candidate)
+    return sorted(front, key=lambda r: (-r['accuracy'], r['size_bytes'], r['latency_us']))
+
+def tune_hyperparameters(search_space=None, cv_folds=5, n_jobs=None):
+    search_space = search_space or DEFAULT_SEARCH_SPACE
+    trainer = AIModelTrainer()
+    texts, labels = trainer.prepare_data()
+    alphas = search_space.get('alpha', [1.0])
+    configs = list(vectorizer_grid(search_space))
+
+    logger.info(f"Tuning {len(configs)} vectorizer configs x {len(alphas)} alphas over {cv_folds} folds")
+
+    results = []
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        futures = [pool.submit(evaluate_vectorizer_config, config, alphas, texts, labels, cv_folds)
+                   for config in configs]
+        for future in futures:
+            results.extend(future.result())
+
+    front = pareto_front(results)
+    return {
+        'results': sorted(results, key=lambda r: -r['accuracy']),
+        'pareto_front': front,
+        'best': front[0] if front else None
+    }
+
+def _serializable(result):
+    params = {key: list(value) if isinstance(value, tuple) else value
+              for key, value in result['vectorizer_params'].items()}
+    return dict(result, vectorizer_params=params)
+
+def train_best_model(tuning, filepath_base='model'):
+    best = tuning['best']
+    if not best:
+        logger.error("No valid configuration found")
+        return None
+
+    trainer = AIModelTrainer(vectorizer_params=best['vectorizer_params'], alpha=best['alpha'])
+    trainer.fit(*trainer.prepare_data())
+
+    trainer.save_model(filepath_base, {
+        'tuning': {
+            'best': _serializable(best),
+            'pareto_front': [_serializable(result) for result in tuning['pareto_front']],
+            'configurations_evaluated': len(tuning['results'])
+        }
+    })
+    return trainer
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel hyperparameter search for the intent model')
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--jobs', type=int, default=os.cpu_count())
+    parser.add_argument('--output', default='model', help='artifact base path (<output>_intent.bin)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    tuning = tune_hyperparameters(cv_folds=args.folds, n_jobs=args.jobs)
+
+    print(f"{'accuracy':>9} {'features':>9} {'size KiB':>9} {'us/msg':>8}  config")
+    for result in tuning['pareto_front']:
+        print(f"{result['accuracy']:9.3f} {result['n_features']:9d} {result['size_bytes'] / 1024:9.1f} "
+              f"{result['latency_us']:8.1f}  alpha={result['alpha']} {result['vectorizer_params']}")
+
+    train_best_model(tuning, args.output)
+
+if __name__ == '__main__':
+    main()
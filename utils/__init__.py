@@ -1,4 +1,11 @@
 from .intent_classifier import IntentClassifier
+from .message_analysis import MessageAnalysis
+from .cascade_classifier import CascadeIntentClassifier
+from .example_index import ExampleIndex
+from .spelling import SpellingCorrector
+from .metrics import MetricsRegistry, LatencyHistogram
+from .tracing import Tracer
 
-__all__ = ['IntentClassifier']
+__all__ = ['IntentClassifier', 'MessageAnalysis', 'CascadeIntentClassifier', 'ExampleIndex', 'SpellingCorrector',
+           'MetricsRegistry', 'LatencyHistogram', 'Tracer']
 __version__ = '1.0.0'
\ No newline at end of file
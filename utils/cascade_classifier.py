@@ -0,0 +1,325 @@
+# utils/cascade_classifier.py
+import os
+import threading
+import time
+import logging
+from typing import Dict, Any, Optional, Tuple
+
+from training.training_data import get_all_training_data, DOMAIN_ENTITIES
+from utils.intent_classifier import IntentClassifier
+from utils.example_index import ExampleIndex
+from utils.spelling import SpellingCorrector
+from utils.text_processor import TextProcessor
+from utils.message_analysis import MessageAnalysis
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+TRAINED_INTENT_MAP = {
+    'riesgo': 'alumnos_riesgo',
+    'promedio': 'carreras_rendimiento',
+    'estadisticas': 'estadisticas_generales'
+}
+
+TIERS = ('exact', 'keywords', 'model', 'context', 'examples', 'fallback')
+
+def load_trained_model(artifact_path: str):
+    if not os.path.exists(artifact_path):
+        logger.info(f"No intent model artifact at {artifact_path}, model tier disabled")
+        return None
+
+    try:
+        from utils.intent_model import IntentModelPredictor
+        predictor = IntentModelPredictor.from_artifact(artifact_path)
+    except Exception as e:
+        logger.error(f"Rejected intent model artifact {artifact_path}: {e}")
+        return None
+
+    logger.info(f"Intent model artifact loaded ({predictor.artifact.content_hash[:12]})")
+    return predictor
+
+def _file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+class CascadeIntentClassifier:
+    def __init__(self, keyword_classifier: Optional[IntentClassifier] = None, model=None,
+                 model_threshold: float = 0.6, model_path: Optional[str] = None,
+                 reload_interval: float = 10.0, example_threshold: float = 0.4,
+                 spelling_max_distance: int = 2):
+        self.keyword_classifier = keyword_classifier or IntentClassifier()
+        self.model_threshold = model_threshold
+        self.model_path = model_path
+        self.reload_interval = reload_interval
+        self.example_threshold = example_threshold
+        self.spelling_max_distance = spelling_max_distance
+        self._rebuild_pattern_indexes()
+
+        self.model = None
+        self.model_swaps = 0
+        self._model_signature = None
+        self._next_reload_check = 0.0
+        self._reload_lock = threading.Lock()
+        if model is not None:
+            self.swap_model(model)
+        elif model_path:
+            self._model_signature = _file_signature(model_path)
+            self.swap_model(load_trained_model(model_path))
+
+        self._stats_lock = threading.Lock()
+        self._stats = {tier: {'calls': 0, 'hits': 0, 'total_ms': 0.0} for tier in TIERS}
+        self._spelling_stats = {'calls': 0, 'corrected': 0, 'total_ms': 0.0}
+
+    @classmethod
+    def from_environment(cls) -> 'CascadeIntentClassifier':
+        model_path = os.environ.get('INTENT_MODEL_PATH', 'model')
+        # With online training every worker serves the model the leader
+        # publishes; the offline TF-IDF artifact written by save_model and
+        # tuning.py is only read, and is served again once it is turned off
+        online = os.environ.get('ONLINE_TRAINING', 'False').lower() == 'true'
+        return cls(
+            model_threshold=float(os.environ.get('INTENT_MODEL_THRESHOLD', 0.6)),
+            model_path=f"{model_path}_{'online' if online else 'intent'}.bin",
+            reload_interval=float(os.environ.get('INTENT_MODEL_RELOAD_SECONDS', 10)),
+            example_threshold=float(os.environ.get('INTENT_EXAMPLE_THRESHOLD', 0.4)),
+            spelling_max_distance=int(os.environ.get('INTENT_SPELLING_MAX_DISTANCE', 2))
+        )
+
+    def swap_model(self, model):
+        if model is None:
+            return
+        self.model = model
+        self.model_swaps += 1
+
+    def reload_model_if_changed(self, force: bool = False) -> bool:
+        if not self.model_path:
+            return False
+
+        now = time.monotonic()
+        if not force and now < self._next_reload_check:
+            return False
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+
+        try:
+            self._next_reload_check = now + self.reload_interval
+            signature = _file_signature(self.model_path)
+            if signature is None or signature == self._model_signature:
+                return False
+
+            model = load_trained_model(self.model_path)
+            self._model_signature = signature
+            if model is None:
+                return False
+
+            self.swap_model(model)
+            logger.info(f"Intent model hot-swapped from {self.model_path}")
+            return True
+        finally:
+            self._reload_lock.release()
+
+    def _rebuild_pattern_indexes(self):
+        exact_phrases = self._build_exact_phrases()
+        example_index = self._build_example_index()
+        spelling_corrector = self._build_spelling_corrector(self.spelling_max_distance)
+        self.exact_phrases, self.example_index, self.spelling_corrector = \
+            exact_phrases, example_index, spelling_corrector
+
+    def reload_patterns_if_changed(self, force: bool = False) -> bool:
+        if not self.keyword_classifier.pattern_store.reload_if_changed(force):
+            return False
+        self._rebuild_pattern_indexes()
+        return True
+
+    def _build_exact_phrases(self) -> Dict[str, str]:
+        labelled = [(example, self._live_intent(label)) for example, label in get_all_training_data()]
+        for pattern_data in self.keyword_classifier.intent_patterns.values():
+            labelled.extend((keyword, None) for keyword in pattern_data['keywords'])
+
+        phrases = {}
+        for phrase, label in labelled:
+            analysis = MessageAnalysis.from_message(phrase)
+            intent, score = self.keyword_classifier.score_keywords(analysis)
+            if score >= self.keyword_classifier.keyword_threshold:
+                phrases[analysis.lower] = intent
+            elif label:
+                phrases[analysis.lower] = label
+
+        return phrases
+
+    def _build_example_index(self) -> ExampleIndex:
+        index = ExampleIndex()
+        for example, label in get_all_training_data():
+            self.add_example(example, label, index)
+        for intent, pattern_data in self.keyword_classifier.intent_patterns.items():
+            for keyword in pattern_data['keywords']:
+                index.add(keyword, intent)
+        return index
+
+    def _build_spelling_corrector(self, max_distance: int) -> Optional[SpellingCorrector]:
+        if max_distance <= 0:
+            return None
+
+        keywords = [keyword for pattern_data in self.keyword_classifier.intent_patterns.values()
+                    for keyword in pattern_data['keywords']]
+        entities = [entity for values in DOMAIN_ENTITIES.values() for entity in values]
+        known = [example for example, _ in get_all_training_data()]
+        known += self.keyword_classifier.directivo_question_indicators
+        known += TextProcessor().stopwords['es']
+
+        return SpellingCorrector.from_phrases(keywords + entities, known, max_distance=max_distance)
+
+    def add_example(self, example: str, label: str, index: Optional[ExampleIndex] = None) -> bool:
+        intent = self._live_intent(label)
+        if intent is None:
+            return False
+        if index is None:
+            index = self.example_index
+        return index.add(example, intent)
+
+    def _live_intent(self, label: str) -> Optional[str]:
+        intent = TRAINED_INTENT_MAP.get(label, label)
+        return intent if intent in self.keyword_classifier.intent_patterns else None
+
+    def classify_intent(self, message: str, context: Optional[Dict[str, Any]] = None,
+                        analysis: Optional[MessageAnalysis] = None) -> str:
+        if not message or not message.strip():
+            return 'mensaje_vacio'
+
+        with span('classify_intent') as current:
+            intent, tier = self._classify(message, context, analysis)
+            current.set(intent=intent, tier=tier)
+            return intent
+
+    def _classify(self, message: str, context: Optional[Dict[str, Any]],
+                  analysis: Optional[MessageAnalysis]) -> Tuple[str, str]:
+        if analysis is None:
+            analysis = MessageAnalysis.from_message(message)
+
+        self.reload_model_if_changed()
+        self.reload_patterns_if_changed()
+
+        if self.spelling_corrector is not None:
+            analysis = self._correct_spelling(analysis)
+
+        start = time.perf_counter()
+        intent = self.exact_phrases.get(analysis.lower)
+        start = self._record('exact', start, intent is not None)
+        if intent:
+            return intent, 'exact'
+
+        intent, score = self.keyword_classifier.score_keywords(analysis)
+        accepted = score >= self.keyword_classifier.keyword_threshold
+        start = self._record('keywords', start, accepted)
+        if accepted:
+            return intent, 'keywords'
+
+        model = self.model
+        if model is not None:
+            intent, confidence = self._predict_with_model(model, analysis)
+            accepted = confidence >= self.model_threshold
+            start = self._record('model', start, accepted)
+            if accepted:
+                return intent, 'model'
+
+        # A follow-up such as "mas detalles" resembles some stored example, so
+        # the conversation gets its say before the example index
+        intent = self.keyword_classifier.classify_continuation(analysis, context)
+        start = self._record('context', start, intent is not None)
+        if intent:
+            return intent, 'context'
+
+        with span('example_index'):
+            intent, similarity = self.example_index.classify(analysis, min_similarity=self.example_threshold)
+        start = self._record('examples', start, intent is not None)
+        if intent:
+            return intent, 'examples'
+
+        intent = self.keyword_classifier.classify_fallback(analysis, context)
+        self._record('fallback', start, True)
+        return intent, 'fallback'
+
+    def _correct_spelling(self, analysis: MessageAnalysis) -> MessageAnalysis:
+        start = time.perf_counter()
+        with span('spelling') as current:
+            corrected, corrections = self.spelling_corrector.correct(analysis)
+            current.set(corrections=len(corrections))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        with self._stats_lock:
+            self._spelling_stats['calls'] += 1
+            self._spelling_stats['total_ms'] += elapsed_ms
+            if corrections:
+                self._spelling_stats['corrected'] += 1
+
+        if corrections:
+            logger.debug(f"Spelling corrections applied: {corrections}")
+        return corrected
+
+    def _predict_with_model(self, model, analysis: MessageAnalysis) -> Tuple[Optional[str], float]:
+        try:
+            with span('model_predict'):
+                label, confidence = model.predict_intent(analysis.normalized,
+                                                         confidence_threshold=self.model_threshold)
+        except Exception as e:
+            logger.error(f"Error en modelo de intenciones: {e}")
+            return None, 0.0
+
+        intent = self._live_intent(label)
+        return intent, confidence if intent else 0.0
+
+    def _record(self, tier: str, start: float, hit: bool) -> float:
+        now = time.perf_counter()
+        with self._stats_lock:
+            stats = self._stats[tier]
+            stats['calls'] += 1
+            stats['total_ms'] += (now - start) * 1000
+            if hit:
+                stats['hits'] += 1
+        return now
+
+    def _model_version(self) -> Optional[str]:
+        artifact = getattr(self.model, 'artifact', None)
+        return artifact.content_hash[:12] if artifact else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            snapshot = {tier: dict(stats) for tier, stats in self._stats.items()}
+            spelling = dict(self._spelling_stats)
+
+        total_hits = sum(stats['hits'] for stats in snapshot.values())
+        tiers = {}
+        for tier, stats in snapshot.items():
+            tiers[tier] = {
+                'calls': stats['calls'],
+                'hits': stats['hits'],
+                'hit_share': round(stats['hits'] / total_hits, 4) if total_hits else 0.0,
+                'avg_latency_ms': round(stats['total_ms'] / stats['calls'], 4) if stats['calls'] else 0.0
+            }
+
+        return {
+            'model_loaded': self.model is not None,
+            'model_type': getattr(self.model, 'MODEL_TYPE', None),
+            'model_version': self._model_version(),
+            'model_swaps': self.model_swaps,
+            'model_threshold': self.model_threshold,
+            'patterns': self.keyword_classifier.pattern_store.get_stats(),
+            'exact_phrases': len(self.exact_phrases),
+            'indexed_examples': len(self.example_index),
+            'example_threshold': self.example_threshold,
+            'classified_messages': total_hits,
+            'tiers': tiers,
+            'spelling': {
+                'enabled': self.spelling_corrector is not None,
+                'dictionary_words': len(self.spelling_corrector) if self.spelling_corrector else 0,
+                'calls': spelling['calls'],
+                'corrected_messages': spelling['corrected'],
+                'cache_entries': self.spelling_corrector.cache_entries if self.spelling_corrector else 0,
+                'cache_hits': self.spelling_corrector.cache_hits if self.spelling_corrector else 0,
+                'cache_misses': self.spelling_corrector.cache_misses if self.spelling_corrector else 0,
+                'avg_latency_ms': round(spelling['total_ms'] / spelling['calls'], 4) if spelling['calls'] else 0.0
+            }
+        }
@@ -0,0 +1,90 @@
+# utils/example_index.py
+import heapq
+import threading
+from typing import Dict, List, Optional, Iterable, NamedTuple, Tuple, FrozenSet
+
+from utils.message_analysis import MessageAnalysis
+from utils.text_processor import TextProcessor
+
+# Words that ask for more of the previous answer rather than name a topic; a
+# message made only of them is a follow-up, which is not the index's to answer
+FOLLOW_UP_TERMS = frozenset({
+    'mas', 'más', 'otro', 'otra', 'otros', 'otras', 'tambien', 'también', 'ademas', 'además',
+    'siguiente', 'detalle', 'detalles', 'informacion', 'información', 'dame'
+})
+
+class ExampleMatch(NamedTuple):
+    similarity: float
+    text: str
+    intent: str
+
+class ExampleIndex:
+    def __init__(self, examples: Iterable[Tuple[str, str]] = (), min_token_length: int = 3):
+        self.stopwords = frozenset(TextProcessor().stopwords['es'])
+        self.min_token_length = min_token_length
+        self.texts: List[str] = []
+        self.intents: List[str] = []
+        self.sizes: List[int] = []
+        self.postings: Dict[str, List[int]] = {}
+        self._seen = set()
+        self._lock = threading.Lock()
+
+        for text, intent in examples:
+            self.add(text, intent)
+
+    def terms(self, analysis: MessageAnalysis) -> FrozenSet[str]:
+        return frozenset(token for token in analysis.tokens
+                         if len(token) >= self.min_token_length and token not in self.stopwords)
+
+    def add(self, text: str, intent: str) -> bool:
+        terms = self.terms(MessageAnalysis.from_message(text))
+        if not terms or (terms, intent) in self._seen:
+            return False
+
+        with self._lock:
+            doc_id = len(self.texts)
+            self.texts.append(text)
+            self.intents.append(intent)
+            self.sizes.append(len(terms))
+            for term in terms:
+                self.postings.setdefault(term, []).append(doc_id)
+            self._seen.add((terms, intent))
+        return True
+
+    def search(self, analysis: MessageAnalysis, k: int = 5, min_similarity: float = 0.0) -> List[ExampleMatch]:
+        terms = self.terms(analysis)
+        if not terms or terms <= FOLLOW_UP_TERMS:
+            return []
+
+        # Only examples sharing a term are scored, so a lookup costs the touched
+        # posting lists rather than a pass over the whole corpus
+        overlaps = {}
+        postings = self.postings
+        for term in terms:
+            for doc_id in postings.get(term, ()):
+                overlaps[doc_id] = overlaps.get(doc_id, 0) + 1
+
+        query_size = len(terms)
+        sizes = self.sizes
+        scored = ((overlap / (query_size + sizes[doc_id] - overlap), doc_id)
+                  for doc_id, overlap in overlaps.items())
+
+        return [ExampleMatch(similarity, self.texts[doc_id], self.intents[doc_id])
+                for similarity, doc_id in heapq.nlargest(k, scored)
+                if similarity >= min_similarity]
+
+    def classify(self, analysis: MessageAnalysis, k: int = 5,
+                 min_similarity: float = 0.3) -> Tuple[Optional[str], float]:
+        matches = self.search(analysis, k, min_similarity)
+        if not matches:
+            return None, 0.0
+
+        votes = {}
+        for match in matches:
+            votes[match.intent] = votes.get(match.intent, 0.0) + match.similarity
+
+        intent = max(votes, key=votes.get)
+        return intent, max(match.similarity for match in matches if match.intent == intent)
+
+    def __len__(self) -> int:
+        return len(self.texts)
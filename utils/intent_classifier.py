@@ -1,308 +1,72 @@
 # utils/intent_classifier.py
-import re
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 import logging
 
+from utils.message_analysis import MessageAnalysis
+from utils.intent_patterns import IntentPatternStore
+
 logger = logging.getLogger(__name__)
 
 class IntentClassifier:
-    def __init__(self):
-        self.intent_patterns = {
-            'estadisticas_generales': {
-                'keywords': [
-                    'estadisticas', 'estadistica', 'general', 'resumen', 'datos', 'numeros', 
-                    'cuantos hay', 'total', 'cantidad', 'informacion general',
-                    'cuantos alumnos', 'cuantos profesores', 'cuantos estudiantes',
-                    'cuantos grupos', 'resumen del sistema'
-                ],
-                'priority': 8
-            },
-            'alumnos_bajo_rendimiento': {
-                'keywords': [
-                    'alumnos bajo rendimiento', 'peores calificaciones', 'matriculas bajas',
-                    'estudiantes con problemas', 'alumnos reprobando', 'bajo promedio',
-                    'calificaciones mas bajas', 'estudiantes en riesgo', 'reprobar'
-                ],
-                'priority': 9
-            },
-            'alumnos_riesgo': {
-                'keywords': [
-                    'riesgo', 'problema', 'dificultad', 'critico', 'alto riesgo', 'alumnos problemas',
-                    'estudiantes riesgo', 'matriculas riesgo', 'problemas academicos',
-                    'reportes riesgo', 'seguimiento'
-                ],
-                'priority': 8
-            },
-            'ubicacion_grupos': {
-                'keywords': [
-                    'donde esta el grupo', 'ubicacion grupo', 'aula del grupo', 'salon',
-                    'donde tienen clase', 'que aula', 'ubicacion', 'donde se encuentra'
-                ],
-                'priority': 8
-            },
-            'horarios_grupos': {
-                'keywords': [
-                    'horario del grupo', 'que hora tiene clase', 'cuando tiene clase',
-                    'horarios de grupos', 'a que hora', 'schedule grupo', 'clases grupo'
-                ],
-                'priority': 8
-            },
-            'grupos_detalle': {
-                'keywords': [
-                    'grupos', 'que grupos hay', 'lista grupos', 'grupos activos',
-                    'informacion grupos', 'detalles grupos', 'cuantos grupos'
-                ],
-                'priority': 8
-            },
-            'carreras_rendimiento': {
-                'keywords': [
-                    'rendimiento por carrera', 'carreras', 'promedio carreras',
-                    'cual carrera va mejor', 'carreras problematicas', 'comparar carreras'
-                ],
-                'priority': 8
-            },
-            'profesores_carga': {
-                'keywords': [
-                    'carga profesores', 'que profesor tiene mas grupos', 'profesores sobrecargados',
-                    'distribucion profesores', 'profesor con mas clases', 'workload profesores'
-                ],
-                'priority': 7
-            },
-            'materias_criticas': {
-                'keywords': [
-                    'materias mas reprobadas', 'asignaturas problematicas', 'materias dificiles',
-                    'mayor reprobacion', 'materias criticas', 'asignaturas con problemas'
-                ],
-                'priority': 8
-            },
-            'solicitudes_urgentes': {
-                'keywords': [
-                    'solicitudes urgentes', 'ayuda pendiente', 'solicitudes criticas',
-                    'peticiones sin atender', 'solicitudes de emergencia'
-                ],
-                'priority': 8
-            },
-            'capacidad_grupos': {
-                'keywords': [
-                    'grupos llenos', 'capacidad grupos', 'grupos saturados',
-                    'cuantos alumnos por grupo', 'ocupacion grupos'
-                ],
-                'priority': 7
-            },
-            'matriculas_especificas': {
-                'keywords': [
-                    'matricula', 'matriculas', 'alumno especifico', 'estudiante numero',
-                    'buscar alumno', 'datos de matricula'
-                ],
-                'priority': 8
-            },
-            'analisis_temporal': {
-                'keywords': [
-                    'tendencia', 'evolucion', 'comparar periodos', 'historico',
-                    'mejora', 'empeoramiento', 'progreso'
-                ],
-                'priority': 7
-            },
-            'saludo': {
-                'keywords': [
-                    'hola', 'hello', 'hi', 'buenos dias', 'buenas tardes', 'buenas noches', 
-                    'que tal', 'saludos', 'hey'
-                ],
-                'priority': 10
-            },
-            'despedida': {
-                'keywords': [
-                    'adios', 'bye', 'hasta luego', 'nos vemos', 'chao', 'gracias adios'
-                ],
-                'priority': 10
-            },
-            'agradecimiento': {
-                'keywords': [
-                    'gracias', 'thank you', 'te lo agradezco', 'muchas gracias',
-                    'gracias por la info', 'perfecto gracias'
-                ],
-                'priority': 10
-            },
-            'pregunta_estado': {
-                'keywords': [
-                    'como estas', 'que tal estas', 'como te encuentras', 'how are you',
-                    'como andas', 'todo bien'
-                ],
-                'priority': 9
-            },
-            'pregunta_identidad': {
-                'keywords': [
-                    'quien eres', 'que eres', 'who are you', 'que puedes hacer', 
-                    'como funcionas', 'que sabes hacer', 'en que me ayudas'
-                ],
-                'priority': 9
-            },
-            'alumnos_por_carrera_cuatrimestre': {
-                'keywords': [
-                    'cuantos alumnos por carrera', 'alumnos por cuatrimestre', 'distribucion alumnos',
-                    'alumnos por carrera y cuatrimestre', 'cantidad alumnos carrera',
-                    'estadisticas por carrera', 'conteo alumnos', 'alumnos activos por carrera',
-                    'cuantos estudiantes por carrera', 'distribucion estudiantes'
-                ],
-                'priority': 8
-            },
-            'alumnos_inactivos': {
-                'keywords': [
-                    'alumnos inactivos', 'estudiantes inactivos', 'alumnos no activos',
-                    'listado inactivos', 'alumnos dados de baja', 'estudiantes dados de baja',
-                    'alumnos que no estan activos', 'estado inactivo', 'no activos'
-                ],
-                'priority': 8
-            },
-            
-            'alumnos_altas_calificaciones': {
-                'keywords': [
-                    'alumnos SA', 'alumnos DE', 'alumnos AU', 'calificacion 8', 'calificacion 9', 'calificacion 10',
-                    'satisfactorio', 'destacado', 'autonomo', 'altas calificaciones', 'mejores calificaciones',
-                    'excelentes calificaciones', 'ultimo ciclo', 'calificaciones sobresalientes',
-                    'estudiantes destacados', 'rendimiento sobresaliente', 'calificaciones satisfactorio',
-                    'calificaciones destacado', 'calificaciones autonomo', 'SA DE AU', 'nota 8',
-                    'nota 9', 'nota 10', 'notas altas', 'mejores notas', 'notas sobresalientes'
-                ],
-                'priority': 8
-            },
-            'alumnos_riesgo_academico': {
-                'keywords': [
-                    'alumnos riesgo academico', 'estudiantes riesgo academico', 'riesgo academico',
-                    'alumnos problemas academicos', 'estudiantes problemas academicos',
-                    'reportes riesgo academico', 'riesgo escolar', 'alumnos en riesgo',
-                    'estudiantes en riesgo', 'problemas rendimiento', 'bajo rendimiento academico'
-                ],
-                'priority': 9
-            },
-            'nombre_carreras': {
-                'keywords': [
-                    'nombre carreras', 'lista carreras', 'que carreras hay', 'carreras disponibles',
-                    'todas las carreras', 'carreras activas', 'nombres de carreras'
-                ],
-                'priority': 8
-            },
-            'info_todos_alumnos': {
-                'keywords': [
-                    'info todos los alumnos', 'informacion todos alumnos', 'lista todos alumnos',
-                    'todos los estudiantes', 'listado completo alumnos', 'alumnos completos'
-                ],
-                'priority': 8
-            },
-            'alumnos_calificacion_menor_8': {
-                'keywords': [
-                    'alumnos menor a 8', 'calificacion menor 8', 'menos de 8', 'bajo de 8',
-                    'calificaciones menores a 8', 'promedio menor 8', 'nota menor 8'
-                ],
-                'priority': 8
-            },
-            'alumnos_bajo_rendimiento_8': {
-                'keywords': [
-                    'bajo rendimiento desde 8', 'rendimiento 8 para abajo', 'desde 8 abajo',
-                    'promedio 8 hacia abajo', 'calificacion 8 o menor'
-                ],
-                'priority': 8
-            },
-            'profesores_grupo': {
-                'keywords': [
-                    'profesores de este grupo', 'profesores del grupo', 'que profesores tiene el grupo',
-                    'docentes del grupo', 'maestros del grupo'
-                ],
-                'priority': 8
-            },
-            'alumnos_grupo': {
-                'keywords': [
-                    'alumnos de este grupo', 'estudiantes del grupo', 'informacion alumnos grupo',
-                    'que alumnos tiene el grupo', 'listado grupo'
-                ],
-                'priority': 8
-            },
-            'alumnos_calificaciones_altas_por_carrera': {
-                'keywords': [
-                    'alumnos calificaciones altas', '3 de cada carrera', 'mejores de cada carrera',
-                    'top 3 por carrera', 'mejores alumnos carrera', 'destacados por carrera'
-                ],
-                'priority': 8
-            },
-            'info_profesor': {
-                'keywords': [
-                    'info profesor', 'informacion profesor', 'datos profesor',
-                    'info de este profesor', 'informacion de profesor'
-                ],
-                'priority': 8
-            },
-            'tutor_grupo': {
-                'keywords': [
-                    'tutor del grupo', 'quien es tutor', 'tutor de este grupo',
-                    'profesor tutor', 'responsable del grupo'
-                ],
-                'priority': 8
-            }
-            
-            
-            
-            
-            
-            
-            
-            
-        }
-        
-        self.directivo_question_indicators = [
-            'cuanto', 'cuanta', 'cuantos', 'cuantas',
-            'que', 'cual', 'cuales', 'quien', 'quienes',
-            'como', 'donde', 'cuando', 'por que', 'porque',
-            'dame', 'muestrame', 'necesito', 'quiero',
-            'dime', 'explicame', 'cuentame', 'reporta',
-            'lista', 'identifica', 'encuentra'
-        ]
+    def __init__(self, pattern_store: Optional[IntentPatternStore] = None):
+        self.pattern_store = pattern_store or IntentPatternStore.from_environment()
+        self.keyword_threshold = 0.3
+    
+    @property
+    def patterns(self):
+        return self.pattern_store.current
+    
+    @property
+    def intent_patterns(self) -> Dict[str, Dict[str, Any]]:
+        return self.patterns.intent_patterns
     
-    def classify_intent(self, message: str, context: Optional[Dict[str, Any]] = None) -> str:
+    @property
+    def directivo_question_indicators(self):
+        return self.patterns.directivo_question_indicators
+    
+    def classify_intent(self, message: str, context: Optional[Dict[str, Any]] = None,
+                        analysis: Optional[MessageAnalysis] = None) -> str:
         if not message or not message.strip():
             return 'mensaje_vacio'
         
-        message_clean = self._clean_message(message)
-        message_lower = message_clean.lower()
+        if analysis is None:
+            analysis = MessageAnalysis.from_message(message)
         
-        if self._is_matricula_query(message):
-            return 'matriculas_especificas'
+        self.pattern_store.reload_if_changed()
+        best_intent, highest_score = self.score_keywords(analysis)
         
-        best_intent = None
-        highest_score = 0
+        if highest_score >= self.keyword_threshold:
+            return best_intent
         
-        for intent, pattern_data in self.intent_patterns.items():
-            score = self._calculate_intent_score(message_lower, pattern_data)
-            if score > highest_score:
-                highest_score = score
-                best_intent = intent
+        return self.classify_fallback(analysis, context)
+    
+    def score_keywords(self, analysis: MessageAnalysis) -> Tuple[Optional[str], float]:
+        if analysis.matriculas:
+            return 'matriculas_especificas', 1.0
         
-        if highest_score >= 0.3:
-            return best_intent
+        return self.patterns.score(analysis.lower)
+    
+    def classify_fallback(self, analysis: MessageAnalysis, context: Optional[Dict[str, Any]] = None) -> str:
+        message_lower = analysis.lower
         
         if self._is_directivo_question(message_lower):
             return self._classify_directivo_question_type(message_lower)
         
-        if context and context.get('last_intent'):
-            context_intent = self._check_context_continuation(message_lower, context)
-            if context_intent:
-                return context_intent
+        return self.classify_continuation(analysis, context) or 'consulta_general_directivo'
+    
+    def classify_continuation(self, analysis: MessageAnalysis, context: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        # Follow-ups only mean something against the previous intent; a
+        # directivo question is a new question even mid-conversation
+        if not context or not context.get('last_intent') or self._is_directivo_question(analysis.lower):
+            return None
         
-        return 'consulta_general_directivo'
+        return self._check_context_continuation(analysis.lower, context)
     
     def _is_directivo_question(self, message: str) -> bool:
         return any(indicator in message for indicator in self.directivo_question_indicators)
     
     def _classify_directivo_question_type(self, message: str) -> str:
-        directivo_patterns = {
-            'estadisticas_generales': ['cuantos alumnos', 'cuantos profesores', 'cuantos grupos', 'cantidad total'],
-            'ubicacion_grupos': ['donde esta', 'que aula', 'ubicacion', 'salon'],
-            'horarios_grupos': ['que hora', 'cuando tiene', 'horario'],
-            'alumnos_bajo_rendimiento': ['peores', 'mas bajas', 'bajo rendimiento', 'reprobando'],
-            'materias_criticas': ['mas reprobadas', 'problematicas', 'dificiles'],
-            'capacidad_grupos': ['cuantos por grupo', 'llenos', 'capacidad'],
-            'carreras_rendimiento': ['rendimiento carrera', 'mejor carrera', 'promedio carrera'],
-            'profesores_carga': ['carga profesor', 'mas grupos', 'sobrecargado']
-        }
+        directivo_patterns = self.patterns.tables['directivo_question_patterns']
         
         for intent, patterns in directivo_patterns.items():
             if any(pattern in message for pattern in patterns):
@@ -310,16 +74,6 @@ class IntentClassifier:
         
         return 'estadisticas_generales'
     
-    def _clean_message(self, message: str) -> str:
-        message = re.sub(r'[¿¡]', '', message)
-        message = re.sub(r'[^\w\s]', ' ', message)
-        message = re.sub(r'\s+', ' ', message)
-        return message.strip()
-    
-    def _is_matricula_query(self, message: str) -> bool:
-        matricula_pattern = r'\b\d{8,12}\b'
-        return bool(re.search(matricula_pattern, message))
-    
     def _calculate_intent_score(self, message: str, pattern_data: Dict[str, Any]) -> float:
         keywords = pattern_data['keywords']
         priority = pattern_data.get('priority', 1)
@@ -366,17 +120,17 @@ class IntentClassifier:
         
         return None
     
-    def get_intent_confidence(self, message: str, intent: str) -> float:
+    def get_intent_confidence(self, message: str, intent: str, analysis: Optional[MessageAnalysis] = None) -> float:
         if intent not in self.intent_patterns:
             return 0.0
         
-        message_lower = self._clean_message(message).lower()
+        message_lower = (analysis or MessageAnalysis.from_message(message)).lower
         pattern_data = self.intent_patterns[intent]
         
         return self._calculate_intent_score(message_lower, pattern_data)
     
-    def suggest_intents(self, message: str, top_n: int = 3) -> list:
-        message_lower = self._clean_message(message).lower()
+    def suggest_intents(self, message: str, top_n: int = 3, analysis: Optional[MessageAnalysis] = None) -> list:
+        message_lower = (analysis or MessageAnalysis.from_message(message)).lower
         intent_scores = []
         
         for intent, pattern_data in self.intent_patterns.items():
@@ -0,0 +1,220 @@
+# utils/intent_model.py
+import re
+import logging
+from typing import Dict, Any, Optional, List, Tuple
+
+import numpy as np
+
+from utils.text_processor import TextProcessor
+from utils.model_artifact import ModelArtifact, read_model_artifact, write_model_artifact
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'(?u)\b\w\w+\b')
+
+PREPROCESSOR = 'TextProcessor.clean_text'
+
+def murmurhash3_32(key: str, seed: int = 0) -> int:
+    data = key.encode('utf-8')
+    length = len(data)
+    h = seed & 0xffffffff
+    c1, c2 = 0xcc9e2d51, 0x1b873593
+    rounded = length - (length & 3)
+
+    for i in range(0, rounded, 4):
+        k = int.from_bytes(data[i:i + 4], 'little')
+        k = (k * c1) & 0xffffffff
+        k = ((k << 15) | (k >> 17)) & 0xffffffff
+        k = (k * c2) & 0xffffffff
+        h ^= k
+        h = ((h << 13) | (h >> 19)) & 0xffffffff
+        h = (h * 5 + 0xe6546b64) & 0xffffffff
+
+    if length & 3:
+        k = int.from_bytes(data[rounded:], 'little')
+        k = (k * c1) & 0xffffffff
+        k = ((k << 15) | (k >> 17)) & 0xffffffff
+        k = (k * c2) & 0xffffffff
+        h ^= k
+
+    h ^= length
+    h ^= h >> 16
+    h = (h * 0x85ebca6b) & 0xffffffff
+    h ^= h >> 13
+    h = (h * 0xc2b2ae35) & 0xffffffff
+    h ^= h >> 16
+    return h - 0x100000000 if h & 0x80000000 else h
+
+class IntentModelPredictor:
+    MODEL_TYPE = 'tfidf_multinomial_nb'
+
+    def __init__(self, vocabulary, idf: Optional[np.ndarray], feature_log_prob_t: np.ndarray,
+                 class_log_prior: np.ndarray, classes: List[str], ngram_range: Tuple[int, int] = (1, 2),
+                 sublinear_tf: bool = False):
+        self.vocabulary = vocabulary
+        self.idf = None if idf is None else np.asarray(idf, dtype=np.float64)
+        self.feature_log_prob_t = np.ascontiguousarray(feature_log_prob_t, dtype=np.float64)
+        self.class_log_prior = np.asarray(class_log_prior, dtype=np.float64)
+        self.classes = list(classes)
+        self.ngram_range = tuple(ngram_range)
+        self.sublinear_tf = sublinear_tf
+        self.processor = TextProcessor()
+        self.artifact = None
+
+    @property
+    def n_features(self) -> int:
+        return self.feature_log_prob_t.shape[0]
+
+    def artifact_metadata(self) -> Dict[str, Any]:
+        return {
+            'model_type': self.MODEL_TYPE,
+            'token_pattern': TOKEN_PATTERN.pattern,
+            'preprocessor': PREPROCESSOR,
+            'ngram_range': list(self.ngram_range),
+            'sublinear_tf': self.sublinear_tf
+        }
+
+    def artifact_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            'idf': self.idf,
+            'feature_log_prob_t': self.feature_log_prob_t,
+            'class_log_prior': self.class_log_prior
+        }
+
+    def save_artifact(self, path: str, extra_metadata: Optional[Dict[str, Any]] = None) -> str:
+        metadata = self.artifact_metadata()
+        metadata.update(extra_metadata or {})
+        vocabulary = {term: int(index) for term, index in self.vocabulary.items()} if self.vocabulary else {}
+        return write_model_artifact(path, vocabulary, self.artifact_arrays(), self.classes,
+                                    self.n_features, metadata)
+
+    @classmethod
+    def from_artifact(cls, path: str, verify: bool = True) -> 'IntentModelPredictor':
+        artifact = read_model_artifact(path, verify=verify, expected={
+            'token_pattern': TOKEN_PATTERN.pattern,
+            'preprocessor': PREPROCESSOR
+        })
+
+        model_type = artifact.metadata.get('model_type')
+        predictor_class = MODEL_TYPES.get(model_type)
+        if predictor_class is None or not issubclass(predictor_class, cls):
+            raise ValueError(f"Artifact {path} has unsupported model type {model_type!r}")
+
+        n_features, n_classes = artifact.metadata['n_features'], artifact.metadata['n_classes']
+        arrays = artifact.arrays
+        if arrays['feature_log_prob_t'].shape != (n_features, n_classes) \
+                or arrays['class_log_prior'].shape != (n_classes,):
+            raise ValueError(f"Artifact {path} weight shapes do not match its metadata")
+
+        predictor = predictor_class._from_loaded_artifact(artifact)
+        predictor.artifact = artifact
+        return predictor
+
+    @classmethod
+    def _from_loaded_artifact(cls, artifact: ModelArtifact) -> 'IntentModelPredictor':
+        if artifact.metadata['vocabulary_size'] != artifact.metadata['n_features'] \
+                or artifact.arrays['idf'].shape != (artifact.metadata['n_features'],):
+            raise ValueError(f"Artifact {artifact.path} vocabulary does not match its weights")
+
+        return cls(
+            vocabulary=artifact.vocabulary,
+            idf=artifact.arrays['idf'],
+            feature_log_prob_t=artifact.arrays['feature_log_prob_t'],
+            class_log_prior=artifact.arrays['class_log_prior'],
+            classes=artifact.metadata['classes'],
+            ngram_range=tuple(artifact.metadata['ngram_range']),
+            sublinear_tf=artifact.metadata.get('sublinear_tf', False)
+        )
+
+    def _ngrams(self, text: str) -> List[str]:
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        min_n, max_n = self.ngram_range
+        if max_n == 1:
+            return tokens
+
+        ngrams = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), max_n + 1):
+            for i in range(len(tokens) - n + 1):
+                ngrams.append(' '.join(tokens[i:i + n]))
+        return ngrams
+
+    def _feature_counts(self, text: str) -> Dict[int, int]:
+        counts = {}
+        vocabulary = self.vocabulary
+        for ngram in self._ngrams(self.processor.clean_text(text)):
+            index = vocabulary.get(ngram)
+            if index is not None:
+                counts[index] = counts.get(index, 0) + 1
+        return counts
+
+    def transform(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        counts = self._feature_counts(text)
+
+        indices = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        if self.sublinear_tf:
+            values = np.log(values) + 1
+        if self.idf is not None:
+            values *= self.idf[indices]
+
+        norm = np.sqrt(np.dot(values, values))
+        if norm > 0:
+            values /= norm
+        return indices, values
+
+    def joint_log_likelihood(self, text: str) -> np.ndarray:
+        indices, values = self.transform(text)
+        return values @ self.feature_log_prob_t[indices] + self.class_log_prior
+
+    def predict_proba(self, text: str) -> np.ndarray:
+        jll = self.joint_log_likelihood(text)
+        jll = np.exp(jll - jll.max())
+        return jll / jll.sum()
+
+    def predict(self, text: str) -> str:
+        return self.classes[int(np.argmax(self.joint_log_likelihood(text)))]
+
+    def predict_intent(self, text: str, confidence_threshold: float = 0.6) -> Tuple[str, float]:
+        probabilities = self.predict_proba(text)
+        best = int(np.argmax(probabilities))
+        confidence = float(probabilities[best])
+
+        if confidence < confidence_threshold:
+            return 'conversacion_general', confidence
+
+        return self.classes[best], confidence
+
+class HashingIntentModelPredictor(IntentModelPredictor):
+    MODEL_TYPE = 'hashing_multinomial_nb'
+
+    def __init__(self, feature_log_prob_t: np.ndarray, class_log_prior: np.ndarray, classes: List[str],
+                 ngram_range: Tuple[int, int] = (1, 2)):
+        super().__init__(None, None, feature_log_prob_t, class_log_prior, classes, ngram_range)
+
+    def artifact_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            'feature_log_prob_t': self.feature_log_prob_t,
+            'class_log_prior': self.class_log_prior
+        }
+
+    @classmethod
+    def _from_loaded_artifact(cls, artifact: ModelArtifact) -> 'HashingIntentModelPredictor':
+        return cls(
+            feature_log_prob_t=artifact.arrays['feature_log_prob_t'],
+            class_log_prior=artifact.arrays['class_log_prior'],
+            classes=artifact.metadata['classes'],
+            ngram_range=tuple(artifact.metadata['ngram_range'])
+        )
+
+    def _feature_counts(self, text: str) -> Dict[int, int]:
+        counts = {}
+        n_features = self.n_features
+        for ngram in self._ngrams(self.processor.clean_text(text)):
+            index = abs(murmurhash3_32(ngram)) % n_features
+            counts[index] = counts.get(index, 0) + 1
+        return counts
+
+MODEL_TYPES = {
+    IntentModelPredictor.MODEL_TYPE: IntentModelPredictor,
+    HashingIntentModelPredictor.MODEL_TYPE: HashingIntentModelPredictor
+}
@@ -0,0 +1,332 @@
+# utils/intent_patterns.py
+import os
+import sys
+import json
+import time
+import hashlib
+import tempfile
+import threading
+import logging
+from typing import Dict, Any, Optional, List, Tuple
+
+import numpy as np
+
+from utils.model_artifact import read_artifact, section_array, write_artifact
+
+logger = logging.getLogger(__name__)
+
+PATTERNS_MAGIC = b'DTAIPATT'
+
+DEFAULT_PATTERNS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                     'data', 'intent_patterns.json')
+
+TABLES = (
+    'directivo_question_indicators',
+    'directivo_question_patterns',
+    'suggestions',
+    'conversational_intents',
+    'role_permissions'
+)
+
+def _pack_strings(strings: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype='<u4')
+    offsets[1:] = np.cumsum([len(string) for string in encoded])
+    return np.frombuffer(b''.join(encoded), dtype='u1'), offsets
+
+def _unpack_strings(blob: memoryview, offsets: memoryview) -> Tuple[str, ...]:
+    return tuple(sys.intern(blob[offsets[i]:offsets[i + 1]].tobytes().decode('utf-8'))
+                 for i in range(len(offsets) - 1))
+
+def _csr(rows: List[List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    offsets = np.zeros(len(rows) + 1, dtype='<u4')
+    offsets[1:] = np.cumsum([len(row) for row in rows])
+    values = np.array([value for row in rows for value in row], dtype='<u4')
+    return offsets, values
+
+def build_automaton(keywords: List[str]) -> Dict[str, np.ndarray]:
+    alphabet = sorted({char for keyword in keywords for char in keyword})
+    char_class = {char: i + 1 for i, char in enumerate(alphabet)}
+    n_classes = len(alphabet) + 1
+
+    goto = [{}]
+    terminal = [[]]
+    for pattern_id, keyword in enumerate(keywords):
+        state = 0
+        for char in keyword:
+            next_state = goto[state].get(char_class[char])
+            if next_state is None:
+                next_state = len(goto)
+                goto[state][char_class[char]] = next_state
+                goto.append({})
+                terminal.append([])
+            state = next_state
+        terminal[state].append(pattern_id)
+
+    # Breadth-first fill of the full transition table: missing edges follow the
+    # failure link, and each state inherits the outputs of its failure state
+    delta = np.zeros((len(goto), n_classes), dtype='<i4')
+    fail = [0] * len(goto)
+    outputs = [list(patterns) for patterns in terminal]
+    queue = []
+    for cls, state in goto[0].items():
+        delta[0, cls] = state
+        queue.append(state)
+
+    for state in queue:
+        outputs[state].extend(outputs[fail[state]])
+        for cls in range(n_classes):
+            next_state = goto[state].get(cls)
+            if next_state is None:
+                delta[state, cls] = delta[fail[state], cls]
+            else:
+                fail[next_state] = int(delta[fail[state], cls])
+                delta[state, cls] = next_state
+                queue.append(next_state)
+
+    output_offsets, output_patterns = _csr(outputs)
+    return {
+        'alphabet': np.array([ord(char) for char in alphabet], dtype='<u4'),
+        'delta': delta,
+        'output_offsets': output_offsets,
+        'output_patterns': output_patterns
+    }
+
+def compile_patterns(source: Dict[str, Any]) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    intent_names = list(source['intent_patterns'])
+    keywords = []
+    keyword_ids = {}
+    intent_keywords = []
+    for intent in intent_names:
+        row = []
+        for keyword in source['intent_patterns'][intent]['keywords']:
+            if not keyword:
+                raise ValueError(f"Intent '{intent}' has an empty keyword")
+            if keyword not in keyword_ids:
+                keyword_ids[keyword] = len(keywords)
+                keywords.append(keyword)
+            row.append(keyword_ids[keyword])
+        intent_keywords.append(row)
+
+    keyword_intents = [[] for _ in keywords]
+    for intent_id, row in enumerate(intent_keywords):
+        for keyword_id in row:
+            keyword_intents[keyword_id].append(intent_id)
+
+    intent_blob, intent_offsets = _pack_strings(intent_names)
+    keyword_blob, keyword_offsets = _pack_strings(keywords)
+    intent_keyword_offsets, intent_keyword_ids = _csr(intent_keywords)
+    keyword_intent_offsets, keyword_intent_ids = _csr(keyword_intents)
+
+    sections = {
+        'intent_strings': intent_blob,
+        'intent_offsets': intent_offsets,
+        'keyword_strings': keyword_blob,
+        'keyword_offsets': keyword_offsets,
+        'priorities': np.array([source['intent_patterns'][intent].get('priority', 1)
+                                for intent in intent_names], dtype='<i4'),
+        'keyword_lengths': np.array([len(keyword) for keyword in keywords], dtype='<u4'),
+        'intent_keyword_offsets': intent_keyword_offsets,
+        'intent_keyword_ids': intent_keyword_ids,
+        'keyword_intent_offsets': keyword_intent_offsets,
+        'keyword_intent_ids': keyword_intent_ids
+    }
+    sections.update(build_automaton(keywords))
+
+    metadata = {
+        'n_intents': len(intent_names),
+        'n_keywords': len(keywords),
+        'tables': {name: source.get(name) for name in TABLES}
+    }
+    return sections, metadata
+
+class PatternSet:
+    def __init__(self, path: str, metadata: Dict[str, Any], buffer, views: Dict[str, memoryview]):
+        self.path = path
+        self.metadata = metadata
+        self.buffer = buffer
+        self.tables = metadata['tables']
+
+        self.intent_names = _unpack_strings(views['intent_strings'], views['intent_offsets'].cast('I'))
+        self.keywords = _unpack_strings(views['keyword_strings'], views['keyword_offsets'].cast('I'))
+        self.priorities = views['priorities'].cast('i')
+        self.keyword_lengths = views['keyword_lengths'].cast('I')
+        self.intent_keyword_offsets = views['intent_keyword_offsets'].cast('I')
+        self.intent_keyword_ids = views['intent_keyword_ids'].cast('I')
+        self.keyword_intent_offsets = views['keyword_intent_offsets'].cast('I')
+        self.keyword_intent_ids = views['keyword_intent_ids'].cast('I')
+        self.output_offsets = views['output_offsets'].cast('I')
+        self.output_patterns = views['output_patterns'].cast('I')
+        self.delta = views['delta'].cast('i')
+        self.n_classes = metadata['sections']['delta']['shape'][1]
+        self.char_classes = {chr(code): i + 1 for i, code in enumerate(section_array(metadata, views, 'alphabet'))}
+
+        self.keyword_counts = tuple(self.intent_keyword_offsets[i + 1] - self.intent_keyword_offsets[i]
+                                    for i in range(len(self.intent_names)))
+        self.directivo_question_indicators = tuple(self.tables['directivo_question_indicators'] or ())
+        self.conversational_intents = frozenset(self.tables['conversational_intents'] or ())
+        self._intent_patterns = None
+
+    @classmethod
+    def from_artifact(cls, path: str, expected: Optional[Dict[str, Any]] = None) -> 'PatternSet':
+        metadata, buffer, views = read_artifact(path, PATTERNS_MAGIC, expected=expected)
+        n_states, n_classes = metadata['sections']['delta']['shape']
+        if len(views['output_offsets']) // 4 != n_states + 1 \
+                or len(views['alphabet']) // 4 != n_classes - 1:
+            raise ValueError(f"Pattern artifact {path} automaton does not match its metadata")
+        return cls(path, metadata, buffer, views)
+
+    @property
+    def content_hash(self) -> str:
+        return self.metadata['payload_sha256']
+
+    @property
+    def intent_patterns(self) -> Dict[str, Dict[str, Any]]:
+        if self._intent_patterns is None:
+            offsets, ids = self.intent_keyword_offsets, self.intent_keyword_ids
+            self._intent_patterns = {
+                intent: {
+                    'keywords': [self.keywords[ids[j]] for j in range(offsets[i], offsets[i + 1])],
+                    'priority': self.priorities[i]
+                }
+                for i, intent in enumerate(self.intent_names)
+            }
+        return self._intent_patterns
+
+    def keyword_hits(self, text: str) -> set:
+        delta, n_classes, char_classes = self.delta, self.n_classes, self.char_classes
+        output_offsets, output_patterns = self.output_offsets, self.output_patterns
+
+        hits = set()
+        state = 0
+        for char in text:
+            state = delta[state * n_classes + char_classes.get(char, 0)]
+            start = output_offsets[state]
+            end = output_offsets[state + 1]
+            if start != end:
+                hits.update(output_patterns[start:end])
+        return hits
+
+    def score(self, text: str) -> Tuple[Optional[str], float]:
+        hits = self.keyword_hits(text)
+        if not hits:
+            return None, 0
+
+        offsets, intent_ids = self.keyword_intent_offsets, self.keyword_intent_ids
+        text_length = len(text.strip())
+        matches = {}
+        exact = set()
+        for keyword_id in hits:
+            is_exact = self.keyword_lengths[keyword_id] == text_length
+            for j in range(offsets[keyword_id], offsets[keyword_id + 1]):
+                intent_id = intent_ids[j]
+                matches[intent_id] = matches.get(intent_id, 0) + 1
+                if is_exact:
+                    exact.add(intent_id)
+
+        best_intent = None
+        highest_score = 0
+        for intent_id in sorted(matches):
+            count = matches[intent_id]
+            score = (count / self.keyword_counts[intent_id]) * (self.priorities[intent_id] / 10)
+            if count > 1:
+                score += 0.2
+            if intent_id in exact:
+                score += 0.5
+            score = min(score, 1.0)
+            if score > highest_score:
+                highest_score = score
+                best_intent = self.intent_names[intent_id]
+
+        return best_intent, highest_score
+
+def _fallback_compiled_path(compiled_path: str, digest: str) -> str:
+    name = os.path.splitext(os.path.basename(compiled_path))[0]
+    return os.path.join(tempfile.gettempdir(), f'{name}-{digest[:12]}.bin')
+
+def load_pattern_set(source_path: str, compiled_path: str) -> PatternSet:
+    with open(source_path, 'rb') as f:
+        source_bytes = f.read()
+    digest = hashlib.sha256(source_bytes).hexdigest()
+
+    for path in (compiled_path, _fallback_compiled_path(compiled_path, digest)):
+        try:
+            return PatternSet.from_artifact(path, expected={'source_sha256': digest})
+        except (OSError, ValueError):
+            pass
+
+    sections, metadata = compile_patterns(json.loads(source_bytes.decode('utf-8')))
+    metadata['source_sha256'] = digest
+    try:
+        write_artifact(compiled_path, sections, metadata, PATTERNS_MAGIC)
+    except OSError as e:
+        compiled_path = _fallback_compiled_path(compiled_path, digest)
+        logger.warning(f"Cannot write compiled patterns next to the source ({e}), using {compiled_path}")
+        write_artifact(compiled_path, sections, metadata, PATTERNS_MAGIC)
+
+    logger.info(f"Intent patterns compiled from {source_path} ({metadata['n_keywords']} keywords)")
+    return PatternSet.from_artifact(compiled_path, expected={'source_sha256': digest})
+
+def _file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+class IntentPatternStore:
+    def __init__(self, source_path: str = DEFAULT_PATTERNS_PATH, compiled_path: Optional[str] = None,
+                 reload_interval: float = 10.0):
+        self.source_path = source_path
+        self.compiled_path = compiled_path or f'{os.path.splitext(source_path)[0]}.bin'
+        self.reload_interval = reload_interval
+        self.reloads = 0
+
+        self._signature = _file_signature(source_path)
+        self.current = load_pattern_set(source_path, self.compiled_path)
+        self._next_reload_check = time.monotonic() + reload_interval
+        self._reload_lock = threading.Lock()
+
+    @classmethod
+    def from_environment(cls) -> 'IntentPatternStore':
+        return cls(
+            source_path=os.environ.get('INTENT_PATTERNS_PATH', DEFAULT_PATTERNS_PATH),
+            reload_interval=float(os.environ.get('INTENT_PATTERNS_RELOAD_SECONDS', 10))
+        )
+
+    def reload_if_changed(self, force: bool = False) -> bool:
+        now = time.monotonic()
+        if not force and now < self._next_reload_check:
+            return False
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+
+        try:
+            self._next_reload_check = now + self.reload_interval
+            signature = _file_signature(self.source_path)
+            if signature is None or signature == self._signature:
+                return False
+
+            self._signature = signature
+            try:
+                pattern_set = load_pattern_set(self.source_path, self.compiled_path)
+            except Exception as e:
+                logger.error(f"Rejected intent patterns from {self.source_path}: {e}")
+                return False
+
+            self.current = pattern_set
+            self.reloads += 1
+            logger.info(f"Intent patterns hot-reloaded ({pattern_set.content_hash[:12]})")
+            return True
+        finally:
+            self._reload_lock.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'source': self.source_path,
+            'version': self.current.content_hash[:12],
+            'intents': len(self.current.intent_names),
+            'keywords': len(self.current.keywords),
+            'automaton_states': len(self.current.output_offsets) - 1,
+            'reloads': self.reloads
+        }
@@ -0,0 +1,191 @@
+# utils/memory.py
+import os
+import gc
+import time
+import logging
+import threading
+import tracemalloc
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_PACKAGES = ('models', 'utils', 'database', 'training')
+GROUP_BY = ('lineno', 'filename', 'traceback')
+
+# Allocations made by the diagnostics themselves would dominate every diff
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>')
+)
+
+def _relative(path: str) -> str:
+    path = os.path.abspath(path)
+    return os.path.relpath(path, ROOT) if path.startswith(ROOT + os.sep) else path
+
+def _location(traceback: tracemalloc.Traceback, group_by: str):
+    frame = traceback[0]
+    if group_by == 'filename':
+        return _relative(frame.filename)
+    if group_by == 'traceback':
+        return [f"{_relative(frame.filename)}:{frame.lineno}" for frame in traceback]
+    return f"{_relative(frame.filename)}:{frame.lineno}"
+
+class MemoryDiagnostics:
+    MAX_SNAPSHOTS = 4
+
+    def __init__(self, frames: int = 10):
+        self.frames = frames
+        # Snapshots hold every traced allocation, so only a few are kept
+        self._snapshots: 'OrderedDict[int, Dict[str, Any]]' = OrderedDict()
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_environment(cls) -> 'MemoryDiagnostics':
+        diagnostics = cls(frames=int(os.environ.get('MEMORY_TRACE_FRAMES', 10)))
+        if os.environ.get('MEMORY_TRACE_AT_START', '').lower() in ('1', 'true', 'yes'):
+            diagnostics.start()
+        return diagnostics
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: Optional[int] = None) -> bool:
+        # Only allocations made after this point are traced
+        if tracemalloc.is_tracing():
+            return False
+        self.frames = frames or self.frames
+        tracemalloc.start(self.frames)
+        logger.info(f"tracemalloc iniciado ({self.frames} marcos)")
+        return True
+
+    def stop(self) -> bool:
+        # Stopping frees the traces, and snapshots are dropped with them
+        if not tracemalloc.is_tracing():
+            return False
+        tracemalloc.stop()
+        with self._lock:
+            self._snapshots.clear()
+        logger.info("tracemalloc detenido")
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        with self._lock:
+            snapshots = [self._describe(snapshot_id, entry) for snapshot_id, entry in self._snapshots.items()]
+        return {
+            'tracing': tracing,
+            'frames': self.frames,
+            'traced_bytes': current,
+            'traced_peak_bytes': peak,
+            'tracemalloc_overhead_bytes': tracemalloc.get_tracemalloc_memory() if tracing else 0,
+            'snapshots': snapshots
+        }
+
+    @staticmethod
+    def _describe(snapshot_id: int, entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'id': snapshot_id,
+            'label': entry['label'],
+            'taken_at': entry['taken_at'],
+            'traced_bytes': entry['traced_bytes']
+        }
+
+    def _take(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+
+    def take_snapshot(self, label: str = '', group_by: str = 'lineno', limit: int = 20) -> Optional[Dict[str, Any]]:
+        if not tracemalloc.is_tracing():
+            return None
+        snapshot = self._take()
+        entry = {
+            'label': label,
+            'taken_at': time.time(),
+            'traced_bytes': tracemalloc.get_traced_memory()[0],
+            'snapshot': snapshot
+        }
+        with self._lock:
+            snapshot_id = self._next_id
+            self._next_id += 1
+            self._snapshots[snapshot_id] = entry
+            while len(self._snapshots) > self.MAX_SNAPSHOTS:
+                self._snapshots.popitem(last=False)
+
+        stats = snapshot.statistics(group_by)
+        return dict(self._describe(snapshot_id, entry), top=[{
+            'location': _location(stat.traceback, group_by),
+            'size_bytes': stat.size,
+            'count': stat.count
+        } for stat in stats[:limit]], total_bytes=sum(stat.size for stat in stats))
+
+    def delete_snapshot(self, snapshot_id: int) -> bool:
+        with self._lock:
+            return self._snapshots.pop(snapshot_id, None) is not None
+
+    def diff(self, first: int, second: Optional[int] = None, group_by: str = 'lineno',
+             limit: int = 25) -> Optional[Dict[str, Any]]:
+        # Without a second id the first snapshot is compared with the live heap
+        with self._lock:
+            old = self._snapshots.get(first)
+            new = self._snapshots.get(second) if second is not None else None
+        if old is None or (second is not None and new is None):
+            return None
+        if new is None:
+            if not tracemalloc.is_tracing():
+                return None
+            new = {'label': 'actual', 'taken_at': time.time(), 'snapshot': self._take()}
+
+        stats = new['snapshot'].compare_to(old['snapshot'], group_by)
+        return {
+            'from': {'id': first, 'label': old['label'], 'taken_at': old['taken_at']},
+            'to': {'id': second, 'label': new['label'], 'taken_at': new['taken_at']},
+            'group_by': group_by,
+            'size_diff_bytes': sum(stat.size_diff for stat in stats),
+            'count_diff': sum(stat.count_diff for stat in stats),
+            'top': [{
+                'location': _location(stat.traceback, group_by),
+                'size_diff_bytes': stat.size_diff,
+                'count_diff': stat.count_diff,
+                'size_bytes': stat.size,
+                'count': stat.count
+            } for stat in stats[:limit]]
+        }
+
+def object_counts(limit: int = 20) -> Dict[str, Any]:
+    # Walks every GC-tracked object, so it costs tens of milliseconds on a
+    # loaded worker; instances of project classes are counted by qualified
+    # name, builtins only by type
+    own = Counter()
+    builtin = Counter()
+    large = []
+    objects = gc.get_objects()
+    for obj in objects:
+        cls = type(obj)
+        module = cls.__module__
+        if module.split('.', 1)[0] in PROJECT_PACKAGES:
+            own[f"{module}.{cls.__qualname__}"] += 1
+        elif module == 'builtins':
+            builtin[cls.__name__] += 1
+            # Row lists from the database are the usual large containers
+            if cls is list and len(obj) >= 1000:
+                large.append(len(obj))
+
+    total = len(objects)
+    del objects
+    large.sort(reverse=True)
+    return {
+        'gc_tracked_objects': total,
+        'project_types': dict(own.most_common(limit)),
+        'builtin_types': dict(builtin.most_common(limit)),
+        'large_lists': {'count': len(large), 'largest_lengths': large[:10]},
+        'gc_counts': gc.get_count()
+    }
+
+memory_diagnostics = MemoryDiagnostics.from_environment()
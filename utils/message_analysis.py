@@ -0,0 +1,62 @@
+import re
+import unicodedata
+from typing import NamedTuple, Tuple
+
+_INVERTED_MARKS = re.compile(r'[¿¡]')
+_NON_WORD = re.compile(r'[^\w\s]')
+_SPACES = re.compile(r'\s+')
+_COMBINING_MARKS = re.compile(r'[\u0300-\u036f]')
+_NUMBER = re.compile(r'\d+')
+_MATRICULA = re.compile(r'\b\d{8,12}\b')
+_GROUP_CODE = re.compile(r'\b([A-Za-z]{2,5})-?(\d{3})\b')
+
+class MessageAnalysis(NamedTuple):
+    original: str
+    raw_lower: str
+    clean: str
+    lower: str
+    normalized: str
+    tokens: Tuple[str, ...]
+    word_count: int
+    numbers: Tuple[str, ...]
+    matriculas: Tuple[str, ...]
+    group_codes: Tuple[str, ...]
+
+    @classmethod
+    def from_message(cls, message: str) -> 'MessageAnalysis':
+        message = message or ""
+
+        clean = _INVERTED_MARKS.sub('', message)
+        clean = _NON_WORD.sub(' ', clean)
+        clean = _SPACES.sub(' ', clean).strip()
+        lower = clean.lower()
+
+        if lower.isascii():
+            normalized = lower
+        else:
+            normalized = _COMBINING_MARKS.sub('', unicodedata.normalize('NFD', lower))
+
+        numbers = tuple(_NUMBER.findall(message))
+        if numbers:
+            matriculas = tuple(_MATRICULA.findall(message))
+            group_codes = tuple(f"{prefix.upper()}-{number}" for prefix, number in _GROUP_CODE.findall(message))
+        else:
+            matriculas = ()
+            group_codes = ()
+
+        return cls(
+            message,
+            message.lower(),
+            clean,
+            lower,
+            normalized,
+            tuple(normalized.split()),
+            len(message.split()),
+            numbers,
+            matriculas,
+            group_codes
+        )
+
+    @property
+    def matricula(self) -> str:
+        return self.matriculas[0] if self.matriculas else ""
@@ -0,0 +1,222 @@
+# utils/metrics.py
+import os
+import sys
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Log-linear buckets in the style of HdrHistogram: values below SUB_BUCKETS
+# microseconds are exact, above that every power of two is split into
+# SUB_BUCKETS / 2 linear buckets, bounding the relative error at 1/16
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+HALF_SUB_BUCKETS = SUB_BUCKETS >> 1
+MAX_VALUE_BITS = 27
+BUCKET_COUNT = (MAX_VALUE_BITS - SUB_BUCKET_BITS + 2) * HALF_SUB_BUCKETS
+MAX_VALUE_US = (1 << MAX_VALUE_BITS) - 1
+
+def bucket_index(value: int) -> int:
+    if value < SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return (shift + 1) * HALF_SUB_BUCKETS + (value >> shift) - HALF_SUB_BUCKETS
+
+def bucket_upper_bound(index: int) -> int:
+    if index < SUB_BUCKETS:
+        return index
+    shift = index // HALF_SUB_BUCKETS - 1
+    return ((index - shift * HALF_SUB_BUCKETS + 1) << shift) - 1
+
+class LatencyHistogram:
+    __slots__ = ('counts', 'count', 'total_us', 'max_us', '_lock')
+
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        value = int(seconds * 1e6)
+        if value > MAX_VALUE_US:
+            value = MAX_VALUE_US
+        elif value < 0:
+            value = 0
+        index = bucket_index(value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total_us += value
+            if value > self.max_us:
+                self.max_us = value
+
+    def percentiles(self, quantiles: Iterable[float]) -> List[float]:
+        # One pass over the buckets for all quantiles; values are the bucket's
+        # upper bound in seconds, clamped to the largest value seen
+        with self._lock:
+            counts = list(self.counts)
+            count, max_us = self.count, self.max_us
+
+        quantiles = list(quantiles)
+        results = [0.0] * len(quantiles)
+        if not count:
+            return results
+
+        targets = sorted((max(1, int(q * count + 0.999999)), position) for position, q in enumerate(quantiles))
+        seen = 0
+        pending = iter(targets)
+        target, position = next(pending)
+        for index, bucket in enumerate(counts):
+            if not bucket:
+                continue
+            seen += bucket
+            while seen >= target:
+                results[position] = min(bucket_upper_bound(index), max_us) / 1e6
+                try:
+                    target, position = next(pending)
+                except StopIteration:
+                    return results
+        return results
+
+    def snapshot(self) -> Dict[str, float]:
+        p50, p90, p99 = self.percentiles((0.5, 0.9, 0.99))
+        with self._lock:
+            count, total_us, max_us = self.count, self.total_us, self.max_us
+        return {
+            'count': count,
+            'avg_ms': round(total_us / count / 1000, 3) if count else 0.0,
+            'p50_ms': round(p50 * 1000, 3),
+            'p90_ms': round(p90 * 1000, 3),
+            'p99_ms': round(p99 * 1000, 3),
+            'max_ms': round(max_us / 1000, 3)
+        }
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    escaped = (f'{name}="{_escape(value)}"' for name, value in labels)
+    return '{' + ','.join(escaped) + '}'
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class MetricsRegistry:
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self, namespace: str = 'dtai'):
+        self.namespace = namespace
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._counters: Dict[Tuple, int] = {}
+        self._collectors: List[Tuple[str, str, str, Callable[[], Iterable[Tuple[Dict[str, str], float]]]]] = []
+        self._lock = threading.Lock()
+
+    def histogram(self, stage: str, intent: str) -> LatencyHistogram:
+        key = (stage, intent)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, LatencyHistogram())
+        return histogram
+
+    def observe(self, stage: str, intent: str, seconds: float):
+        histogram = self._histograms.get((stage, intent))
+        if histogram is None:
+            histogram = self.histogram(stage, intent)
+        histogram.record(seconds)
+
+    def increment(self, name: str, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+
+    def register_collector(self, name: str, help_text: str,
+                           collect: Callable[[], Iterable[Tuple[Dict[str, str], float]]], kind: str = 'gauge'):
+        # collect() returns (labels, value) pairs and only runs on a scrape, so
+        # components keep their own counters off the metrics hot path
+        self._collectors.append((name, help_text, kind, collect))
+
+    def stage_summary(self, stage: str) -> Dict[str, float]:
+        # Merges the per-intent histograms of one stage
+        merged = LatencyHistogram()
+        with self._lock:
+            histograms = [histogram for (name, _), histogram in self._histograms.items() if name == stage]
+        for histogram in histograms:
+            with histogram._lock:
+                for index, bucket in enumerate(histogram.counts):
+                    if bucket:
+                        merged.counts[index] += bucket
+                merged.count += histogram.count
+                merged.total_us += histogram.total_us
+                merged.max_us = max(merged.max_us, histogram.max_us)
+        return merged.snapshot()
+
+    def histogram_count(self) -> int:
+        return len(self._histograms)
+
+    def stage_names(self) -> List[str]:
+        with self._lock:
+            return sorted({stage for stage, _ in self._histograms})
+
+    def stages(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        with self._lock:
+            items = sorted(self._histograms.items())
+        result = {}
+        for (stage, intent), histogram in items:
+            result.setdefault(stage, {})[intent] = histogram.snapshot()
+        return result
+
+    def render_prometheus(self) -> str:
+        prefix = self.namespace
+        lines = [
+            f"# HELP {prefix}_stage_latency_seconds Latency of each chat pipeline stage by intent",
+            f"# TYPE {prefix}_stage_latency_seconds summary"
+        ]
+
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        for (stage, intent), histogram in histograms:
+            labels = (('stage', stage), ('intent', intent))
+            for quantile, value in zip(self.QUANTILES, histogram.percentiles(self.QUANTILES)):
+                lines.append(f"{prefix}_stage_latency_seconds{_labels(labels + (('quantile', quantile),))} {value:.6f}")
+            lines.append(f"{prefix}_stage_latency_seconds_sum{_labels(labels)} {histogram.total_us / 1e6:.6f}")
+            lines.append(f"{prefix}_stage_latency_seconds_count{_labels(labels)} {histogram.count}")
+
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# TYPE {prefix}_{name} counter")
+            lines.append(f"{prefix}_{name}{_labels(labels)} {value}")
+
+        for name, help_text, kind, collect in self._collectors:
+            try:
+                samples = list(collect())
+            except Exception as e:
+                logger.error(f"Error collecting metric {name}: {e}")
+                continue
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for labels, value in samples:
+                if value is not None:
+                    lines.append(f"{prefix}_{name}{_labels(tuple(sorted(labels.items())))} {value}")
+
+        return '\n'.join(lines) + '\n'
+
+def process_memory_bytes() -> Optional[int]:
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is the peak, in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError):
+        return None
@@ -0,0 +1,198 @@
+# utils/model_artifact.py
+import os
+import sys
+import json
+import mmap
+import struct
+import hashlib
+import tempfile
+import logging
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'DTAIINTM'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+PREAMBLE = struct.Struct('<8sII')
+
+class StringTable:
+    def __init__(self, offsets, strings, indexes):
+        self.offsets = offsets
+        self.strings = strings
+        self.indexes = indexes
+        self.size = len(offsets) - 1
+
+    @classmethod
+    def build(cls, vocabulary: Dict[str, int]) -> Tuple[bytes, np.ndarray, np.ndarray]:
+        encoded = sorted((term.encode('utf-8'), index) for term, index in vocabulary.items())
+        offsets = np.zeros(len(encoded) + 1, dtype='<u4')
+        offsets[1:] = np.cumsum([len(term) for term, _ in encoded])
+        indexes = np.array([index for _, index in encoded], dtype='<u4')
+        return b''.join(term for term, _ in encoded), offsets, indexes
+
+    def _term(self, position: int) -> bytes:
+        return self.strings[self.offsets[position]:self.offsets[position + 1]].tobytes()
+
+    def get(self, term: str, default=None):
+        key = term.encode('utf-8')
+        offsets, strings = self.offsets, self.strings
+        low, high = 0, self.size
+        while low < high:
+            mid = (low + high) // 2
+            if strings[offsets[mid]:offsets[mid + 1]].tobytes() < key:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self.size and strings[offsets[low]:offsets[low + 1]] == key:
+            return self.indexes[low]
+        return default
+
+    def __len__(self) -> int:
+        return self.size
+
+    def items(self):
+        for position in range(self.size):
+            yield self._term(position).decode('utf-8'), self.indexes[position]
+
+class ModelArtifact:
+    def __init__(self, path: str, metadata: Dict[str, Any], buffer: mmap.mmap,
+                 arrays: Dict[str, np.ndarray], vocabulary: StringTable):
+        self.path = path
+        self.metadata = metadata
+        self.buffer = buffer
+        self.arrays = arrays
+        self.vocabulary = vocabulary
+
+    @property
+    def content_hash(self) -> str:
+        return self.metadata['payload_sha256']
+
+def _align(position: int) -> int:
+    return (position + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def write_artifact(path: str, sections: Dict[str, np.ndarray], metadata: Dict[str, Any],
+                   magic: bytes = MAGIC) -> str:
+    payload = bytearray()
+    layout = {}
+    for name, array in sections.items():
+        payload.extend(b'\0' * (_align(len(payload)) - len(payload)))
+        layout[name] = {
+            'offset': len(payload),
+            'length': array.nbytes,
+            'dtype': array.dtype.str,
+            'shape': list(array.shape)
+        }
+        payload.extend(array.tobytes())
+
+    metadata = dict(metadata, sections=layout, payload_sha256=hashlib.sha256(payload).hexdigest())
+    metadata.setdefault('format_version', FORMAT_VERSION)
+    metadata.setdefault('created_at', datetime.now().isoformat())
+
+    header = json.dumps(metadata, ensure_ascii=False).encode('utf-8')
+    payload_start = _align(PREAMBLE.size + len(header))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.artifact-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(PREAMBLE.pack(magic, FORMAT_VERSION, len(header)))
+            f.write(header)
+            f.write(b'\0' * (payload_start - PREAMBLE.size - len(header)))
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    logger.info(f"Artifact written to {path} ({payload_start + len(payload)} bytes)")
+    return metadata['payload_sha256']
+
+def read_artifact(path: str, magic: bytes = MAGIC, verify: bool = True,
+                  expected: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], mmap.mmap, Dict[str, memoryview]]:
+    if sys.byteorder != 'little':
+        raise ValueError("Artifacts require a little-endian host")
+
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(buffer) < PREAMBLE.size:
+        raise ValueError(f"Artifact {path} is truncated")
+
+    file_magic, version, header_length = PREAMBLE.unpack_from(buffer, 0)
+    if file_magic != magic:
+        raise ValueError(f"{path} is not a {magic.decode('ascii', 'replace')} artifact")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact version {version} (expected {FORMAT_VERSION})")
+
+    header_end = PREAMBLE.size + header_length
+    if header_end > len(buffer):
+        raise ValueError(f"Artifact {path} has a truncated header")
+    metadata = json.loads(buffer[PREAMBLE.size:header_end].decode('utf-8'))
+
+    payload = memoryview(buffer)[_align(header_end):]
+    if verify and hashlib.sha256(payload).hexdigest() != metadata.get('payload_sha256'):
+        raise ValueError(f"Artifact {path} failed content hash verification")
+
+    for key, value in (expected or {}).items():
+        if metadata.get(key) != value:
+            raise ValueError(f"Artifact {path} mismatch on '{key}': {metadata.get(key)!r} != {value!r}")
+
+    views = {}
+    for name, section in metadata['sections'].items():
+        end = section['offset'] + section['length']
+        if end > len(payload):
+            raise ValueError(f"Artifact {path} section '{name}' is out of bounds")
+        views[name] = payload[section['offset']:end]
+
+    return metadata, buffer, views
+
+def section_array(metadata: Dict[str, Any], views: Dict[str, memoryview], name: str) -> np.ndarray:
+    section = metadata['sections'][name]
+    return np.frombuffer(views[name], dtype=np.dtype(section['dtype'])).reshape(section['shape'])
+
+def write_model_artifact(path: str, vocabulary: Dict[str, int], arrays: Dict[str, np.ndarray],
+                         classes: List[str], n_features: int,
+                         extra_metadata: Optional[Dict[str, Any]] = None) -> str:
+    strings, offsets, indexes = StringTable.build(vocabulary)
+    sections = {
+        'vocab_strings': np.frombuffer(strings, dtype='u1'),
+        'vocab_offsets': offsets,
+        'vocab_index': indexes
+    }
+    for name, array in arrays.items():
+        if array is not None:
+            sections[name] = np.ascontiguousarray(array, dtype='<f8')
+
+    metadata = {
+        'format_version': FORMAT_VERSION,
+        'created_at': datetime.now().isoformat(),
+        'classes': list(classes),
+        'n_features': n_features,
+        'vocabulary_size': len(vocabulary),
+        'n_classes': len(classes)
+    }
+    metadata.update(extra_metadata or {})
+    return write_artifact(path, sections, metadata)
+
+def read_model_artifact(path: str, verify: bool = True,
+                        expected: Optional[Dict[str, Any]] = None) -> ModelArtifact:
+    metadata, buffer, views = read_artifact(path, MAGIC, verify, expected)
+
+    # Artifacts written before hashing models existed have no vocabulary_size;
+    # their n_features was the vocabulary size
+    vocabulary_size = metadata.setdefault('vocabulary_size', metadata['n_features'])
+    vocabulary = StringTable(views.pop('vocab_offsets').cast('I'), views.pop('vocab_strings'),
+                             views.pop('vocab_index').cast('I'))
+    if len(vocabulary.offsets) != vocabulary_size + 1 or len(vocabulary.indexes) != vocabulary_size:
+        raise ValueError(f"Artifact {path} string table does not match vocabulary_size={vocabulary_size}")
+
+    arrays = {name: section_array(metadata, views, name) for name in views}
+    return ModelArtifact(path, metadata, buffer, arrays, vocabulary)
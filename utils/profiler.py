@@ -0,0 +1,173 @@
+# utils/profiler.py
+import os
+import sys
+import time
+import logging
+import threading
+from collections import Counter
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Intent each worker thread is currently processing. The sampler can read other
+# threads' frames but not their contextvars, so the pipeline tags its thread
+# before each CPU-bound step; a dict store is cheap enough to leave always on
+_thread_tags: Dict[int, str] = {}
+
+def tag_thread(tag: str):
+    _thread_tags[threading.get_ident()] = tag
+
+def untag_thread():
+    _thread_tags.pop(threading.get_ident(), None)
+
+def run_untagged(fn, *args):
+    # For calls on shared worker threads: whatever tag the call sets must not
+    # outlive it and be credited to the next task on the thread
+    try:
+        return fn(*args)
+    finally:
+        untag_thread()
+
+# Leaf frames that mean the thread is parked rather than burning CPU
+IDLE_FRAMES = {
+    ('threading.py', 'wait'), ('threading.py', '_wait_for_tstate_lock'), ('queue.py', 'get'),
+    ('selectors.py', 'select'), ('socket.py', 'accept'), ('socket.py', 'readinto'),
+    ('thread.py', '_worker'), ('base_events.py', '_run_once'), ('network.py', '_recv_chunk'),
+    ('network.py', 'recv_plain'), ('serving.py', 'serve_forever')
+}
+
+class StackSampler:
+    MAX_SECONDS = 60.0
+
+    def __init__(self, interval: float = 0.005, include_idle: bool = False, max_depth: int = 64):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.max_depth = max_depth
+        self._labels: Dict[Any, str] = {}
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            path = os.path.abspath(code.co_filename)
+            if path.startswith(ROOT + os.sep):
+                path = os.path.relpath(path, ROOT)
+            else:
+                path = os.path.basename(path)
+            # Flame graph tools split frames on ';', so it can't appear inside one
+            label = f"{code.co_name} ({path})".replace(';', ',')
+            self._labels[code] = label
+        return label
+
+    def _is_idle(self, frame) -> bool:
+        return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+    def run(self, seconds: float) -> Dict[str, Any]:
+        seconds = min(max(seconds, 0.0), self.MAX_SECONDS)
+        own = threading.get_ident()
+        stacks = Counter()
+        tags = Counter()
+        idle = 0
+        samples = 0
+        names = {}
+
+        start = time.perf_counter()
+        deadline = start + seconds
+        next_sample = start
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if now < next_sample:
+                time.sleep(next_sample - now)
+            next_sample += self.interval
+            samples += 1
+
+            frames = sys._current_frames()
+            if len(names) != len(frames):
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                if not self.include_idle and self._is_idle(frame):
+                    idle += 1
+                    continue
+
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                tag = _thread_tags.get(ident) or f"hilo:{names.get(ident, ident)}"
+                stack.append(tag)
+                stacks[';'.join(reversed(stack))] += 1
+                tags[tag] += 1
+            del frames
+
+        return {
+            'pid': os.getpid(),
+            'duration_seconds': round(time.perf_counter() - start, 3),
+            'interval_ms': round(self.interval * 1000, 3),
+            'samples': samples,
+            'stack_samples': sum(stacks.values()),
+            'idle_samples_skipped': idle,
+            'tags': dict(tags.most_common()),
+            'stacks': stacks
+        }
+
+def collapsed(stacks: Counter) -> str:
+    # Brendan Gregg's folded format: "root;...;leaf count" per line, the input
+    # of flamegraph.pl, speedscope and inferno
+    return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+class ProfileRunner:
+    # Samples on a background thread, so a single sync worker keeps serving
+    # the traffic being profiled; one profile per process at a time
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at: Optional[float] = None
+        self.seconds = 0.0
+        self.result: Optional[Dict[str, Any]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float, interval: float = 0.005, include_idle: bool = False) -> bool:
+        with self._lock:
+            if self.running:
+                return False
+            sampler = StackSampler(interval, include_idle)
+            self.seconds = min(max(seconds, 0.0), sampler.MAX_SECONDS)
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, args=(sampler, self.seconds),
+                                            name='dtai-profiler', daemon=True)
+            self._thread.start()
+        logger.info(f"Perfil de CPU iniciado: {self.seconds}s cada {interval * 1000:.1f} ms")
+        return True
+
+    def _run(self, sampler: StackSampler, seconds: float):
+        try:
+            result = sampler.run(seconds)
+            result['started_at'] = self.started_at
+            self.result = result
+        except Exception as e:
+            logger.error(f"Error en perfil de CPU: {e}")
+
+    def wait(self, timeout: Optional[float] = None):
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def status(self) -> Dict[str, Any]:
+        running = self.running
+        return {
+            'running': running,
+            'started_at': self.started_at,
+            'seconds': self.seconds,
+            'remaining_seconds': round(max(self.started_at + self.seconds - time.time(), 0.0), 1) if running else 0.0,
+            'has_result': self.result is not None
+        }
+
+profiler = ProfileRunner()
@@ -0,0 +1,138 @@
+# utils/spelling.py
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.message_analysis import MessageAnalysis
+
+def edit_distance(source: str, target: str, max_distance: int) -> int:
+    # Optimal string alignment distance (adjacent transpositions count as one edit),
+    # abandoned as soon as a whole row exceeds max_distance
+    if abs(len(source) - len(target)) > max_distance:
+        return max_distance + 1
+
+    prefix = 0
+    while prefix < len(source) and prefix < len(target) and source[prefix] == target[prefix]:
+        prefix += 1
+    source, target = source[prefix:], target[prefix:]
+    while source and target and source[-1] == target[-1]:
+        source, target = source[:-1], target[:-1]
+    if not source or not target:
+        return len(source) + len(target)
+
+    previous_previous = None
+    previous = list(range(len(target) + 1))
+    for i, source_char in enumerate(source, 1):
+        current = [i] + [0] * len(target)
+        for j, target_char in enumerate(target, 1):
+            cost = 0 if source_char == target_char else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and source_char == target[j - 2] and source[i - 2] == target_char):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+
+    return previous[-1]
+
+class SpellingCorrector:
+    def __init__(self, dictionary: Dict[str, int], known_words: Iterable[str] = (),
+                 max_distance: int = 2, min_length: int = 5, long_word_length: int = 8,
+                 cache_size: int = 4096):
+        self.max_distance = max_distance
+        self.cache_size = cache_size
+        self._cache: Dict[str, Optional[str]] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.min_length = min_length
+        self.long_word_length = long_word_length
+        self.frequencies = dict(dictionary)
+        self.known_words: Set[str] = set(known_words) | set(dictionary)
+        self.deletes: Dict[str, List[str]] = {}
+
+        for word in self.frequencies:
+            for variant in self._deletes(word, self.max_distance):
+                self.deletes.setdefault(variant, []).append(word)
+
+    @classmethod
+    def from_phrases(cls, dictionary_phrases: Iterable[str], known_phrases: Iterable[str] = (),
+                     **kwargs) -> 'SpellingCorrector':
+        dictionary = {}
+        for phrase in dictionary_phrases:
+            for token in MessageAnalysis.from_message(phrase).tokens:
+                if len(token) > 3 and token.isalpha():
+                    dictionary[token] = dictionary.get(token, 0) + 1
+
+        known = set()
+        for phrase in known_phrases:
+            known.update(MessageAnalysis.from_message(phrase).tokens)
+
+        return cls(dictionary, known, **kwargs)
+
+    @staticmethod
+    def _deletes(word: str, distance: int) -> Set[str]:
+        variants = {word}
+        frontier = {word}
+        for _ in range(distance):
+            frontier = {variant[:i] + variant[i + 1:]
+                        for variant in frontier if len(variant) > 1
+                        for i in range(len(variant))}
+            variants |= frontier
+        return variants
+
+    def _allowed_distance(self, token: str) -> int:
+        return self.max_distance if len(token) >= self.long_word_length else min(1, self.max_distance)
+
+    def lookup(self, token: str) -> Optional[str]:
+        if token in self.known_words or len(token) < self.min_length or not token.isalpha():
+            return None
+
+        try:
+            result = self._cache[token]
+            self.cache_hits += 1
+            return result
+        except KeyError:
+            self.cache_misses += 1
+
+        max_distance = self._allowed_distance(token)
+        candidates = set()
+        for variant in self._deletes(token, max_distance):
+            candidates.update(self.deletes.get(variant, ()))
+
+        best, best_key = None, None
+        for candidate in candidates:
+            distance = edit_distance(token, candidate, max_distance)
+            if distance > max_distance:
+                continue
+            key = (distance, -self.frequencies[candidate], candidate)
+            if best_key is None or key < best_key:
+                best, best_key = candidate, key
+
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[token] = best
+        return best
+
+    def correct(self, analysis: MessageAnalysis) -> Tuple[MessageAnalysis, Dict[str, str]]:
+        corrections = {}
+        for token in analysis.tokens:
+            if token not in self.known_words and token not in corrections:
+                replacement = self.lookup(token)
+                if replacement:
+                    corrections[token] = replacement
+
+        if not corrections:
+            return analysis, corrections
+
+        # normalized only strips combining marks, so its tokens line up with lower's
+        lower_words = analysis.lower.split()
+        tokens = tuple(corrections.get(token, token) for token in analysis.tokens)
+        lower = ' '.join(tokens[i] if analysis.tokens[i] in corrections else word
+                         for i, word in enumerate(lower_words))
+        return analysis._replace(lower=lower, normalized=' '.join(tokens), tokens=tokens), corrections
+
+    @property
+    def cache_entries(self) -> int:
+        return len(self._cache)
+
+    def __len__(self) -> int:
+        return len(self.frequencies)
@@ -1,33 +1,68 @@
+import os
 import re
 import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+_NON_WORD = re.compile(r'[^\w\s]')
+
+class _CombiningMarkTable(dict):
+    # str.translate table that deletes nonspacing marks, filled lazily per code point
+    def __missing__(self, code_point):
+        value = None if unicodedata.category(chr(code_point)) == 'Mn' else code_point
+        self[code_point] = value
+        return value
+
+_COMBINING_MARKS = _CombiningMarkTable()
+
+def fold_accents(text):
+    if text.isascii():
+        return text
+    return unicodedata.normalize('NFD', text).translate(_COMBINING_MARKS)
+
+def normalize_text(text):
+    if not text:
+        return ""
+    return ' '.join(_NON_WORD.sub(' ', fold_accents(text.lower())).split())
+
+def _normalize_chunk(texts):
+    return [normalize_text(text) for text in texts]
 
 class TextProcessor:
+    PARALLEL_THRESHOLD = 50000
+    CHUNK_SIZE = 5000
+    
     def __init__(self):
         self.stopwords = {
             'es': ['el', 'la', 'de', 'que', 'y', 'a', 'en', 'un', 'es', 'se', 'no', 'te', 'lo', 
                    'le', 'da', 'su', 'por', 'son', 'con', 'para', 'como', 'las', 'del', 'los',
                    'una', 'al', 'me', 'mi', 'tu', 'yo', 'he', 'ha', 'si', 'muy', 'mas', 'ya']
         }
+        self._stopword_set = frozenset(self.stopwords['es'])
     
     def clean_text(self, text):
-        if not text:
-            return ""
-        
-        text = text.lower().strip()
-        text = self.remove_accents(text)
-        text = re.sub(r'[^\w\s]', ' ', text)
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        return text
+        return normalize_text(text)
     
     def remove_accents(self, text):
-        return ''.join(c for c in unicodedata.normalize('NFD', text)
-                      if unicodedata.category(c) != 'Mn')
+        return fold_accents(text)
     
     def tokenize(self, text):
-        clean = self.clean_text(text)
-        tokens = clean.split()
-        return [token for token in tokens if len(token) > 2 and token not in self.stopwords['es']]
+        stopwords = self._stopword_set
+        return [token for token in normalize_text(text).split() if len(token) > 2 and token not in stopwords]
+    
+    def clean_texts(self, texts, workers=None):
+        texts = list(texts)
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(texts) < self.PARALLEL_THRESHOLD:
+            return _normalize_chunk(texts)
+        
+        chunks = [texts[i:i + self.CHUNK_SIZE] for i in range(0, len(texts), self.CHUNK_SIZE)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return [clean for chunk in pool.map(_normalize_chunk, chunks) for clean in chunk]
+    
+    def tokenize_many(self, texts, workers=None):
+        stopwords = self._stopword_set
+        return [[token for token in clean.split() if len(token) > 2 and token not in stopwords]
+                for clean in self.clean_texts(texts, workers)]
     
     def extract_keywords(self, text, max_keywords=10):
         tokens = self.tokenize(text)
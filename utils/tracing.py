@@ -0,0 +1,247 @@
+# utils/tracing.py
+import os
+import json
+import atexit
+import random
+import logging
+import threading
+import functools
+import itertools
+import contextvars
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# The open span of the running request; None outside a request and NULL_SPAN
+# inside one that wasn't sampled, which turns every span() call into a no-op
+_current_span = contextvars.ContextVar('dtai_current_span', default=None)
+
+class _NullSpan:
+    __slots__ = ()
+    trace = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def __bool__(self):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+NULL_SPAN = _NullSpan()
+
+class _UnsampledRoot(_NullSpan):
+    # Marks the request as decided, so nested trace() calls don't sample again
+    __slots__ = ('_token',)
+
+    def __enter__(self):
+        self._token = _current_span.set(NULL_SPAN)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        return False
+
+class Span:
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'attrs', 'start', 'duration', 'thread', '_token')
+
+    def __init__(self, trace: 'Trace', name: str, parent_id: Optional[int], attrs: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = trace.next_span_id()
+        self.parent_id = parent_id
+        self.name = name
+        self.attrs = attrs
+        self.start = 0.0
+        self.duration = None
+        self.thread = None
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        self.thread = threading.get_ident()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        _current_span.reset(self._token)
+        self.trace.spans.append(self)
+        if self.parent_id is None:
+            self.trace.finish(self)
+        return False
+
+    def __bool__(self):
+        return True
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'offset_ms': round((self.start - self.trace.origin) * 1000, 3),
+            'duration_ms': round(self.duration * 1000, 3) if self.duration is not None else None,
+            'thread': self.thread,
+            'attrs': self.attrs
+        }
+
+class Trace:
+    __slots__ = ('trace_id', 'tracer', 'started_at', 'origin', 'spans', 'root', '_span_ids')
+
+    def __init__(self, tracer: 'Tracer'):
+        self.trace_id = os.urandom(8).hex()
+        self.tracer = tracer
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        # Spans are appended as they close; list.append is atomic, so spans
+        # closing on executor threads need no lock
+        self.spans: List[Span] = []
+        self.root: Optional[Span] = None
+        self._span_ids = itertools.count(1)
+
+    def next_span_id(self) -> int:
+        return next(self._span_ids)
+
+    def finish(self, root: Span):
+        self.root = root
+        self.tracer.record(self)
+
+    def summary(self) -> Dict[str, Any]:
+        root = self.root
+        return {
+            'trace_id': self.trace_id,
+            'name': root.name,
+            'started_at': self.started_at,
+            'duration_ms': round(root.duration * 1000, 3),
+            'spans': len(self.spans),
+            'attrs': root.attrs
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.summary(), spans=[span.to_dict() for span in sorted(self.spans, key=lambda span: span.start)])
+
+def span(name: str, **attrs):
+    parent = _current_span.get()
+    if not parent:
+        return NULL_SPAN
+    return Span(parent.trace, name, parent.span_id, attrs)
+
+def annotate(**attrs):
+    # Tags the innermost open span, if the request is sampled
+    current = _current_span.get()
+    if current:
+        current.attrs.update(attrs)
+
+def current_trace_id() -> Optional[str]:
+    parent = _current_span.get()
+    return parent.trace.trace_id if parent else None
+
+def bind(fn: Callable) -> Callable:
+    # Executor threads run in their own context; a sampled request carries its
+    # open span over, so spans opened there nest under it
+    if not _current_span.get():
+        return fn
+    return functools.partial(contextvars.copy_context().run, fn)
+
+def chrome_trace(traces: List[Trace]) -> Dict[str, Any]:
+    # Trace Event Format: complete ("X") events in microseconds, loadable in
+    # chrome://tracing, Perfetto or speedscope
+    pid = os.getpid()
+    events = []
+    for trace in traces:
+        base = trace.started_at * 1e6
+        for current in trace.spans:
+            events.append({
+                'name': current.name,
+                'cat': trace.root.name,
+                'ph': 'X',
+                'ts': round(base + (current.start - trace.origin) * 1e6, 3),
+                'dur': round(current.duration * 1e6, 3),
+                'pid': pid,
+                'tid': current.thread,
+                'args': dict(current.attrs, trace_id=trace.trace_id, span_id=current.span_id,
+                             parent_id=current.parent_id)
+            })
+    events.sort(key=lambda event: event['ts'])
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+class Tracer:
+    def __init__(self, sample_rate: float = 0.01, capacity: int = 200, export_path: Optional[str] = None):
+        self.sample_rate = sample_rate
+        self.export_path = export_path
+        self._traces = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'sampled': 0}
+        if export_path:
+            atexit.register(self.export)
+
+    @classmethod
+    def from_environment(cls) -> 'Tracer':
+        return cls(
+            sample_rate=min(max(float(os.environ.get('TRACE_SAMPLE_RATE', 0.01)), 0.0), 1.0),
+            capacity=int(os.environ.get('TRACE_BUFFER_SIZE', 200)),
+            export_path=os.environ.get('TRACE_EXPORT_PATH')
+        )
+
+    def trace(self, name: str, force: bool = False, **attrs):
+        # Opens a root span for a sampled request, or a child span when one is
+        # already open; everything else gets the no-op span
+        parent = _current_span.get()
+        if parent is not None:
+            return Span(parent.trace, name, parent.span_id, attrs) if parent else NULL_SPAN
+
+        self.stats['requests'] += 1
+        if not force and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            return _UnsampledRoot()
+        self.stats['sampled'] += 1
+        return Span(Trace(self), name, None, attrs)
+
+    def record(self, trace: Trace):
+        with self._lock:
+            self._traces.append(trace)
+
+    def recent(self, limit: int = 50) -> List[Trace]:
+        with self._lock:
+            traces = list(self._traces)
+        return traces[::-1][:limit]
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        with self._lock:
+            return next((trace for trace in self._traces if trace.trace_id == trace_id), None)
+
+    def export(self, path: Optional[str] = None, traces: Optional[List[Trace]] = None) -> int:
+        path = path or self.export_path
+        if not path:
+            return 0
+        traces = traces if traces is not None else self.recent(self._traces.maxlen)
+        if not traces:
+            return 0
+        try:
+            with open(path, 'w', encoding='utf-8') as output:
+                json.dump(chrome_trace(traces), output, ensure_ascii=False, default=str)
+            logger.info(f"{len(traces)} trazas exportadas a {path}")
+        except OSError as e:
+            logger.error(f"Error exportando trazas: {e}")
+            return 0
+        return len(traces)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            buffered = len(self._traces)
+        return {
+            'sample_rate': self.sample_rate,
+            'capacity': self._traces.maxlen,
+            'buffered': buffered,
+            'export_path': self.export_path,
+            **self.stats
+        }